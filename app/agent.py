@@ -28,14 +28,22 @@ from app.services.cloud_security_service import CloudSecurityService
 from app.services.detectron_service import DetectronService
 from app.services.threat_hunting_service import ThreatHuntingService
 from app.services.investigation_service import InvestigationService
+from app.services.investigation_case_store import InvestigationCaseStore
 from app.services.containment_service import ContainmentService
 from app.services.remediation_service import RemediationService
+from app.services.operation_tracker import OperationTracker
+from app.services.instance_index import InstanceIndex
+from app.services.idempotency import ActionJournal, IdempotencyCache
+from app.models.containment_action import ContainmentAction
+from app.models.remediation_action import RemediationAction
 from app.services.threat_feed_service import ThreatFeedService
 from app.services.intelligence_service import IntelligenceService
 from app.services.bigquery_service import BigQueryService
 from app.services.vertex_ai_service import VertexAIService
 from app.services.reporting_service import ReportingService
 from app.services.ingestion_service import IngestionService
+from app.services.log_index_service import LogIndexService
+from app.services.saved_hunt_store import SavedHuntStore
 
 
 from app.agents.reporter_agent import ReporterAgent
@@ -76,11 +84,44 @@ data_store_id = os.getenv("DATA_STORE_ID", "my-awesome-agent-datastore")
 config = PlatformConfig.from_env()
 bq_service = BigQueryService(config)
 security_service = CloudSecurityService(config)
-detectron_service = DetectronService(bq_service, security_service)
-threat_hunting_service = ThreatHuntingService(bq_service, security_service)
-investigation_service = InvestigationService(bq_service, security_service)
-containment_service = ContainmentService(config)
-remediation_service = RemediationService(config)
+detectron_service = DetectronService(
+    bq_service, security_service, model_path=os.getenv("ANOMALY_MODEL_PATH")
+)
+log_index = LogIndexService(os.path.join(config.state_dir, "log_index"))
+hunt_store = SavedHuntStore(os.path.join(config.state_dir, "saved_hunts.json"))
+threat_hunting_service = ThreatHuntingService(
+    bq_service, security_service, index=log_index, hunt_store=hunt_store
+)
+investigation_service = InvestigationService(
+    bq_service,
+    security_service,
+    store=InvestigationCaseStore(os.path.join(config.state_dir, "investigations.sqlite")),
+)
+# One background poller settles VM stops and patch jobs from both agents
+operation_tracker = OperationTracker()
+
+def _action_dedup(model, name: str) -> IdempotencyCache:
+    """TTL dedup cache journaled locally and batch-shipped to the incident bucket."""
+    journal = ActionJournal(
+        os.path.join(config.state_dir, f"{name}_journal.jsonl"),
+        bucket_name=config.incident_bucket,
+        prefix=f"journal/{name}",
+    )
+    return IdempotencyCache(model, journal)
+
+instance_index = InstanceIndex(security_service.list_instances)
+containment_service = ContainmentService(
+    config,
+    tracker=operation_tracker,
+    index=instance_index,
+    dedup=_action_dedup(ContainmentAction, "containment"),
+)
+remediation_service = RemediationService(
+    config,
+    tracker=operation_tracker,
+    dedup=_action_dedup(RemediationAction, "remediation"),
+    index=instance_index,
+)
 feed_service = ThreatFeedService()
 vertex_service = VertexAIService(config)
 intelligence_service = IntelligenceService(feed_service, bq_service, vertex_service)
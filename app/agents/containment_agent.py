@@ -1,5 +1,7 @@
+from typing import List, Optional
 from google.adk.agents import LlmAgent
 from app.models.containment_action import ContainmentAction
+from app.models.containment_policy import ContainmentPolicy
 from app.services.containment_service import ContainmentService
 from app.utils.config import PlatformConfig
 from app.services.document_service import retrieve_docs  # RAG tool
@@ -12,15 +14,24 @@ You are ContainmentAgent, responsible for rapid isolation of compromised systems
 Use your tools to:
 - `isolate_vm(resource_id, zone)`  
   • resource_id: the VM instance name (e.g. “web-frontend-1”)  
-  • zone: the GCE zone (e.g. “us-central1-a”)  
+  • zone: the GCE zone (e.g. “us-central1-a”); optional, looked up from the asset inventory when omitted  
+- `isolate_vms(resource_ids)`  
+  • resource_ids: several VM names (or zone/name) to stop in one call  
+- `plan_containment(resource_ids, actions)`  
+  • dry run (no cloud calls): per-resource actions, estimated API calls and the services that would lose instances  
 - `lock_account(account_id)`  
   • account_id: the user’s email or unique ID (e.g. “jane.doe@example.com”)  
+- `operation_status(operation, wait_seconds)`  
+  • operation: the `operation` name returned by a pending action; waits up to wait_seconds for it to finish  
 - `retrieve_docs(query)`  
   • query: a free-text lookup (e.g. “MITRE isolation playbook”)
 
 Trigger Conditions:
-- **isolate_vm**: when the user’s prompt includes any of [“isolate”, “quarantine”, “disconnect”, “shut down”] **and** names both a VM and its zone.
+- **isolate_vm**: when the user’s prompt includes any of [“isolate”, “quarantine”, “disconnect”, “shut down”] **and** names a VM.
+- **isolate_vms**: same triggers when several VMs are named; prefer one `isolate_vms` call over repeated `isolate_vm`.
+- **plan_containment**: before a large or unclear isolation (“what would happen if…”, several VMs), or when asked for blast radius / impact.
 - **lock_account**: when the user’s prompt includes any of [“lock”, “disable”, “block”, “suspend”] and names an account identifier.
+- **operation_status**: when an action came back `pending` and the user asks whether it has completed.
 - **retrieve_docs**: when the user asks for containment policies, compliance checklists, or justification.
 
 Examples:
@@ -41,7 +52,10 @@ class ContainmentAgent(LlmAgent):
             model="gemini-2.0-flash",
             tools=[
                 self.isolate_vm,
+                self.isolate_vms,
+                self.plan_containment,
                 self.lock_account,
+                self.operation_status,
                 retrieve_docs,  # ✅ Add RAG lookup
             ],
             description=instruction
@@ -57,14 +71,40 @@ class ContainmentAgent(LlmAgent):
     def containment(self):
         return self._containment_service
 
-    def isolate_vm(self, resource_id: str) -> ContainmentAction:
+    def isolate_vm(self, resource_id: str, zone: Optional[str] = None) -> ContainmentAction:
         """
         Isolate a VM instance to prevent lateral spread.
         """
-        return self.containment.perform_vm_isolation(resource_id)
+        return self.containment.perform_vm_isolation(resource_id, zone)
+
+    def isolate_vms(self, resource_ids: List[str]) -> List[ContainmentAction]:
+        """
+        Isolate several VM instances concurrently.
+        """
+        return self.containment.bulk_isolate(resource_ids)
+
+    def plan_containment(self, resource_ids: List[str], actions: List[str]) -> dict:
+        """
+        Dry-run containment actions on resources and report their impact.
+        """
+        policy = ContainmentPolicy(
+            id="adhoc", name="Ad-hoc containment", description=None, justification=None,
+            target_resources=resource_ids, actions=actions,
+        )
+        return self.containment.plan_policy(policy).model_dump()
 
     def lock_account(self, account_id: str) -> ContainmentAction:
         """
         Lock down a user account to stop unauthorized access.
         """
         return self.containment.lock_user_account(account_id)
+
+    def operation_status(self, operation: str, wait_seconds: float = 0) -> dict:
+        """
+        Report the action behind a pending operation, waiting up to
+        `wait_seconds` for it to finish.
+        """
+        try:
+            return self.containment.wait_for_action(operation, timeout=wait_seconds).model_dump()
+        except KeyError as e:
+            return {"error": str(e)}
@@ -11,8 +11,13 @@ instruction = """
 
     Use the `detect()` tool to:
     - Scan recent logs (default: last 1,000) for behavioral anomalies, suspicious outbound IP traffic, and system irregularities.
+    - Flag periodic, low-jitter connections between a source and destination (C2 beaconing).
+    - Flag brute-force, password-spray and credential-stuffing login patterns.
     - Always invoke `detect()` when asked to identify, scan, analyze, or correlate anomalies or unusual behavior.
 
+    Use `persistence_status()` to confirm that detected anomalies were written to BigQuery
+    (pass `flush=True` to wait for pending writes).
+
     Guidelines:
     - Avoid creating your own SQL or query logic; let `detect()` handle data retrieval.
     - Responses must focus on clear and actionable anomaly summaries.
@@ -31,6 +36,7 @@ class DetectronAgent(LlmAgent):
             model="gemini-2.0-flash",
             tools=[
                 self.detect,
+                self.persistence_status,
                 retrieve_docs,           #  Raw doc retrieval
             ],
             description=instruction
@@ -61,3 +67,10 @@ class DetectronAgent(LlmAgent):
         # Convert models to dicts if they have model_dump method
         return [a.model_dump(mode="json") if hasattr(a, 'model_dump') else a for a in anomalies]
 
+    def persistence_status(self, flush: bool = False) -> dict:
+        """
+        Report whether anomalies from previous `detect()` calls were persisted.
+        Args:
+            flush: wait for pending writes to complete before reporting.
+        """
+        return self.service.persistence_status(flush=flush)
@@ -1,3 +1,4 @@
+from typing import List, Optional
 from google.adk.agents import LlmAgent
 from app.utils.config import PlatformConfig
 from app.services.investigation_service import InvestigationService
@@ -12,6 +13,13 @@ instruction = """
     - Perform root-cause analysis
     - Identify compromised systems
     - Trace lateral movement or attacker paths
+    - Pass the same `case_id` to `trace()` on follow-up turns of one incident: the case keeps its events,
+      attack graph and scores, and only new evidence is pulled in. Use a new `case_id` for a new incident.
+    - When the user names suspect IPs, accounts, hosts or a time window, pass them as `seed_entities`,
+      `start` and `end` so `trace()` only pulls the related evidence; this is much faster than a full trace.
+    - Use `attack_paths(source, target)` to map how an attacker got from one entity (IP, principal, host or asset)
+      to another, and `blast_radius(entity)` to list what a compromised entity can reach. Both query the
+      attack graph built by the last `trace()`.
     - Use `retrieve_docs()` for:
     - Investigative best practices
     - MITRE ATT&CK references
@@ -28,6 +36,8 @@ instruction = """
     - “Estimate the impact of the incident on June 18, 2025.”
 
     Caution:
+    - `data_exfiltrated` and the `exfiltration` block come from measured VPC flow-log volume above each host's
+      baseline; quote the estimate with its lower/upper bounds rather than a single number.
     - Avoid fabricating timeline data. If `trace()` returns no data, explain that no evidence was found.
     - Emphasize timeline clarity, affected systems, and attacker behavior when summarizing results.
     """
@@ -39,6 +49,8 @@ class InvestigatorAgent(LlmAgent):
             model="gemini-2.0-flash",
             tools=[
                 self.trace,
+                self.attack_paths,
+                self.blast_radius,
                 retrieve_docs,  
             ],
             description=instruction
@@ -54,9 +66,52 @@ class InvestigatorAgent(LlmAgent):
     def service(self):
         return self._service
 
-    def trace(self):
+    def trace(
+        self,
+        case_id: str = "latest",
+        seed_entities: Optional[List[str]] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ):
         """
         Correlate logs and assets to reconstruct the attack timeline.
+        Args:
+            case_id: investigation case; follow-up calls on the same case only
+                ingest evidence newer than the previous call.
+            seed_entities: IPs, principals, hosts or assets to scope the
+                investigation to, e.g. ["ip:45.33.12.7", "principal:alice"].
+            start: ISO 8601 start of the evidence window (inclusive).
+            end: ISO 8601 end of the evidence window (exclusive).
         """
-        return self.service.investigate()
+        try:
+            return self.service.investigate(case_id=case_id, seed_entities=seed_entities, start=start, end=end)
+        except ValueError as e:
+            return {"error": str(e)}
 
+    def attack_paths(self, source: str, target: str, case_id: str = "latest") -> dict:
+        """
+        Tool to find attack paths between two entities from the last `trace()`.
+        Args:
+            source: entity such as "ip:203.0.113.7", "principal:alice" or a bare name.
+            target: entity such as "host:vm-db" or an asset name.
+            case_id: investigation case passed to `trace()`.
+        Returns:
+            Fewest-hop path and highest-risk path (with per-hop probabilities).
+        """
+        try:
+            return self.service.attack_paths(source, target, case_id=case_id)
+        except KeyError as e:
+            return {"error": str(e)}
+
+    def blast_radius(self, entity: str, max_hops: int = 3, case_id: str = "latest") -> dict:
+        """
+        Tool to list everything a compromised entity can reach.
+        Args:
+            entity: compromised IP, principal, host or asset.
+            max_hops: maximum number of hops to follow.
+            case_id: investigation case passed to `trace()`.
+        """
+        try:
+            return {"entity": entity, "reachable": self.service.blast_radius(entity, max_hops=max_hops, case_id=case_id)}
+        except KeyError as e:
+            return {"error": str(e)}
@@ -1,3 +1,4 @@
+from typing import Dict, List, Optional
 from google.adk.agents import LlmAgent
 from app.utils.config import PlatformConfig
 from app.services.remediation_service import RemediationService
@@ -10,13 +11,17 @@ You are RemediatorAgent, a recovery specialist tasked with restoring systems aft
 Use your tools to:
 - `isolate_vm(instance_name, zone)`: Immediately stop or disconnect a VM to prevent further damage.
 - `patch_vm(instance_id, patch_job_name)`: Trigger OS Config patch jobs on instances. Provide a clear patch job name.
+- `patch_vms(patch_job_name, instance_ids, labels, zones)`: Patch many VMs at once (by name and/or by labels such as {"env": "prod"}), rolled out zone by zone with at most 10% of VMs down at a time.
 - `recover_file(file_path)`: Restore a file from secure backups or snapshots.
+- `recover_files(file_paths, as_of)`: Restore many files, or whole directories (paths ending in "/"), in one call; `as_of` picks the newest backup snapshot not newer than that id (e.g. a timestamp before the ransomware ran).
+- `operation_status(operation, wait_seconds)`: Check (or wait up to wait_seconds for) a pending VM stop or patch job by its `operation` name.
 - `retrieve_docs(query)`: Fetch remediation guides, patch procedures, or backup playbooks via RAG.
 
 When to invoke:
 - If asked to “stop”, “disconnect”, or “quarantine” a VM, call `isolate_vm`.
-- If asked to apply patches or updates (e.g., “run patch job”), call `patch_vm`.
-- If asked to restore or recover specific files, call `recover_file`.
+- If asked to apply patches or updates (e.g., “run patch job”), call `patch_vm`; when several VMs or a labelled group (e.g. after a CVE) must be patched, make one `patch_vms` call instead.
+- If asked to restore or recover specific files, call `recover_file`; for several files or directories, make one `recover_files` call.
+- If an action came back `pending` and the user asks whether it finished, call `operation_status`.
 - Use `retrieve_docs` when the user requests procedural guidance (e.g., “how to patch Windows servers?”).
 
 Examples:
@@ -40,7 +45,10 @@ class RemediatorAgent(LlmAgent):
             tools=[
                 self.isolate_vm,
                 self.patch_vm,
+                self.patch_vms,
                 self.recover_file,
+                self.recover_files,
+                self.operation_status,
                 retrieve_docs,  # ✅ Enables real-time doc retrieval
             ],
             description=instruction
@@ -62,5 +70,23 @@ class RemediatorAgent(LlmAgent):
     def patch_vm(self, instance_id: str, patch_job_name: str) -> RemediationAction:
         return self.service.patch_vm(instance_id, patch_job_name)
 
+    def patch_vms(
+        self,
+        patch_job_name: str,
+        instance_ids: Optional[List[str]] = None,
+        labels: Optional[Dict[str, str]] = None,
+        zones: Optional[List[str]] = None,
+    ) -> List[RemediationAction]:
+        return self.service.bulk_patch(patch_job_name, instances=instance_ids, labels=labels, zones=zones)
+
     def recover_file(self, file_path: str) -> RemediationAction:
         return self.service.recover_file(file_path)
+
+    def recover_files(self, file_paths: List[str], as_of: Optional[str] = None) -> List[RemediationAction]:
+        return self.service.recover_files(file_paths, as_of)
+
+    def operation_status(self, operation: str, wait_seconds: float = 0) -> dict:
+        try:
+            return self.service.wait_for_action(operation, timeout=wait_seconds).model_dump()
+        except KeyError as e:
+            return {"error": str(e)}
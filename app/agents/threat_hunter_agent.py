@@ -4,6 +4,7 @@ from app.utils.config import PlatformConfig
 from app.services.threat_hunting_service import ThreatHuntingService
 from app.services.bigquery_service import BigQueryService
 from app.services.document_service import retrieve_docs
+from app.tools.hunt_filter import HuntFilterError
 
 instruction = """
             You are ThreatHunterAgent, a cyber threat hunting expert trained to identify both active and historical attacks in system logs.
@@ -11,6 +12,20 @@ instruction = """
             Use your tools to:
             - Invoke `hunt()` to search logs for suspicious activities using structured filters (e.g. failed logins, brute-force, credential stuffing).
             - Always set a `limit` (default 1000) and supply a `filter_expression` (SQL-like WHERE clause).
+            - `hunt()` returns a summary plus the first page of rows; call `hunt_page(next_cursor)` only if you
+              need more raw rows than the summary provides.
+            - For spike or volume questions ("failed login spikes", "which IPs are noisiest") use `hunt_counts()`:
+              it returns per-time-bucket counts and top IPs (or log types/messages) instead of raw rows.
+            - Invoke `hunt_all_sources()` to run one filter over application logs, audit logs and dark-web chatter
+              at once (rows are tagged with `hunt_source`), instead of separate hunts per source.
+            - Invoke `correlate()` to turn matching logs into scored Threat records (known IOC contacts,
+              suspicious external traffic) instead of raw rows.
+            - Invoke `credential_attacks()` for failed-login spikes, brute force, password spraying or credential
+              stuffing; it aggregates auth events per account and source IP instead of returning raw rows.
+            - Invoke `sweep_iocs()` to check logs against ALL known indicators (IPs, domains, CVEs, exploit strings) at once,
+              instead of calling `hunt()` once per indicator.
+            - Use `save_hunt()` for hunts the analyst wants to repeat (e.g. hourly credential-stuffing checks),
+              then `rerun_hunt(hunt_id)`: re-runs only scan logs newer than the previous run.
             - Use `retrieve_threat_intel()` to fetch external threat intelligence, IOCs, or known exploit patterns using RAG-based document search.
 
             Tool Invocation Guidelines:
@@ -25,7 +40,10 @@ instruction = """
 
             Caution:
             - Avoid creating complex SQL logic; pass only simple `WHERE` clause conditions to `filter_expression`.
-            - Logs may be limited in schema. Common available fields: `ip`, `timestamp`, `message`.
+            - Logs may be limited in schema. Available fields: `ip`, `timestamp`, `log_type`, `message`.
+            - Supported syntax: `=`, `!=`, `<`, `>`, `LIKE`, `IN (...)`, `AND`, `OR`, `NOT`, parentheses,
+              and bare quoted keywords (e.g. `'failed login' AND ip = '203.0.113.7'`).
+            - Compare `timestamp` with ISO-8601 strings, e.g. `timestamp >= '2025-06-19T00:00:00Z'`.
             """
 
 class ThreatHunterAgent(LlmAgent):
@@ -33,7 +51,20 @@ class ThreatHunterAgent(LlmAgent):
         super().__init__(
             name="threat_hunter_agent",
             model="gemini-2.0-flash",
-            tools=[self.hunt, self.retrieve_threat_intel, self.retrieve_historical_intel],
+            tools=[
+                self.hunt,
+                self.hunt_page,
+                self.hunt_counts,
+                self.hunt_all_sources,
+                self.correlate,
+                self.credential_attacks,
+                self.sweep_iocs,
+                self.save_hunt,
+                self.rerun_hunt,
+                self.list_saved_hunts,
+                self.retrieve_threat_intel,
+                self.retrieve_historical_intel,
+            ],
             description=instruction
         )
         object.__setattr__(self, "_config", config)
@@ -61,27 +92,190 @@ class ThreatHunterAgent(LlmAgent):
         self,
         limit: int = 1000,
         filter_expression: str = "TRUE",
-    ) -> list[dict]:
+    ) -> dict:
         """
         Tool to hunt threats via BigQuery + security scan.
         Args:
             limit: number of log rows to scan.
             filter_expression: SQL WHERE clause.
         Returns:
-            List of serialized Threat models as JSON dicts.
+            Summary (counts, top IPs and messages, time histogram), a first
+            page of matching rows, and `next_cursor` for `hunt_page()`.
         """
-        threats = self.service.detect_threats(
-            limit=limit, filter_expression=filter_expression
-        )
-        # Serialize Pydantic Threat -> dict
-        if threats and isinstance(threats[0], dict):
-            return threats
+        try:
+            return self.service.hunt_summary(
+                limit=limit,
+                filter_expression=filter_expression,
+                token_budget=self.config.hunt_token_budget,
+            )
+        except HuntFilterError as e:
+            # Let the model correct its filter instead of failing the turn
+            return {"error": f"Invalid filter_expression: {e}"}
+
+    def hunt_page(self, cursor: str) -> dict:
+        """
+        Tool to fetch the next page of rows from a previous `hunt()` or
+        `rerun_hunt()` result.
+        Args:
+            cursor: the `next_cursor` value from the previous response.
+        """
+        try:
+            return self.service.fetch_page(cursor, token_budget=self.config.hunt_token_budget)
+        except KeyError as e:
+            return {"error": str(e)}
+    
+    def hunt_counts(
+        self,
+        filter_expression: str = "TRUE",
+        group_by: str = "ip",
+        bucket_minutes: int = 60,
+        top_k: int = 10,
+    ) -> dict:
+        """
+        Tool to count matching logs per time bucket and per key.
+        Args:
+            filter_expression: SQL WHERE clause, as for `hunt()`; bound it in time
+                (e.g. `timestamp >= '2025-06-19T00:00:00Z'`) for faster answers.
+            group_by: "ip", "log_type" or "message".
+            bucket_minutes: histogram bucket width in minutes.
+            top_k: number of top keys to return.
+        Returns:
+            Time histogram, busiest bucket, and the top keys with their counts,
+            first/last seen and peak bucket.
+        """
+        try:
+            return self.service.hunt_aggregate(
+                filter_expression=filter_expression,
+                group_by=group_by,
+                bucket_seconds=int(bucket_minutes * 60),
+                top_k=top_k,
+            )
+        except HuntFilterError as e:
+            return {"error": f"Invalid hunt_counts arguments: {e}"}
+
+    def hunt_all_sources(
+        self,
+        limit: int = 1000,
+        filter_expression: str = "TRUE",
+        sources: Optional[List[str]] = None,
+    ) -> dict:
+        """
+        Tool to hunt logs, audit logs and dark-web chatter concurrently.
+        Args:
+            limit: maximum number of merged rows.
+            filter_expression: SQL WHERE clause, as for `hunt()`.
+            sources: subset of "logs", "audit_logs", "darkweb_chatter" (default: all).
+        Returns:
+            Summary and first page of the merged, newest-first rows as for
+            `hunt()`, plus per-source row counts, latency and errors.
+        """
+        try:
+            result = self.service.hunt_sources(
+                filter_expression=filter_expression, limit=limit, sources=sources
+            )
+        except ValueError as e:
+            return {"error": str(e)}
+        response = self.service.shape_results(result["rows"], token_budget=self.config.hunt_token_budget)
+        response["sources"] = result["sources"]
+        return response
 
+    def correlate(
+        self,
+        limit: int = 1000,
+        filter_expression: str = "TRUE",
+    ) -> List[dict]:
+        """
+        Tool to correlate logs with network indicators and threat-intel IOCs.
+        Args:
+            limit: number of log rows to correlate.
+            filter_expression: SQL WHERE clause, as for `hunt()`.
+        Returns:
+            List of serialized Threat models, most severe first.
+        """
+        try:
+            threats = self.service.correlate_threats(limit=limit, filter_expression=filter_expression)
+        except HuntFilterError as e:
+            return [{"error": f"Invalid filter_expression: {e}"}]
+        return [t.model_dump(mode="json") for t in threats]
+
+    def credential_attacks(
+        self,
+        limit: int = 50000,
+        filter_expression: str = "TRUE",
+        window_seconds: float = 600.0,
+    ) -> List[dict]:
+        """
+        Tool to detect brute-force, password-spray and credential-stuffing attacks.
+        Args:
+            limit: number of recent log rows to analyse.
+            filter_expression: optional WHERE clause to narrow the logs.
+            window_seconds: sliding window length for counting failed logins.
+        Returns:
+            List of serialized Threat models, most severe first.
+        """
+        try:
+            threats = self.service.credential_attacks(
+                limit=limit, filter_expression=filter_expression, window_seconds=window_seconds
+            )
+        except HuntFilterError as e:
+            return [{"error": f"Invalid filter_expression: {e}"}]
+        return [t.model_dump(mode="json") for t in threats]
+
+    def sweep_iocs(
+        self,
+        limit: int = 100000,
+        filter_expression: str = "TRUE",
+    ) -> dict:
+        """
+        Tool to sweep logs against every threat-intel indicator in one pass.
+        Args:
+            limit: number of recent log rows to scan.
+            filter_expression: optional WHERE clause to narrow the sweep.
+        Returns:
+            Scan summary with per-indicator hit counts and sample hits.
+        """
+        try:
+            return self.service.sweep_iocs(limit=limit, filter_expression=filter_expression)
+        except HuntFilterError as e:
+            return {"error": f"Invalid filter_expression: {e}"}
+
+    def save_hunt(self, name: str, filter_expression: str, limit: int = 1000, overwrite: bool = False) -> dict:
+        """
+        Tool to save a hunt definition for repeated incremental runs.
+        Args:
+            name: short descriptive name (used to derive the hunt id).
+            filter_expression: SQL-like WHERE clause, as for `hunt()`.
+            limit: maximum number of hits to keep for this hunt.
+            overwrite: replace an existing hunt of the same name (its cursor and results are reset).
+        """
+        try:
+            return self.service.save_hunt(name, filter_expression, limit, overwrite).model_dump(mode="json")
+        except HuntFilterError as e:
+            return {"error": f"Invalid filter_expression: {e}"}
+        except ValueError as e:
+            return {"error": f"{e}; pass overwrite=True to replace it"}
+
+    def rerun_hunt(self, hunt_id: str) -> dict:
+        """
+        Tool to re-run a saved hunt; only logs newer than the last run are scanned.
+        """
+        try:
+            result = self.service.run_saved_hunt(hunt_id)
+        except KeyError as e:
+            return {"error": str(e)}
+        rows = result.pop("results")
+        result.update(self.service.shape_results(rows, token_budget=self.config.hunt_token_budget))
+        return result
+
+    def list_saved_hunts(self) -> List[dict]:
+        """
+        Tool to list saved hunts with their last run time and cursor.
+        """
         return [
-            t.model_dump(mode="json") if hasattr(t, "model_dump") else t
-            for t in threats
+            h.model_dump(mode="json", exclude={"results"})
+            for h in self.service.hunt_store.list()
         ]
-    
+
     def retrieve_historical_intel(
         self,
         limit: int = 10,
@@ -9,3 +9,4 @@ class Anomaly(BaseModel):
     timestamp: datetime
     description: str
     affected_system: Optional[str]
+    anomaly_score: Optional[float] = None
@@ -6,3 +6,4 @@ class ContainmentAction(BaseModel):
     action_type: str  # e.g., "isolate_vm", "disable_account"
     status: str = "pending"
     justification: Optional[str] = None
+    operation: Optional[str] = None  # long-running operation still settling this action
@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class PlannedAction(BaseModel):
+    resource_id: str
+    action_type: str
+    project_id: str
+    zone: Optional[str] = None
+    instance: Optional[str] = None   # resolved VM name for VM actions
+    api_calls: int = 1               # calls to submit; 0 when skipped or already done
+    services: List[str] = []         # services (by label) running on the VM
+    skip_reason: Optional[str] = None  # why it will fail / be reused instead of called
+
+class ImpactedService(BaseModel):
+    service: str
+    targeted_instances: int
+    total_instances: int
+    fully_down: bool                 # every known instance of the service is isolated
+
+class ContainmentPlan(BaseModel):
+    policy_id: str
+    actions: List[PlannedAction]
+    resources: int
+    projects: List[str]
+    zones: List[str]
+    estimated_api_calls: int         # submissions (stops, account and label updates)
+    estimated_poll_calls_per_cycle: int  # batched operation status reads per tracker cycle
+    impacted_services: List[ImpactedService]
+    unresolved: List[str]
+    index_age_seconds: Optional[float] = None
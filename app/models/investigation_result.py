@@ -1,7 +1,19 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
+class ExfiltrationEstimate(BaseModel):
+    estimated_bytes: int                   # Outbound bytes above the sources' baselines
+    lower_bytes: int                       # Confidence interval on estimated_bytes
+    upper_bytes: int
+    confidence: float
+    window_start: Optional[datetime] = None
+    window_end: Optional[datetime] = None
+    flows_scanned: int = 0
+    outbound_bytes: int = 0                # All internal -> external bytes in the window
+    anomalous_hours: List[Dict[str, Any]] = []
+    top_destinations: List[Dict[str, Any]] = []
+
 class InvestigationResult(BaseModel):
     timeline: List[str]
     attack_path: List[str]
@@ -9,3 +21,4 @@ class InvestigationResult(BaseModel):
     data_exfiltrated: bool
     estimated_risk_score: float
     investigation_time: datetime
+    exfiltration: Optional[ExfiltrationEstimate] = None
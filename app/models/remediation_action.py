@@ -1,7 +1,9 @@
 from pydantic import BaseModel
+from typing import Optional
 
 class RemediationAction(BaseModel):
     action: str               # Action type: isolate_vm, patch_vm, recover_file
     resource: str             # Affected resource: VM ID, file path, etc.
     status: str               # executed / failed / pending
     message: str              # Human-readable summary of the result
+    operation: Optional[str] = None  # Compute operation or patch job name, while status is pending
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+class SavedHunt(BaseModel):
+    id: str
+    name: str
+    filter_expression: str
+    limit: int = 1000
+    cursor: Optional[datetime] = None      # Newest log timestamp already scanned
+    last_run: Optional[datetime] = None
+    results: List[Dict[str, Any]] = []     # Cached hits, newest first
@@ -0,0 +1,120 @@
+import logging
+import queue
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from app.services.bigquery_service import BigQueryService
+
+logger = logging.getLogger(__name__)
+
+class AnomalyWriter:
+    """
+    Background persister for anomaly rows.
+
+    `submit()` enqueues rows on a bounded queue and returns immediately; a
+    daemon worker drains the queue, coalesces pending batches and performs
+    the BigQuery streaming insert. Failures are recorded and surfaced via
+    `status()` / `flush()` instead of blocking the caller.
+    The worker thread and queue are dropped on pickling and recreated lazily.
+    """
+
+    def __init__(self, bq: BigQueryService, max_queue: int = 100, max_batch_rows: int = 500):
+        self.bq = bq
+        self.max_queue = max_queue
+        self.max_batch_rows = max_batch_rows
+        self._init_runtime()
+
+    def _init_runtime(self) -> None:
+        self._queue: Optional[queue.Queue] = None
+        self._worker: Optional[threading.Thread] = None
+        self._cond = threading.Condition()
+        self._pending_rows = 0
+        self._written_rows = 0
+        self._failed_rows = 0
+        self._dropped_rows = 0
+        self._errors: Deque[str] = deque(maxlen=10)
+
+    def _ensure_worker(self) -> queue.Queue:
+        with self._cond:
+            if self._worker is None or not self._worker.is_alive():
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._worker = threading.Thread(
+                    target=self._run, name="anomaly-writer", daemon=True
+                )
+                self._worker.start()
+            return self._queue
+
+    def submit(self, rows: List[Dict[str, Any]]) -> bool:
+        """
+        Queue rows for persistence. Returns False (and counts the rows as
+        dropped) when the queue is full rather than blocking detection.
+        """
+        if not rows:
+            return True
+        q = self._ensure_worker()
+        with self._cond:
+            try:
+                q.put_nowait(rows)
+            except queue.Full:
+                self._dropped_rows += len(rows)
+                self._errors.append(f"queue full: dropped {len(rows)} rows")
+                logger.warning("Anomaly write queue full; dropped %d rows", len(rows))
+                return False
+            self._pending_rows += len(rows)
+        return True
+
+    def _run(self) -> None:
+        q = self._queue
+        while True:
+            batch = list(q.get())
+            # Coalesce whatever else is already waiting into one insert
+            while len(batch) < self.max_batch_rows:
+                try:
+                    batch.extend(q.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.bq.insert_anomalies(batch)
+                error = None
+            except Exception as e:
+                logger.error("Background anomaly insert failed: %s", e)
+                error = str(e)
+            with self._cond:
+                self._pending_rows -= len(batch)
+                if error is None:
+                    self._written_rows += len(batch)
+                else:
+                    self._failed_rows += len(batch)
+                    self._errors.append(error)
+                self._cond.notify_all()
+
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "pending_rows": self._pending_rows,
+                "written_rows": self._written_rows,
+                "failed_rows": self._failed_rows,
+                "dropped_rows": self._dropped_rows,
+                "recent_errors": list(self._errors),
+            }
+
+    def flush(self, timeout: Optional[float] = 30.0) -> Dict[str, Any]:
+        """
+        Wait until all queued rows are written (or the timeout elapses)
+        and return the resulting status.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending_rows == 0, timeout=timeout)
+        return self.status()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ("_queue", "_worker", "_cond", "_errors"):
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        written, failed, dropped = self._written_rows, self._failed_rows, self._dropped_rows
+        self._init_runtime()
+        self._written_rows, self._failed_rows, self._dropped_rows = written, failed, dropped
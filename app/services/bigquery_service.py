@@ -1,5 +1,5 @@
 from google.cloud import bigquery
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Sequence
 from app.utils.config import PlatformConfig
 from app.utils.tracing import trace_log
 from app.utils.client_manager import PickleSafeService
@@ -23,21 +23,170 @@ class BigQueryService:
         """Get BigQuery client."""
         return self.client_manager.get_bigquery_client()
 
-    def query_logs(self, query_filter: Optional[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+    def _job_config(self, params: Optional[Sequence[Any]]) -> Optional[bigquery.QueryJobConfig]:
+        """
+        Build a QueryJobConfig from compiled hunt-filter parameters
+        (name, type, value) so filters never get spliced into the SQL text.
+        """
+        if not params:
+            return None
+        query_parameters = []
+        for name, type_, value in params:
+            if type_.startswith("ARRAY<"):
+                query_parameters.append(bigquery.ArrayQueryParameter(name, type_[6:-1], value))
+            else:
+                query_parameters.append(bigquery.ScalarQueryParameter(name, type_, value))
+        return bigquery.QueryJobConfig(query_parameters=query_parameters)
+
+    def query_logs(
+        self,
+        query_filter: Optional[str] = None,
+        limit: int = 1000,
+        params: Optional[Sequence[Any]] = None,
+        ascending: bool = False,
+    ) -> List[Dict[str, Any]]:
         """
         Generic log fetch for DetectronAgent & ThreatHunterAgent.
+        `params` carries the query parameters referenced by a compiled filter.
+        Incremental readers pass `ascending=True` so a capped page holds the
+        oldest new rows and a watermark can resume right after it.
+        """
+        return self.query_table("logs", query_filter, limit, params, ascending=ascending)
+
+    def query_table(
+        self,
+        table: str,
+        query_filter: Optional[str] = None,
+        limit: int = 1000,
+        params: Optional[Sequence[Any]] = None,
+        time_column: str = "timestamp",
+        ascending: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Newest-first (or oldest-first with `ascending`) filtered fetch from
+        any table in the dataset (logs, darkweb_chatter, ...) for fan-out hunts.
         """
         query = f"""
         SELECT *
-        FROM `{self.client.project}.{self.dataset}.logs`
-        WHERE {query_filter}
-        ORDER BY timestamp DESC
-        LIMIT {limit}
+        FROM `{self.client.project}.{self.dataset}.{table}`
+        WHERE {query_filter or "TRUE"}
+        ORDER BY {time_column} {"ASC" if ascending else "DESC"}
+        LIMIT {int(limit)}
         """
-        logger.debug("BQ fetch_logs query: %s", query)
-        rows = list(self.client.query(query).result())
+        logger.debug("BQ %s query: %s params: %s", table, query, params)
+        rows = list(self.client.query(query, job_config=self._job_config(params)).result())
         return [dict(row.items()) for row in rows]
 
+    def aggregate_logs(
+        self,
+        query_filter: Optional[str] = None,
+        params: Optional[Sequence[Any]] = None,
+        bucket_seconds: int = 3600,
+        group_by_sql: Optional[str] = None,
+        top_k: int = 10,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Push hunt aggregation into BigQuery: row counts per time bucket and,
+        if `group_by_sql` is given, the top-k keys with their totals, first/
+        last seen and busiest bucket. Only aggregates leave BigQuery.
+        """
+        table = f"`{self.client.project}.{self.dataset}.logs`"
+        bucket = "TIMESTAMP_SECONDS(DIV(UNIX_SECONDS(timestamp), @bucket_seconds) * @bucket_seconds)"
+        params = list(params or []) + [
+            ("bucket_seconds", "INT64", int(bucket_seconds)),
+            ("top_k", "INT64", int(top_k)),
+        ]
+        job_config = self._job_config(params)
+
+        histogram_query = f"""
+        SELECT {bucket} AS bucket, COUNT(*) AS count
+        FROM {table}
+        WHERE {query_filter or "TRUE"}
+        GROUP BY bucket
+        ORDER BY bucket
+        """
+        histogram_job = self.client.query(histogram_query, job_config=job_config)
+        top_job = None
+        if group_by_sql:
+            top_query = f"""
+            WITH per_bucket AS (
+              SELECT {group_by_sql} AS key, {bucket} AS bucket, COUNT(*) AS count,
+                     MIN(timestamp) AS first_seen, MAX(timestamp) AS last_seen
+              FROM {table}
+              WHERE {query_filter or "TRUE"}
+              GROUP BY key, bucket
+            )
+            SELECT key, SUM(count) AS count, MIN(first_seen) AS first_seen, MAX(last_seen) AS last_seen,
+                   ARRAY_AGG(STRUCT(bucket, count) ORDER BY count DESC LIMIT 1)[OFFSET(0)] AS peak
+            FROM per_bucket
+            GROUP BY key
+            ORDER BY count DESC
+            LIMIT @top_k
+            """
+            # Both jobs run concurrently on the BigQuery side
+            top_job = self.client.query(top_query, job_config=job_config)
+        logger.debug("BQ aggregate_logs filter: %s params: %s", query_filter, params)
+        return {
+            "histogram": [dict(row.items()) for row in histogram_job.result()],
+            "top": [dict(row.items()) for row in top_job.result()] if top_job else [],
+        }
+
+    def iter_logs(
+        self,
+        query_filter: Optional[str] = None,
+        limit: int = 100000,
+        params: Optional[Sequence[Any]] = None,
+        page_size: int = 10000,
+        ascending: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream log rows page by page instead of materialising the result,
+        for single-pass scanners over large windows. Newest first unless
+        `ascending`.
+        """
+        query = f"""
+        SELECT *
+        FROM `{self.client.project}.{self.dataset}.logs`
+        WHERE {query_filter or "TRUE"}
+        ORDER BY timestamp {"ASC" if ascending else "DESC"}
+        LIMIT {int(limit)}
+        """
+        logger.debug("BQ iter_logs query: %s params: %s", query, params)
+        job = self.client.query(query, job_config=self._job_config(params))
+        for row in job.result(page_size=page_size):
+            yield dict(row.items())
+
+    def iter_flow_logs(
+        self,
+        start: Any,
+        end: Any,
+        ips: Optional[Sequence[str]] = None,
+        limit: int = 5000000,
+        page_size: int = 50000,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream VPC flow log records in [start, end) flattened to src_ip,
+        dest_ip, bytes_sent and timestamp, optionally only flows to or from
+        `ips`. Unordered: the exfiltration estimator does not need a sort.
+        """
+        connection = "jsonPayload.connection"
+        where = "timestamp >= @start AND timestamp < @end"
+        params = [("start", "TIMESTAMP", start), ("end", "TIMESTAMP", end)]
+        if ips:
+            where += f" AND ({connection}.src_ip IN UNNEST(@ips) OR {connection}.dest_ip IN UNNEST(@ips))"
+            params.append(("ips", "ARRAY<STRING>", list(ips)))
+        query = f"""
+        SELECT {connection}.src_ip AS src_ip, {connection}.dest_ip AS dest_ip,
+               SAFE_CAST(jsonPayload.bytes_sent AS INT64) AS bytes_sent, timestamp
+        FROM `{self.client.project}.{self.dataset}.{self.config.flow_logs_table}`
+        WHERE {where}
+        LIMIT {int(limit)}
+        """
+        logger.debug("BQ iter_flow_logs query: %s params: %s", query, params)
+        job = self.client.query(query, job_config=self._job_config(params))
+        for row in job.result(page_size=page_size):
+            yield dict(row.items())
+
     # def query_security_logs(self, limit: int = 1000) -> List[Dict[str, Any]]:
     #     """
     #     For InvestigatorAgent forensic reconstruction.
@@ -1,19 +1,26 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import ipaddress
 from datetime import datetime
 from google.cloud import asset_v1
 from google.protobuf.field_mask_pb2 import FieldMask
 from google.protobuf.json_format import MessageToDict
+from app.tools.containment_tools import parse_instance
 from app.utils.config import PlatformConfig
+from app.utils.rate_limiter import ApiRateLimiter, get_api_limiter
 
 
 class CloudSecurityService:
-    def __init__(self, config:PlatformConfig):
+    def __init__(self, config:PlatformConfig, limiter: Optional[ApiRateLimiter] = None):
         self.project_id = config.project_id
         self.parent = f"projects/{self.project_id}"
         self.config = config
         # Initialize Asset Service client
         self.asset_client = asset_v1.AssetServiceClient()
+        self.limiter = limiter or get_api_limiter()
+
+    def _asset_call(self, fn, **kwargs):
+        # Only the first page goes through the limiter; the pager fetches the rest
+        return self.limiter.call("cloudasset", self.project_id, fn, **kwargs)
 
     def scan_network_activity(self, logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         flagged = []
@@ -37,7 +44,7 @@ class CloudSecurityService:
             content_type=asset_v1.ContentType.RESOURCE,
         )
         # Each element here is a ListAssetsResponse.AssetResponse proto
-        for resp in self.asset_client.list_assets(request=request):
+        for resp in self._asset_call(self.asset_client.list_assets, request=request):
             # Convert the entire proto to a dict
             proto_dict = MessageToDict(resp._pb)  
             # Drill in to the bits we care about
@@ -51,6 +58,66 @@ class CloudSecurityService:
             })
         return assets
 
+    def search_assets(
+        self,
+        names: List[str],
+        asset_types: Optional[List[str]] = None,
+        limit: int = 500,
+    ) -> List[Dict[str, Any]]:
+        """
+        Assets whose name matches any of `names`, optionally restricted to
+        `asset_types` (e.g. "compute.googleapis.com/Instance"). Uses the
+        Asset Inventory search index instead of listing the whole project.
+        Returns the same shape as `list_assets`.
+        """
+        terms = [n.replace('"', "") for n in names if n]
+        if not terms and not asset_types:
+            return []
+        request = asset_v1.SearchAllResourcesRequest(
+            scope=self.parent,
+            query=" OR ".join(f'name:"{t}"' for t in terms),
+            asset_types=asset_types or [],
+            page_size=min(limit, 500),
+        )
+        assets: List[Dict[str, Any]] = []
+        for result in self._asset_call(self.asset_client.search_all_resources, request=request):
+            assets.append({
+                "name":           result.name,
+                "asset_type":     result.asset_type,
+                "resource_name":  result.name,
+                "location":       result.location,
+            })
+            if len(assets) >= limit:
+                break
+        return assets
+
+    def list_instances(self, limit: int = 100000) -> List[Dict[str, Any]]:
+        """
+        Every Compute instance visible from the project, as
+        {"name", "project", "zone", "resource_name", "labels"} dicts, paged
+        from the Asset Inventory search index.
+        """
+        request = asset_v1.SearchAllResourcesRequest(
+            scope=self.parent,
+            asset_types=["compute.googleapis.com/Instance"],
+            page_size=500,
+        )
+        instances: List[Dict[str, Any]] = []
+        for result in self._asset_call(self.asset_client.search_all_resources, request=request):
+            project, zone, name = parse_instance(result.name, self.project_id)
+            if zone is None:
+                continue
+            instances.append({
+                "name":           name,
+                "project":        project,
+                "zone":           zone,
+                "resource_name":  result.name,
+                "labels":         dict(result.labels),
+            })
+            if len(instances) >= limit:
+                break
+        return instances
+
     def get_cloud_configurations(self) -> List[Dict[str, Any]]:
         """
         Retrieve current configurations of resources in the project.
@@ -62,7 +129,7 @@ class CloudSecurityService:
             content_type=asset_v1.ContentType.RESOURCE
         )
         # Optionally, you could filter by asset types (e.g., "google.compute.Instance")
-        for asset in self.asset_client.list_assets(request=request):
+        for asset in self._asset_call(self.asset_client.list_assets, request=request):
             configs.append({
                 "asset_type": asset.asset_type,
                 "resource": asset.resource.name,
@@ -0,0 +1,94 @@
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from app.models.containment_action import ContainmentAction
+
+logger = logging.getLogger(__name__)
+
+
+class ContainmentTask(NamedTuple):
+    """One (resource, action) pair; `run` receives the per-action timeout."""
+    resource_id: str
+    action_type: str
+    project_id: str
+    run: Callable[[Optional[float]], ContainmentAction]
+
+
+def failed_action(task: ContainmentTask, message: str) -> ContainmentAction:
+    return ContainmentAction(
+        resource_id=task.resource_id,
+        action_type=task.action_type,
+        status="failed",
+        justification=message,
+    )
+
+
+class ContainmentExecutor:
+    """
+    Runs containment tasks on a bounded thread pool.
+
+    - at most `max_workers` actions in flight;
+    - API calls are paced inside the tasks, by the shared per-API,
+      per-project limiter (`get_api_limiter`), not here;
+    - an action running longer than `action_timeout_seconds` is reported
+      as failed (its API call also gets that deadline), so one hung call
+      never stalls the batch.
+    Results come back in task order.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 32,
+        action_timeout_seconds: float = 30.0,
+    ):
+        self.max_workers = max_workers
+        self.action_timeout_seconds = action_timeout_seconds
+
+    def _call(self, task: ContainmentTask, started: Dict[int, float], index: int, lock: threading.Lock) -> ContainmentAction:
+        with lock:
+            started[index] = time.monotonic()
+        try:
+            return task.run(self.action_timeout_seconds)
+        except Exception as e:
+            logger.error("Containment %s on %s failed: %s", task.action_type, task.resource_id, e)
+            return failed_action(task, str(e))
+
+    def run(self, tasks: Sequence[ContainmentTask]) -> List[ContainmentAction]:
+        results: List[Optional[ContainmentAction]] = [None] * len(tasks)
+        if not tasks:
+            return []
+        started: Dict[int, float] = {}
+        lock = threading.Lock()
+        workers = max(1, min(self.max_workers, len(tasks)))
+        pool = ThreadPoolExecutor(max_workers=workers)
+        futures = {pool.submit(self._call, task, started, i, lock): i for i, task in enumerate(tasks)}
+        pending = set(futures)
+        # Backstop if abandoned calls keep every worker busy: nothing may
+        # still be queued after every wave has had its full timeout
+        waves = -(-len(tasks) // workers) + 1
+        deadline = time.monotonic() + waves * self.action_timeout_seconds
+        while pending:
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[futures[future]] = future.result()
+            now = time.monotonic()
+            with lock:
+                overdue = {
+                    f for f in pending
+                    if futures[f] in started and now - started[futures[f]] > self.action_timeout_seconds
+                }
+            for future in overdue:
+                i = futures[future]
+                results[i] = failed_action(tasks[i], f"Timed out after {self.action_timeout_seconds}s")
+            pending -= overdue
+            if now > deadline:
+                for future in pending:
+                    i = futures[future]
+                    results[i] = failed_action(tasks[i], "Not started before the batch deadline")
+                break
+        # Abandoned calls finish in the background; don't block on them
+        pool.shutdown(wait=False, cancel_futures=True)
+        return results
@@ -0,0 +1,112 @@
+import math
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.containment_plan import ContainmentPlan, ImpactedService, PlannedAction
+from app.models.containment_policy import ContainmentPolicy
+from app.services.idempotency import IdempotencyCache
+from app.services.instance_index import InstanceIndex, locate_instances
+from app.tools.operation_tools import LIST_BATCH
+
+SUPPORTED_ACTIONS = ("isolate_vm", "disable_account", "tag_vm")
+
+
+def dedup_key(planned: PlannedAction, policy_id: str) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+    """The (action, resource, params) key ContainmentService deduplicates this action under."""
+    if planned.action_type == "isolate_vm":
+        return "isolate_vm", f"{planned.project_id}/{planned.zone}/{planned.instance}", None
+    if planned.action_type == "tag_vm":
+        return "tag_vm", planned.resource_id, {"policy": policy_id}
+    return planned.action_type, planned.resource_id, None
+
+
+class ContainmentPlanner:
+    """
+    Dry-runs a ContainmentPolicy against the cached instance index and
+    the dedup cache only (never the cloud): resolves every VM, counts the
+    API calls the run would make (duplicates and actions already done
+    within the dedup TTL cost nothing) and reports which labelled
+    services lose instances. The resulting plan is what
+    ContainmentService.execute_plan runs.
+    """
+
+    def __init__(self, project_id: str, index: Optional[InstanceIndex] = None, dedup: Optional[IdempotencyCache] = None):
+        self.project_id = project_id
+        self.index = index
+        self.dedup = dedup
+
+    def plan(self, policy: ContainmentPolicy, refresh: Optional[bool] = None) -> ContainmentPlan:
+        """
+        `refresh` lets a stale or missing index reload first (a cloud call).
+        By default only an index that was never loaded is loaded, so a
+        fresh process does not report every bare VM name as unknown.
+        """
+        if refresh is None:
+            refresh = self.index is not None and self.index.age_seconds is None
+        vm_actions = "isolate_vm" in policy.actions
+        resolved, errors = (
+            locate_instances(policy.target_resources, self.project_id, self.index, refresh)
+            if vm_actions else ({}, {})
+        )
+        actions: List[PlannedAction] = []
+        seen = set()
+        for resource in policy.target_resources:
+            for action in policy.actions:
+                planned = self._plan_action(resource, action, resolved, errors)
+                if planned.skip_reason is None:
+                    key = IdempotencyCache.key(*dedup_key(planned, policy.id))
+                    if key in seen:
+                        planned.api_calls, planned.skip_reason = 0, "duplicate of an earlier target"
+                    elif self.dedup is not None and self.dedup.would_reuse_key(key):
+                        planned.api_calls, planned.skip_reason = 0, "already done or in flight; result reused"
+                    seen.add(key)
+                actions.append(planned)
+
+        stops = [a for a in actions if a.action_type == "isolate_vm" and a.api_calls]
+        per_zone = Counter((a.project_id, a.zone) for a in stops)
+        return ContainmentPlan(
+            policy_id=policy.id,
+            actions=actions,
+            resources=len(set(policy.target_resources)),
+            projects=sorted({a.project_id for a in actions if a.api_calls}),
+            zones=sorted({a.zone for a in actions if a.zone}),
+            estimated_api_calls=sum(a.api_calls for a in actions),
+            estimated_poll_calls_per_cycle=sum(math.ceil(n / LIST_BATCH) for n in per_zone.values()),
+            impacted_services=self._impact(actions),
+            unresolved=sorted({a.resource_id for a in actions if a.action_type == "isolate_vm" and a.instance is None}),
+            index_age_seconds=self.index.age_seconds if self.index is not None else None,
+        )
+
+    def _plan_action(
+        self,
+        resource: str,
+        action: str,
+        resolved: Dict[str, Tuple[str, str, str]],
+        errors: Dict[str, str],
+    ) -> PlannedAction:
+        if action not in SUPPORTED_ACTIONS:
+            return PlannedAction(resource_id=resource, action_type=action, project_id=self.project_id,
+                                 api_calls=0, skip_reason=f"Unsupported action {action}")
+        if action != "isolate_vm":
+            return PlannedAction(resource_id=resource, action_type=action, project_id=self.project_id)
+        if resource not in resolved:
+            return PlannedAction(resource_id=resource, action_type=action, project_id=self.project_id,
+                                 api_calls=0, skip_reason=errors.get(resource, "Not resolved"))
+        project, zone, name = resolved[resource]
+        services = self.index.services(resolved[resource]) if self.index is not None else []
+        return PlannedAction(resource_id=resource, action_type=action, project_id=project,
+                             zone=zone, instance=name, services=services)
+
+    def _impact(self, actions: List[PlannedAction]) -> List[ImpactedService]:
+        targeted: Dict[str, set] = defaultdict(set)
+        for a in actions:
+            if a.action_type == "isolate_vm" and a.instance is not None:
+                for service in a.services:
+                    targeted[service].add((a.project_id, a.zone, a.instance))
+        impacted = []
+        for service, vms in targeted.items():
+            total = max(self.index.service_size(service) if self.index is not None else 0, len(vms))
+            impacted.append(ImpactedService(
+                service=service, targeted_instances=len(vms), total_instances=total, fully_down=len(vms) >= total,
+            ))
+        return sorted(impacted, key=lambda s: (not s.fully_down, -s.targeted_instances, s.service))
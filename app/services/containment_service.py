@@ -1,38 +1,150 @@
-from typing import List
+from collections import defaultdict
+from itertools import zip_longest
+from typing import Dict, List, Optional, Tuple
+from google.cloud import compute_v1
 from app.tools.containment_tools import isolate_vm, disable_account, tag_vm
 from app.models.containment_action import ContainmentAction
+from app.models.containment_plan import ContainmentPlan, PlannedAction
 from app.models.containment_policy import ContainmentPolicy
+from app.services.containment_executor import ContainmentExecutor, ContainmentTask, failed_action
+from app.services.containment_planner import ContainmentPlanner
+from app.services.idempotency import IdempotencyCache
+from app.services.instance_index import InstanceIndex, locate_instances
+from app.services.operation_tracker import OperationTracker
+from app.tools.operation_tools import ZONE_OPERATION
 from app.utils.config import PlatformConfig
+from app.utils.rate_limiter import ApiRateLimiter
 
 class ContainmentService:
-    def __init__(self, config: PlatformConfig):
+    def __init__(
+        self,
+        config: PlatformConfig,
+        executor: Optional[ContainmentExecutor] = None,
+        tracker: Optional[OperationTracker] = None,
+        index: Optional[InstanceIndex] = None,
+        dedup: Optional[IdempotencyCache] = None,
+        limiter: Optional[ApiRateLimiter] = None,
+    ):
         self.project_id = config.project_id
+        self.executor = executor or ContainmentExecutor()
+        # None: VM stops share the process-wide (api, project) limiter with every other Compute caller
+        self.limiter = limiter
+        self.tracker = tracker or OperationTracker()
+        self.index = index
+        # Repeated requests for the same action within the TTL reuse the first result
+        self.dedup = dedup or IdempotencyCache(ContainmentAction)
+        self.planner = ContainmentPlanner(self.project_id, index, self.dedup)
+        self._instances_client: Optional[compute_v1.InstancesClient] = None
+
+    @property
+    def instances_client(self) -> compute_v1.InstancesClient:
+        """One Compute client shared by all worker threads (created lazily)."""
+        if self._instances_client is None:
+            self._instances_client = compute_v1.InstancesClient()
+        return self._instances_client
+
+    def _track(self, action: ContainmentAction, project: str, zone: str, key: str) -> ContainmentAction:
+        if action.operation:
+            self.tracker.track(action, ZONE_OPERATION, f"{project}/{zone}", action.operation)
+            # journal the settled status too, so a failed stop is retried rather than deduplicated
+            self.tracker.subscribe(action.operation, lambda settled: self.dedup.record("isolate_vm", key, None, settled))
+        return action
+
+    def _locate(self, resources: List[str]) -> Tuple[Dict[str, Tuple[str, str, str]], Dict[str, str]]:
+        """(project, zone, instance) per VM reference, plus why any could not be located."""
+        return locate_instances(resources, self.project_id, self.index)
+
+    def _isolate_task(self, resource: str, location: Optional[Tuple[str, str, str]], error: Optional[str]) -> ContainmentTask:
+        if location is None:
+            task = ContainmentTask(resource, "isolate_vm", self.project_id, None)
+            return task._replace(run=lambda timeout: failed_action(task, error))
+        project, zone, name = location
+        key = f"{project}/{zone}/{name}"
+        return ContainmentTask(resource, "isolate_vm", project, lambda timeout: self.dedup.run(
+            "isolate_vm", key, None, lambda: self._track(isolate_vm(
+                name, zone, project, client=self.instances_client, timeout=timeout, limiter=self.limiter,
+            ), project, zone, key),
+        ))
+
+    def perform_vm_isolation(self, instance_name: str, zone: Optional[str] = None) -> ContainmentAction:
+        """Stop one VM; without `zone` its location comes from the instance index."""
+        if zone is not None:
+            instance_name = f"{zone}/{instance_name}"
+        resolved, errors = self._locate([instance_name])
+        task = self._isolate_task(instance_name, resolved.get(instance_name), errors.get(instance_name))
+        return task.run(self.executor.action_timeout_seconds)
+
+    def bulk_isolate(self, resources: List[str]) -> List[ContainmentAction]:
+        """
+        Stop many VMs at once. Locations are resolved in one index pass;
+        the stops are grouped per zone and interleaved across zones so
+        every zone makes progress even when the batch exceeds the worker
+        pool. Results are returned in input order.
+        """
+        resolved, errors = self._locate(resources)
+        tasks = [self._isolate_task(r, resolved.get(r), errors.get(r)) for r in resources]
+        zones: Dict[Optional[Tuple[str, str]], List[int]] = defaultdict(list)
+        for i, resource in enumerate(resources):
+            location = resolved.get(resource)
+            zones[location[:2] if location else None].append(i)
+        order = [i for wave in zip_longest(*zones.values()) for i in wave if i is not None]
+        results: List[Optional[ContainmentAction]] = [None] * len(tasks)
+        for i, action in zip(order, self.executor.run([tasks[i] for i in order]), strict=True):
+            results[i] = action
+        return results
+
+    def wait_for_action(self, operation: str, timeout: Optional[float] = None) -> ContainmentAction:
+        """The action settled by `operation`, after waiting up to `timeout` for it."""
+        return self.tracker.wait(operation, timeout)
 
-    def perform_vm_isolation(self, instance_name: str, zone: str) -> ContainmentAction:
-        return isolate_vm(
-            instance_name=instance_name,
-            zone=zone,
-            project_id=self.project_id,
-        )
-    
     def lock_user_account(self, account_id: str) -> ContainmentAction:
-        return disable_account(account_id)
+        return self.dedup.run("disable_account", account_id, None, lambda: disable_account(account_id))
 
     def tag_vm_for_audit(self, resource_id: str, tags: dict[str,str]) -> ContainmentAction:
-        return tag_vm(resource_id, tags)
+        return self.dedup.run("tag_vm", resource_id, tags, lambda: tag_vm(resource_id, tags))
+
+    def _planned_task(self, planned: PlannedAction, policy_id: str) -> Optional[ContainmentTask]:
+        resource, action = planned.resource_id, planned.action_type
+        if action == "isolate_vm":
+            location = (planned.project_id, planned.zone, planned.instance) if planned.instance else None
+            return self._isolate_task(resource, location, planned.skip_reason)
+        if action == "disable_account":
+            return ContainmentTask(resource, action, self.project_id, lambda timeout: self.lock_user_account(resource))
+        if action == "tag_vm":
+            # tag with policy id for audit
+            return ContainmentTask(resource, action, self.project_id, lambda timeout: self.tag_vm_for_audit(resource, {"policy": policy_id}))
+        return None
+
+    def plan_policy(self, policy: ContainmentPolicy, refresh: Optional[bool] = None) -> ContainmentPlan:
+        """
+        Dry run: the actions, API calls and impacted services, from cached
+        state only (the instance index is loaded once if it never was).
+        """
+        return self.planner.plan(policy, refresh=refresh)
+
+    def execute_plan(self, plan: ContainmentPlan) -> List[ContainmentAction]:
+        """
+        Run a precomputed plan as-is (no re-resolution). All actions run
+        concurrently through the executor; results are returned in plan
+        order, minus unsupported actions. VM stops come back "pending"
+        and are settled by the operation tracker.
+        """
+        tasks = [
+            task
+            for planned in plan.actions
+            if (task := self._planned_task(planned, plan.policy_id)) is not None
+        ]
+        return self.executor.run(tasks)
 
     def apply_policy(self, policy: ContainmentPolicy) -> List[ContainmentAction]:
         """
-        Apply a set of containment actions based on the policy.
-        """
-        results: List[ContainmentAction] = []
-        for res in policy.target_resources:
-            for action in policy.actions:
-                if action == "isolate_vm":
-                    results.append(isolate_vm(res))
-                elif action == "disable_account":
-                    results.append(disable_account(res))
-                elif action == "tag_vm":
-                    # tag with policy id for audit
-                    results.append(tag_vm(res, {"policy": policy.id}))
-        return results
+        Apply a set of containment actions based on the policy: plan it
+        (letting the instance index refresh if needed), then execute the
+        plan. Results are returned in resource-then-action order.
+        """
+        return self.execute_plan(self.plan_policy(policy, refresh=True))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_instances_client"] = None
+        return state
@@ -1,24 +1,92 @@
-from app.tools.anomaly_tools import detect_network_anomalies
+import logging
+import os
+from typing import Optional
+from app.tools.anomaly_tools import (
+    detect_auth_anomalies,
+    detect_beaconing_anomalies,
+    detect_network_anomalies,
+    score_behavior_anomalies,
+)
+from app.tools.anomaly_model import IsolationForestModel, build_entity_features
+from app.services.anomaly_writer import AnomalyWriter
 from app.services.bigquery_service import BigQueryService
 from app.services.cloud_security_service import CloudSecurityService
 
+logger = logging.getLogger(__name__)
+
 class DetectronService:
-    def __init__(self, bq_service: BigQueryService, security_service: CloudSecurityService):
+    def __init__(
+        self,
+        bq_service: BigQueryService,
+        security_service: CloudSecurityService,
+        model_path: Optional[str] = None,
+        score_threshold: float = 0.65,
+        writer: Optional[AnomalyWriter] = None,
+    ):
         self.bq = bq_service
         self.security = security_service
+        self.model_path = model_path
+        self.score_threshold = score_threshold
+        # Persistence runs off the request path
+        self.writer = writer or AnomalyWriter(bq_service)
+        # Trained behaviour model, kept in memory between detect() calls
+        self._model: Optional[IsolationForestModel] = None
+
+    def train_model(self, limit: int = 50000) -> IsolationForestModel:
+        """
+        Offline training: fit the behaviour model on a large log window,
+        persist it to `model_path` (if set) and cache it for detection.
+        """
+        logs = self.bq.query_logs(query_filter="TRUE", limit=limit)
+        _, features, _ = build_entity_features(logs)
+        model = IsolationForestModel().fit(features)
+        if self.model_path:
+            model.save(self.model_path)
+        self._model = model
+        return model
+
+    def _get_model(self, logs: list[dict]) -> Optional[IsolationForestModel]:
+        if self._model is not None:
+            return self._model
+        if self.model_path and os.path.exists(self.model_path):
+            self._model = IsolationForestModel.load(self.model_path)
+            return self._model
+        # No offline artifact yet: bootstrap from the current window
+        _, features, _ = build_entity_features(logs)
+        if len(features) < 2:
+            return None
+        logger.info("No trained anomaly model found; fitting on %d entities", len(features))
+        self._model = IsolationForestModel().fit(features)
+        return self._model
 
     def detect_anomalies(self, limit: int = 1000) -> list[dict]:
         logs = self.bq.query_logs(query_filter="TRUE", limit=limit)
         indicators = self.security.scan_network_activity(logs)
         anomalies = detect_network_anomalies(logs, indicators)
+        anomalies += detect_beaconing_anomalies(logs)
+        anomalies += detect_auth_anomalies(logs)
+
+        model = self._get_model(logs)
+        scored = score_behavior_anomalies(logs, model) if model else []
 
         # Convert Pydantic → dict with ISO timestamps
         json_ready = [
             {**a.model_dump(), "timestamp": a.timestamp.isoformat()}
-            for a in anomalies
+            for a in anomalies + scored
+        ]
+        # Persist to BigQuery in the background: every scored entity in one bulk insert
+        self.writer.submit(json_ready)
+
+        return [
+            row for row in json_ready
+            if row["source"] != "behavior-model" or row["anomaly_score"] >= self.score_threshold
         ]
-        # Persist to BigQuery
-        if json_ready:
-            self.bq.insert_anomalies(json_ready)
 
-        return json_ready
+    def persistence_status(self, flush: bool = False, timeout: float = 30.0) -> dict:
+        """
+        Report background anomaly writes (pending/written/failed rows and
+        recent errors), optionally waiting for the queue to drain first.
+        """
+        if flush:
+            return self.writer.flush(timeout=timeout)
+        return self.writer.status()
@@ -0,0 +1,308 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Type, TypeVar
+
+from google.cloud import storage
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+A = TypeVar("A", bound=BaseModel)
+
+
+class ActionJournal:
+    """
+    Append-only JSONL journal of action results. Every record is appended
+    to a local file straight away (a buffered write, no fsync) and queued
+    for upload; a background thread ships queued records to
+    gs://`bucket_name`/`prefix`/ as one new object per batch, once
+    `flush_batch` records are waiting or every `flush_interval_seconds`.
+    Callers never wait on Cloud Storage.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        bucket_name: Optional[str] = None,
+        prefix: str = "journal",
+        flush_interval_seconds: float = 30.0,
+        flush_batch: int = 100,
+        max_queued: int = 10000,
+        storage_client: Optional[storage.Client] = None,
+    ):
+        self.path = path
+        self.bucket_name = bucket_name
+        self.prefix = prefix.strip("/")
+        self.flush_interval_seconds = flush_interval_seconds
+        self.flush_batch = flush_batch
+        self.max_queued = max_queued
+        self._storage_client = storage_client
+        self._queue: List[str] = []
+        self._file = None
+        self._cond = threading.Condition()
+        self._flusher: Optional[threading.Thread] = None
+        self._closed = False
+        if bucket_name:
+            atexit.register(self.close)  # ship the tail of the queue on shutdown
+
+    @property
+    def storage_client(self) -> storage.Client:
+        if self._storage_client is None:
+            self._storage_client = storage.Client()
+        return self._storage_client
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """Records from the local journal, oldest first (a torn last line is skipped)."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Skipping unreadable journal line in %s", self.path)
+
+    def compact(self, records: List[Dict[str, Any]]) -> None:
+        """Atomically replace the local journal with `records` (remote batches are untouched)."""
+        with self._cond:
+            self._close_file()
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(r, default=str) + "\n" for r in records)
+            os.replace(tmp, self.path)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, default=str) + "\n"
+        with self._cond:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            if not self.bucket_name:
+                return
+            self._queue.append(line)
+            if len(self._queue) > self.max_queued:
+                dropped = len(self._queue) - self.max_queued
+                del self._queue[:dropped]
+                logger.warning("Journal upload backlog full; %d records kept only locally", dropped)
+            if self._flusher is None or not self._flusher.is_alive():
+                self._closed = False
+                self._flusher = threading.Thread(target=self._run, name="journal-flusher", daemon=True)
+                self._flusher.start()
+            if len(self._queue) >= self.flush_batch:
+                self._cond.notify()
+
+    def flush(self) -> int:
+        """Upload everything queued as one object; returns the records shipped."""
+        with self._cond:
+            batch, self._queue = self._queue, []
+        if not batch:
+            return 0
+        now = datetime.utcnow()
+        name = f"{self.prefix}/{now:%Y/%m/%d}/{now:%H%M%S%f}-{uuid.uuid4().hex[:8]}.jsonl"
+        try:
+            blob = self.storage_client.bucket(self.bucket_name).blob(name)
+            blob.upload_from_string("".join(batch), content_type="application/x-ndjson")
+        except Exception as e:
+            logger.warning("Journal upload to gs://%s/%s failed, will retry: %s", self.bucket_name, name, e)
+            with self._cond:
+                self._queue[:0] = batch
+            return 0
+        return len(batch)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._closed and len(self._queue) < self.flush_batch:
+                    self._cond.wait(self.flush_interval_seconds)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self) -> None:
+        """Stop the flusher after a final upload and close the local file."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            flusher = self._flusher
+        if flusher is not None:
+            flusher.join(timeout=10)
+        with self._cond:
+            self._close_file()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_storage_client"] = None
+        state["_file"] = None
+        state["_cond"] = None
+        state["_flusher"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._cond = threading.Condition()
+
+
+class _Entry:
+    def __init__(self, at: float):
+        self.at = at
+        self.result: Optional[BaseModel] = None
+        self.done = threading.Event()
+
+
+class IdempotencyCache:
+    """
+    TTL cache of action results keyed by (action, resource, params).
+
+    `run` executes an action at most once per `ttl_seconds`: a duplicate
+    that arrives while the first call is in flight waits for it (up to
+    `in_flight_wait_seconds`) and a later duplicate gets the recorded
+    result back, unless that result failed, in which case the action is
+    retried. Results are journaled, so recent actions survive a restart,
+    except still-pending ones: their operations were tracked by the old
+    process and would never settle.
+    """
+
+    def __init__(
+        self,
+        model: Type[A],
+        journal: Optional[ActionJournal] = None,
+        ttl_seconds: float = 600.0,
+        in_flight_wait_seconds: float = 60.0,
+        max_entries: int = 10000,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.model = model
+        self.journal = journal
+        self.ttl_seconds = ttl_seconds
+        self.in_flight_wait_seconds = in_flight_wait_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        if journal is not None:
+            self._load()
+
+    @staticmethod
+    def key(action: str, resource: str, params: Optional[Dict[str, Any]] = None) -> str:
+        payload = json.dumps([action, resource, params or {}], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _load(self) -> None:
+        now = self._clock()
+        latest: Dict[str, Dict[str, Any]] = {}
+        total = 0
+        for record in self.journal.replay():
+            total += 1
+            latest.pop(record["key"], None)  # keep replay order = recency order
+            latest[record["key"]] = record
+        live = [r for r in latest.values() if now - r["at"] <= self.ttl_seconds]
+        for record in live:
+            if record["result"].get("status") == "pending":
+                continue
+            entry = _Entry(record["at"])
+            try:
+                entry.result = self.model(**record["result"])
+            except Exception as e:
+                logger.warning("Skipping journal record %s: %s", record["key"], e)
+                continue
+            entry.done.set()
+            self._entries[record["key"]] = entry
+        if total > 2 * len(live) + 1000:
+            self.journal.compact(live)
+        logger.info("Idempotency cache loaded %d live of %d journaled results", len(self._entries), total)
+
+    def _prune(self, now: float) -> None:
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            expired = entry.done.is_set() and now - entry.at > self.ttl_seconds
+            if not expired and len(self._entries) <= self.max_entries:
+                return
+            del self._entries[key]
+
+    def would_reuse(self, action: str, resource: str, params: Optional[Dict[str, Any]] = None) -> bool:
+        """Whether `run` would skip the call right now (in flight, or recently succeeded)."""
+        return self.would_reuse_key(self.key(action, resource, params))
+
+    def would_reuse_key(self, key: str) -> bool:
+        """`would_reuse` for a precomputed `key(...)`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            if not entry.done.is_set():
+                return True
+            fresh = self._clock() - entry.at <= self.ttl_seconds
+            return fresh and entry.result is not None and entry.result.status != "failed"
+
+    def record(self, action: str, resource: str, params: Optional[Dict[str, Any]], result: A) -> None:
+        """Store (and journal) `result` as the latest outcome for this action."""
+        key = self.key(action, resource, params)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(now)
+            self._entries.move_to_end(key)
+            entry.at = now
+            entry.result = result
+        entry.done.set()
+        if self.journal is not None:
+            self.journal.append({
+                "key": key, "at": now, "action": action, "resource": resource,
+                "params": params or {}, "result": result.model_dump(),
+            })
+
+    def run(self, action: str, resource: str, params: Optional[Dict[str, Any]], fn: Callable[[], A]) -> A:
+        key = self.key(action, resource, params)
+        with self._lock:
+            now = self._clock()
+            self._prune(now)
+            entry = self._entries.get(key)
+            fresh = entry is not None and (not entry.done.is_set() or now - entry.at <= self.ttl_seconds)
+            if not fresh:
+                entry = self._entries[key] = _Entry(now)
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            entry.done.wait(self.in_flight_wait_seconds)
+            result = entry.result
+            if result is not None and result.status != "failed":
+                logger.info("Duplicate %s on %s; reusing the result from %.0fs ago", action, resource, now - entry.at)
+                return result
+        try:
+            result = fn()
+        except Exception:
+            with self._lock:
+                if self._entries.get(key) is entry and entry.result is None:
+                    del self._entries[key]
+            entry.done.set()
+            raise
+        self.record(action, resource, params, result)
+        return result
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_entries"] = OrderedDict()
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
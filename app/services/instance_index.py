@@ -0,0 +1,174 @@
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.tools.containment_tools import parse_instance
+
+logger = logging.getLogger(__name__)
+
+Location = Tuple[str, str]  # (project, zone)
+
+
+class InstanceIndex:
+    """
+    Instance name -> (project, zone) lookup, rebuilt from the asset
+    inventory (`source`, e.g. CloudSecurityService.list_instances) when
+    older than `ttl_seconds`. A name that is not in the index triggers at
+    most one early refresh per `miss_refresh_seconds`, so a freshly created
+    VM is found without every unknown name costing an inventory scan.
+
+    Instance labels are kept too: the values of `service_label_keys`
+    name the services a VM serves, which lets containment planning
+    estimate impact without calling the cloud.
+    """
+
+    def __init__(
+        self,
+        source: Callable[[], List[Dict[str, Any]]],
+        ttl_seconds: float = 900.0,
+        miss_refresh_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        service_label_keys: Sequence[str] = ("service", "app"),
+    ):
+        self.source = source
+        self.service_label_keys = tuple(service_label_keys)
+        self.ttl_seconds = ttl_seconds
+        self.miss_refresh_seconds = miss_refresh_seconds
+        self._clock = clock
+        self._locations: Dict[str, List[Location]] = {}
+        self._services: Dict[Tuple[str, str, str], List[str]] = {}
+        self._service_sizes: Counter = Counter()
+        self._refreshed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> int:
+        """Rebuild the index from the inventory; returns the instance count."""
+        instances = self.source()
+        locations: Dict[str, List[Location]] = {}
+        services: Dict[Tuple[str, str, str], List[str]] = {}
+        for inst in instances:
+            locations.setdefault(inst["name"], []).append((inst["project"], inst["zone"]))
+            labels = inst.get("labels") or {}
+            served = sorted({labels[k] for k in self.service_label_keys if labels.get(k)})
+            if served:
+                services[(inst["project"], inst["zone"], inst["name"])] = served
+        with self._lock:
+            self._locations = locations
+            self._services = services
+            self._service_sizes = Counter(svc for served in services.values() for svc in served)
+            self._refreshed_at = self._clock()
+        logger.info("Instance index refreshed: %d instances", len(instances))
+        return len(instances)
+
+    @property
+    def age_seconds(self) -> Optional[float]:
+        """Seconds since the last refresh (None if never refreshed)."""
+        with self._lock:
+            return None if self._refreshed_at is None else self._clock() - self._refreshed_at
+
+    def services(self, location: Tuple[str, str, str]) -> List[str]:
+        """Services (by label) running on the VM at (project, zone, instance)."""
+        with self._lock:
+            return list(self._services.get(location, []))
+
+    def service_size(self, service: str) -> int:
+        """How many indexed VMs serve `service`."""
+        with self._lock:
+            return self._service_sizes[service]
+
+    def _ensure(self, missing: bool = False) -> None:
+        with self._lock:
+            age = None if self._refreshed_at is None else self._clock() - self._refreshed_at
+        if age is None or age > self.ttl_seconds or (missing and age > self.miss_refresh_seconds):
+            self.refresh()
+
+    def _pick(self, name: str, project: str) -> Optional[Location]:
+        with self._lock:
+            candidates = self._locations.get(name, [])
+        in_project = [loc for loc in candidates if loc[0] == project]
+        if len(in_project) == 1:
+            return in_project[0]
+        if len(candidates) == 1:
+            return candidates[0]
+        if candidates:
+            zones = ", ".join(f"{p}/{z}" for p, z in candidates)
+            raise ValueError(f"Instance {name} is ambiguous ({zones}); use zone/instance or a full resource name")
+        return None
+
+    def resolve_many(
+        self, resources: Iterable[str], default_project: str, refresh: bool = True,
+    ) -> Tuple[Dict[str, Tuple[str, str, str]], Dict[str, str]]:
+        """
+        Map each VM reference to (project, zone, instance). References that
+        already carry a zone are parsed as-is; bare names are looked up,
+        with a single refresh covering all misses (none at all if not
+        `refresh`). Returns (resolved, errors) where `errors` explains
+        every reference left unresolved (unknown, or found in several
+        zones).
+        """
+        resolved: Dict[str, Tuple[str, str, str]] = {}
+        errors: Dict[str, str] = {}
+        bare: Dict[str, Tuple[str, str]] = {}
+        for resource in resources:
+            project, zone, name = parse_instance(resource, default_project)
+            if zone is None:
+                bare[resource] = (project, name)
+            else:
+                resolved[resource] = (project, zone, name)
+        for attempt in range(2 if refresh else 1):
+            if not bare:
+                break
+            try:
+                if refresh:
+                    self._ensure(missing=attempt > 0)
+            except Exception as e:
+                # fall back to whatever the last refresh produced
+                logger.warning("Instance index refresh failed: %s", e)
+            for resource, (project, name) in list(bare.items()):
+                try:
+                    location = self._pick(name, project)
+                except ValueError as e:
+                    errors[resource] = str(e)
+                    del bare[resource]
+                    continue
+                if location is not None:
+                    resolved[resource] = (location[0], location[1], name)
+                    del bare[resource]
+        for resource, (_project, name) in bare.items():
+            errors[resource] = f"Instance {name} not found in the asset inventory"
+        return resolved, errors
+
+    def resolve(self, resource: str, default_project: str) -> Tuple[str, str, str]:
+        """Like `resolve_many` for one reference; raises KeyError if it can't be located."""
+        resolved, errors = self.resolve_many([resource], default_project)
+        if resource in errors:
+            raise KeyError(errors[resource])
+        return resolved[resource]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def locate_instances(
+    resources: Iterable[str], default_project: str, index: Optional[InstanceIndex] = None, refresh: bool = True,
+) -> Tuple[Dict[str, Tuple[str, str, str]], Dict[str, str]]:
+    """`index.resolve_many`, or plain parsing (bare names unresolved) when there is no index."""
+    if index is not None:
+        return index.resolve_many(resources, default_project, refresh)
+    resolved: Dict[str, Tuple[str, str, str]] = {}
+    errors: Dict[str, str] = {}
+    for resource in resources:
+        project, zone, name = parse_instance(resource, default_project)
+        if zone is None:
+            errors[resource] = f"Zone unknown for {resource}; use zone/instance or a full resource name"
+        else:
+            resolved[resource] = (project, zone, name)
+    return resolved, errors
@@ -0,0 +1,243 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.models.investigation_result import ExfiltrationEstimate, InvestigationResult
+from app.tools.attack_graph import AttackGraph
+from app.tools.investigation_tools import EventBatch, build_attack_graph, concat_events, take_events
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cases (
+    case_id TEXT PRIMARY KEY,
+    watermark REAL,
+    assets_json TEXT NOT NULL,
+    assets_at REAL NOT NULL,
+    result_json TEXT,
+    seeds_json TEXT NOT NULL DEFAULT '[]',
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    case_id TEXT NOT NULL,
+    ts REAL,
+    message TEXT NOT NULL,
+    principal TEXT,
+    host TEXT,
+    ip TEXT,
+    stage INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_case ON events (case_id);
+"""
+
+
+def _text(value: Any) -> Optional[str]:
+    return None if value is None or value == "" else str(value)
+
+
+class InvestigationCase:
+    """
+    Working state of one investigation: the extracted events seen so far,
+    the asset inventory, the evidence watermark (newest event timestamp),
+    the last result and the attack graph. Graph and result are dropped
+    whenever events or assets change; the graph is rebuilt lazily.
+    """
+
+    def __init__(
+        self,
+        case_id: str,
+        events: EventBatch,
+        assets: List[Dict[str, Any]],
+        assets_at: float,
+        watermark: Optional[float] = None,
+        result: Optional[InvestigationResult] = None,
+        seeds: Optional[List[str]] = None,
+    ):
+        self.case_id = case_id
+        self.events = events
+        self.assets = assets
+        self.assets_at = assets_at
+        self.watermark = watermark
+        self.result = result
+        # Entities the case is scoped to; empty means all logs
+        self.seeds = seeds or []
+        # Flow-log exfiltration estimate and when it was computed (not
+        # persisted separately; it is part of the stored result)
+        self.exfiltration: Optional[ExfiltrationEstimate] = result.exfiltration if result else None
+        self.flows_at: Optional[float] = None
+        self._graph: Optional[AttackGraph] = None
+
+    @property
+    def graph(self) -> AttackGraph:
+        if self._graph is None:
+            self._graph = build_attack_graph(self.events, self.assets)
+        return self._graph
+
+    def append(self, new: EventBatch, max_events: int) -> None:
+        """
+        Add new evidence, keeping only the `max_events` most recently
+        ingested events, and advance the watermark.
+        """
+        if not len(new.ts):
+            return
+        events = concat_events([self.events, new])
+        if len(events.ts) > max_events:
+            events = take_events(events, np.arange(len(events.ts) - max_events, len(events.ts)))
+        self.events = events
+        newest = np.nanmax(new.ts) if not np.isnan(new.ts).all() else None
+        if newest is not None and (self.watermark is None or newest > self.watermark):
+            self.watermark = float(newest)
+        self._graph = None
+        self.result = None
+
+    def set_assets(self, assets: List[Dict[str, Any]], fetched_at: float) -> None:
+        self.assets, self.assets_at = assets, fetched_at
+        self._graph = None
+        self.result = None
+
+    def set_exfiltration(self, estimate: ExfiltrationEstimate, computed_at: float) -> None:
+        self.exfiltration, self.flows_at = estimate, computed_at
+        self.result = None
+
+    def merge_assets(self, assets: List[Dict[str, Any]], fetched_at: float) -> None:
+        """Add assets found by a scoped lookup; the graph is kept if none are new."""
+        known = {a.get("name") for a in self.assets}
+        fresh = [a for a in assets if a.get("name") not in known]
+        if fresh:
+            self.set_assets(self.assets + fresh, fetched_at)
+
+
+class InvestigationCaseStore:
+    """
+    Investigation cases persisted in a local SQLite database under the
+    state directory, fronted by a small LRU of loaded cases. Events are
+    stored already classified, so reopening a case never re-parses logs.
+    `path=None` keeps cases in memory only.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_cached: int = 16, max_events: int = 200000):
+        self.path = path
+        self.max_cached = max_cached
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, InvestigationCase]" = OrderedDict()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        if not self._ready:
+            conn.executescript(_SCHEMA)
+            self._ready = True
+        return conn
+
+    def _transaction(self):
+        """Connection that commits on success and is always closed."""
+        return closing(self._connect())
+
+    def _remember(self, case: InvestigationCase) -> None:
+        self._cache[case.case_id] = case
+        self._cache.move_to_end(case.case_id)
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+
+    def _load(self, case_id: str) -> Optional[InvestigationCase]:
+        if self.path is None or not os.path.exists(self.path):
+            return None
+        with self._transaction() as conn, conn:
+            case_row = conn.execute(
+                "SELECT watermark, assets_json, assets_at, result_json, seeds_json FROM cases WHERE case_id = ?", (case_id,)
+            ).fetchone()
+            if case_row is None:
+                return None
+            rows = conn.execute(
+                "SELECT ts, message, principal, host, ip, stage FROM events WHERE case_id = ? ORDER BY rowid",
+                (case_id,),
+            ).fetchall()
+        watermark, assets_json, assets_at, result_json, seeds_json = case_row
+        events = EventBatch(
+            np.array([np.nan if r[0] is None else r[0] for r in rows], dtype=np.float64),
+            [r[1] for r in rows],
+            [r[2] for r in rows],
+            [r[3] for r in rows],
+            [r[4] for r in rows],
+            np.array([r[5] for r in rows], dtype=np.int64),
+        )
+        result = InvestigationResult.model_validate_json(result_json) if result_json else None
+        return InvestigationCase(
+            case_id, events, json.loads(assets_json), assets_at, watermark, result, json.loads(seeds_json)
+        )
+
+    def get(self, case_id: str) -> InvestigationCase:
+        """Raises KeyError if the case does not exist."""
+        with self._lock:
+            case = self._cache.get(case_id)
+            if case is None:
+                case = self._load(case_id)
+                if case is None:
+                    raise KeyError(f"Investigation case {case_id!r} not found")
+            self._remember(case)
+            return case
+
+    def save(self, case: InvestigationCase, new_events: Optional[EventBatch] = None) -> InvestigationCase:
+        """
+        Persist a case. Only `new_events` are written; the whole event set
+        is rewritten when the case was trimmed to `max_events`.
+        """
+        with self._lock:
+            self._remember(case)
+            if self.path is None:
+                return case
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with self._transaction() as conn, conn:
+                stored = conn.execute("SELECT COUNT(*) FROM events WHERE case_id = ?", (case.case_id,)).fetchone()[0]
+                added = len(new_events.ts) if new_events is not None else 0
+                if stored + added != len(case.events.ts):
+                    conn.execute("DELETE FROM events WHERE case_id = ?", (case.case_id,))
+                    new_events = case.events
+                if new_events is not None and len(new_events.ts):
+                    conn.executemany(
+                        "INSERT INTO events (case_id, ts, message, principal, host, ip, stage) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            (case.case_id, None if ts != ts else float(ts), msg, _text(p), _text(h), _text(ip), int(s))
+                            for ts, msg, p, h, ip, s in zip(*new_events, strict=True)
+                        ),
+                    )
+                conn.execute(
+                    "INSERT OR REPLACE INTO cases"
+                    " (case_id, watermark, assets_json, assets_at, result_json, seeds_json, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        case.case_id,
+                        case.watermark,
+                        json.dumps(case.assets, default=str),
+                        case.assets_at,
+                        case.result.model_dump_json() if case.result else None,
+                        json.dumps(case.seeds),
+                        time.time(),
+                    ),
+                )
+        return case
+
+    def delete(self, case_id: str) -> None:
+        with self._lock:
+            self._cache.pop(case_id, None)
+            if self.path is None or not os.path.exists(self.path):
+                return
+            with self._transaction() as conn, conn:
+                conn.execute("DELETE FROM events WHERE case_id = ?", (case_id,))
+                conn.execute("DELETE FROM cases WHERE case_id = ?", (case_id,))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        state["_cache"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
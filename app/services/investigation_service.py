@@ -1,20 +1,187 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
 from app.services.bigquery_service import BigQueryService
 from app.services.cloud_security_service import CloudSecurityService
-from app.tools.investigation_tools import run_attack_investigation
-from app.models.investigation_result import InvestigationResult
+from app.services.investigation_case_store import InvestigationCase, InvestigationCaseStore
+from app.tools.attack_graph import AttackGraph
+from app.tools.exfil_tools import estimate_exfiltration
+from app.tools.hunt_filter import HuntPlan
+from app.tools.investigation_tools import (
+    EventBatch,
+    concat_events,
+    evidence_filter,
+    extract_events,
+    run_attack_investigation,
+    split_seeds,
+)
+from app.models.investigation_result import ExfiltrationEstimate, InvestigationResult
+from app.utils.time_utils import from_epoch_seconds, resumable_page, to_epoch_seconds
+
+logger = logging.getLogger(__name__)
 
 class InvestigationService:
-    def __init__(self, bq: BigQueryService, security: CloudSecurityService):
+    def __init__(
+        self,
+        bq: BigQueryService,
+        security: CloudSecurityService,
+        store: Optional[InvestigationCaseStore] = None,
+        asset_ttl_seconds: float = 900.0,
+        flow_window_hours: float = 24.0,
+    ):
         self.bq = bq
         self.security = security
+        # In-memory only unless a persistent store is injected
+        self.store = store or InvestigationCaseStore()
+        self.asset_ttl_seconds = asset_ttl_seconds
+        self.flow_window_hours = flow_window_hours
 
-    def investigate(self, limit: int = 1000) -> InvestigationResult:
+    def investigate(
+        self,
+        limit: int = 1000,
+        case_id: str = "latest",
+        seed_entities: Optional[List[str]] = None,
+        start: Any = None,
+        end: Any = None,
+        asset_types: Optional[List[str]] = None,
+    ) -> InvestigationResult:
         """
-        1) Fetch recent security logs.
-        2) List current cloud assets.
-        3) Run the attack reconstruction logic.
+        1) Gather evidence concurrently:
+           - logs newer than the case watermark, pushed down to the seed
+             entities and [start, end) when given, streamed page by page
+             into event extraction. Once the case has a watermark (or a
+             start) logs are read oldest first, so when more than `limit`
+             arrive the watermark stops at the last one ingested and the
+             next call picks up the rest;
+           - assets: a name/type-scoped search for seeded cases, otherwise
+             the full inventory (reused until `asset_ttl_seconds` old);
+           - an outbound-volume estimate over the last `flow_window_hours`
+             of VPC flow logs (or [start, end)), on the same refresh cycle.
+        2) Append the new events, rebuild the attack graph and run the
+           attack reconstruction logic over the case's accumulated events.
+        Changing a case's seed entities restarts its evidence collection.
+        Raises ValueError for unparseable start/end times.
         """
-        # Use the generic query_logs under the hood with a security filter if desired
-        logs = self.bq.query_logs(query_filter="TRUE", limit=limit)
-        assets = self.security.list_assets()
-        return run_attack_investigation(logs, assets)
+        lower, upper = self._time_bound(start, "start"), self._time_bound(end, "end")
+        try:
+            case = self.store.get(case_id)
+        except KeyError:
+            case = None
+        seeds = list(seed_entities) if seed_entities is not None else (case.seeds if case else [])
+        if case is not None and sorted(seeds) != sorted(case.seeds):
+            case = None
+
+        ips, names = split_seeds(seeds)
+        plan = evidence_filter(ips, names, lower, upper, after=case.watermark if case else None)
+        now = time.time()
+        refresh_assets = bool(seeds) or case is None or now - case.assets_at > self.asset_ttl_seconds
+        refresh_flows = self.flow_window_hours > 0 and (
+            case is None or case.flows_at is None or now - case.flows_at > self.asset_ttl_seconds
+        )
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            ascending = lower is not None or (case is not None and case.watermark is not None)
+            events_future = pool.submit(self._gather_events, plan, limit, case_id, ascending)
+            assets_future = pool.submit(self._gather_assets, names, asset_types, bool(seeds)) if refresh_assets else None
+            flows_future = pool.submit(self._gather_flows, ips, lower, upper or now) if refresh_flows else None
+            new_events = events_future.result()
+            assets = assets_future.result() if assets_future else None
+            exfiltration = flows_future.result() if flows_future else None
+
+        if case is None:
+            case = InvestigationCase(case_id, extract_events([]), assets or [], now, seeds=seeds)
+        elif assets is not None:
+            if seeds:
+                case.merge_assets(assets, now)
+            else:
+                case.set_assets(assets, now)
+        if exfiltration is not None:
+            case.set_exfiltration(exfiltration, now)
+        case.append(new_events, self.store.max_events)
+
+        if case.result is None:
+            case.result = run_attack_investigation(
+                case.events, case.assets, graph=case.graph, exfiltration=case.exfiltration
+            )
+        self.store.save(case, new_events)
+        return case.result
+
+    @staticmethod
+    def _time_bound(value: Any, label: str) -> Optional[float]:
+        if value is None or value == "":
+            return None
+        seconds = to_epoch_seconds(value)
+        if seconds != seconds:
+            raise ValueError(f"Unrecognised {label} time {value!r}; use ISO 8601")
+        return seconds
+
+    def _gather_events(
+        self, plan: HuntPlan, limit: int, case_id: str, ascending: bool = False, chunk_size: int = 5000,
+    ) -> EventBatch:
+        """
+        Stream matching log pages into event extraction chunk by chunk, so
+        parsing overlaps the remaining BigQuery pages and the asset lookup.
+        Read `ascending`, a capped fetch leaves out the rows sharing its
+        last timestamp (they may continue past the cap) so that a watermark
+        at the last ingested event cannot skip any of them.
+        """
+        batches: List[EventBatch] = []
+        chunk: List[Dict[str, Any]] = []
+        fetched = 0
+        for row in self.bq.iter_logs(query_filter=plan.sql, limit=limit, params=plan.params, ascending=ascending):
+            chunk.append(row)
+            fetched += 1
+            if len(chunk) >= chunk_size:
+                # hold back the trailing group of equal timestamps until it is complete
+                ready = resumable_page(chunk, len(chunk)) if ascending else chunk
+                batches.append(extract_events(ready))
+                chunk = chunk[len(ready):]
+        capped = fetched >= limit
+        if capped and ascending and chunk:
+            ready = resumable_page(chunk, len(chunk))
+            # a whole chunk of one timestamp is only kept if nothing else was read
+            chunk = [] if len(ready) == len(chunk) and batches else ready
+        batches.append(extract_events(chunk))
+        if capped:
+            if ascending:
+                logger.info("Case %s: evidence capped at %d rows; the next call continues from there", case_id, limit)
+            else:
+                logger.warning("Case %s: evidence capped at %d rows; older matching events skipped", case_id, limit)
+        return concat_events(batches)
+
+    def _gather_flows(self, ips: List[str], start: Optional[float], end: float) -> Optional[ExfiltrationEstimate]:
+        """
+        Outbound-volume estimate over flow logs in [start, end), scoped to
+        the seed IPs if any. Returns None if the flow logs can't be read.
+        """
+        if start is None:
+            start = end - self.flow_window_hours * 3600
+        try:
+            rows = self.bq.iter_flow_logs(from_epoch_seconds(start), from_epoch_seconds(end), ips=ips)
+            return estimate_exfiltration(rows, window_start=start, window_end=end)
+        except Exception as e:
+            logger.warning("Flow log scan failed; exfiltration volume not estimated: %s", e)
+            return None
+
+    def _gather_assets(self, names: List[str], asset_types: Optional[List[str]], scoped: bool) -> List[Dict[str, Any]]:
+        if scoped or asset_types:
+            return self.security.search_assets(names, asset_types=asset_types)
+        return self.security.list_assets()
+
+    def graph(self, case_id: str = "latest") -> AttackGraph:
+        """Raises KeyError if the case has not been investigated yet."""
+        return self.store.get(case_id).graph
+
+    def attack_paths(self, source: str, target: str, case_id: str = "latest") -> Dict[str, Any]:
+        """
+        Fewest-hop and highest-risk paths between two entities of a case.
+        """
+        graph = self.graph(case_id)
+        return {
+            "shortest": graph.shortest_path(source, target),
+            "riskiest": graph.riskiest_path(source, target),
+        }
+
+    def blast_radius(self, entity: str, max_hops: int = 3, case_id: str = "latest") -> List[Dict[str, Any]]:
+        """Entities reachable from a compromised one, most exposed first."""
+        return self.graph(case_id).blast_radius(entity, max_hops=max_hops)
@@ -0,0 +1,293 @@
+import json
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+from array import array
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from app.utils.json_utils import to_json_safe
+from app.utils.time_utils import to_epoch_seconds
+
+logger = logging.getLogger(__name__)
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def encode_postings(doc_ids: Iterable[int]) -> bytes:
+    """
+    Delta + LEB128 varint encoding of an ascending list of doc ids.
+    """
+    out = bytearray()
+    prev = 0
+    for doc_id in doc_ids:
+        delta = doc_id - prev
+        prev = doc_id
+        while delta >= 0x80:
+            out.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return bytes(out)
+
+
+def decode_postings(buf: Any, offset: int, length: int) -> List[int]:
+    ids: List[int] = []
+    value = shift = 0
+    prev = 0
+    for byte in buf[offset:offset + length]:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        prev += value
+        ids.append(prev)
+        value = shift = 0
+    return ids
+
+
+def _intersect(lists: List[List[int]]) -> List[int]:
+    lists = sorted(lists, key=len)
+    result = set(lists[0])
+    for other in lists[1:]:
+        result.intersection_update(other)
+        if not result:
+            break
+    return sorted(result)
+
+
+class _Segment:
+    """
+    An immutable on-disk index segment. Posting lists and documents are
+    memory-mapped; only the trigram lexicon is held in memory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.count: int = meta["count"]
+        self.min_ts: float = meta["min_ts"]
+        self.max_ts: float = meta["max_ts"]
+        with open(os.path.join(path, "lexicon.json")) as f:
+            self.lexicon: Dict[str, List[int]] = json.load(f)
+        self.offsets = array("Q")
+        with open(os.path.join(path, "docs.off"), "rb") as f:
+            self.offsets.frombytes(f.read())
+        self._docs_file = open(os.path.join(path, "docs.jsonl"), "rb")
+        self._postings_file = open(os.path.join(path, "postings.bin"), "rb")
+        self.docs = mmap.mmap(self._docs_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.postings = (
+            mmap.mmap(self._postings_file.fileno(), 0, access=mmap.ACCESS_READ)
+            if os.path.getsize(self._postings_file.name) else b""
+        )
+
+    @classmethod
+    def write(cls, path: str, rows: List[Dict[str, Any]], timestamps: List[float], messages: List[str]) -> "_Segment":
+        tmp = path + ".tmp"
+        os.makedirs(tmp, exist_ok=True)
+        index: Dict[str, List[int]] = {}
+        offsets = array("Q", [0])
+        with open(os.path.join(tmp, "docs.jsonl"), "wb") as docs:
+            for doc_id, (row, message) in enumerate(zip(rows, messages, strict=True)):
+                docs.write(json.dumps(to_json_safe(row), default=str).encode() + b"\n")
+                offsets.append(docs.tell())
+                for gram in trigrams(message):
+                    index.setdefault(gram, []).append(doc_id)
+        lexicon: Dict[str, List[int]] = {}
+        with open(os.path.join(tmp, "postings.bin"), "wb") as postings:
+            for gram, ids in index.items():
+                encoded = encode_postings(ids)
+                lexicon[gram] = [postings.tell(), len(encoded), len(ids)]
+                postings.write(encoded)
+        with open(os.path.join(tmp, "docs.off"), "wb") as f:
+            offsets.tofile(f)
+        with open(os.path.join(tmp, "lexicon.json"), "w") as f:
+            json.dump(lexicon, f)
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump({"count": len(rows), "min_ts": min(timestamps), "max_ts": max(timestamps)}, f)
+        os.replace(tmp, path)
+        return cls(path)
+
+    def doc(self, doc_id: int) -> Dict[str, Any]:
+        return json.loads(self.docs[self.offsets[doc_id]:self.offsets[doc_id + 1]])
+
+    def candidates(self, terms: List[str]) -> Iterable[int]:
+        grams = {g for term in terms for g in trigrams(term)}
+        if not grams:
+            return range(self.count)
+        lists = []
+        for gram in grams:
+            entry = self.lexicon.get(gram)
+            if entry is None:
+                return []
+            lists.append(decode_postings(self.postings, entry[0], entry[1]))
+        return _intersect(lists)
+
+    def close(self) -> None:
+        self.docs.close()
+        if isinstance(self.postings, mmap.mmap):
+            self.postings.close()
+        self._docs_file.close()
+        self._postings_file.close()
+
+
+class LogIndexService:
+    """
+    Trigram inverted index over recent (hot window) log messages.
+
+    New rows are buffered in memory and flushed into immutable segments
+    (delta/varint-compressed posting lists, memory-mapped on disk). Whole
+    segments are dropped once they fall out of the hot window. Substring
+    searches intersect trigram posting lists and verify candidates with the
+    hunt predicate, so results are exact.
+    """
+
+    def __init__(
+        self,
+        index_dir: str,
+        hot_window_hours: float = 24.0,
+        segment_rows: int = 50000,
+        refresh_interval_seconds: float = 300.0,
+    ):
+        self.index_dir = index_dir
+        self.hot_window_seconds = hot_window_hours * 3600
+        self.segment_rows = segment_rows
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self._init_runtime()
+
+    def _init_runtime(self) -> None:
+        self._lock = threading.RLock()
+        self._segments: Optional[List[_Segment]] = None
+        self._buffer_rows: List[Dict[str, Any]] = []
+        self._buffer_ts: List[float] = []
+        self._buffer_messages: List[str] = []
+        self._buffer_index: Dict[str, List[int]] = {}
+        self._last_refresh = 0.0
+
+    @property
+    def segments(self) -> List[_Segment]:
+        with self._lock:
+            if self._segments is None:
+                os.makedirs(self.index_dir, exist_ok=True)
+                names = sorted(
+                    d for d in os.listdir(self.index_dir)
+                    if d.startswith("seg-") and not d.endswith(".tmp")
+                )
+                self._segments = [_Segment(os.path.join(self.index_dir, d)) for d in names]
+            return self._segments
+
+    @property
+    def doc_count(self) -> int:
+        return sum(s.count for s in self.segments) + len(self._buffer_rows)
+
+    @property
+    def watermark(self) -> Optional[float]:
+        """Latest indexed timestamp (epoch seconds)."""
+        stamps = [s.max_ts for s in self.segments] + self._buffer_ts
+        return max(stamps) if stamps else None
+
+    @property
+    def hot_start(self) -> Optional[float]:
+        """Earliest timestamp the index covers; older history lives only in BigQuery."""
+        stamps = [s.min_ts for s in self.segments] + self._buffer_ts
+        return min(stamps) if stamps else None
+
+    def is_stale(self) -> bool:
+        return time.time() - self._last_refresh > self.refresh_interval_seconds
+
+    def mark_refreshed(self) -> None:
+        self._last_refresh = time.time()
+
+    def add_rows(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Index log rows. Returns the number of rows added.
+        """
+        added = 0
+        with self._lock:
+            for row in rows:
+                ts = to_epoch_seconds(row.get("timestamp"))
+                if ts != ts:  # NaN: unusable for hot-window bookkeeping
+                    continue
+                message = str(row.get("message") or "").lower()
+                doc_id = len(self._buffer_rows)
+                self._buffer_rows.append(row)
+                self._buffer_ts.append(ts)
+                self._buffer_messages.append(message)
+                for gram in trigrams(message):
+                    self._buffer_index.setdefault(gram, []).append(doc_id)
+                added += 1
+                if len(self._buffer_rows) >= self.segment_rows:
+                    self.flush()
+        return added
+
+    def flush(self) -> None:
+        """Write buffered rows out as a new immutable segment."""
+        with self._lock:
+            if not self._buffer_rows:
+                return
+            segments = self.segments
+            seq = int(os.path.basename(segments[-1].path)[4:]) + 1 if segments else 0
+            path = os.path.join(self.index_dir, f"seg-{seq:08d}")
+            segments.append(_Segment.write(path, self._buffer_rows, self._buffer_ts, self._buffer_messages))
+            self._buffer_rows, self._buffer_ts, self._buffer_messages = [], [], []
+            self._buffer_index = {}
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """
+        Drop segments entirely older than the hot window. Returns how many.
+        """
+        cutoff = (now or time.time()) - self.hot_window_seconds
+        with self._lock:
+            expired = [s for s in self.segments if s.max_ts < cutoff]
+            for seg in expired:
+                seg.close()
+                shutil.rmtree(seg.path, ignore_errors=True)
+                self._segments.remove(seg)
+        return len(expired)
+
+    def search(
+        self,
+        predicate: Callable[[Dict[str, Any]], bool],
+        terms: List[str],
+        limit: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return up to `limit` rows matching `predicate`, newest first.
+        `terms` are substrings every match must contain; their trigrams
+        narrow the candidate set before the predicate is evaluated.
+        """
+        terms = [t.lower() for t in terms]
+        hits: List[tuple] = []
+        with self._lock:
+            grams = {g for t in terms for g in trigrams(t)}
+            if grams:
+                lists = [self._buffer_index.get(g, []) for g in grams]
+                buffer_ids: Iterable[int] = _intersect(lists) if all(lists) else []
+            else:
+                buffer_ids = range(len(self._buffer_rows))
+            for doc_id in buffer_ids:
+                row = self._buffer_rows[doc_id]
+                if predicate(row):
+                    hits.append((self._buffer_ts[doc_id], to_json_safe(row)))
+            for seg in self.segments:
+                for doc_id in seg.candidates(terms):
+                    row = seg.doc(doc_id)
+                    if predicate(row):
+                        hits.append((to_epoch_seconds(row.get("timestamp")), row))
+        hits.sort(key=lambda h: h[0], reverse=True)
+        return [row for _, row in hits[:limit]]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in list(state):
+            if key.startswith("_"):
+                state.pop(key)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_runtime()
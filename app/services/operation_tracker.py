@@ -0,0 +1,210 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from app.models.containment_action import ContainmentAction
+from app.models.remediation_action import RemediationAction
+from app.tools.operation_tools import (
+    PATCH_JOB,
+    ZONE_OPERATION,
+    OperationStatus,
+    PatchJobPoller,
+    ZoneOperationPoller,
+)
+
+logger = logging.getLogger(__name__)
+
+TrackedAction = Union[ContainmentAction, RemediationAction]
+Poller = Callable[[str, List[str]], Dict[str, OperationStatus]]
+
+
+class TrackedOperation:
+    """One long-running operation and the action it settles."""
+
+    def __init__(self, name: str, kind: str, scope: str, action: TrackedAction, deadline: float, delay: float):
+        self.name = name
+        self.kind = kind
+        self.scope = scope
+        self.action = action
+        self.deadline = deadline
+        self.delay = delay
+        self.next_poll = time.monotonic() + delay
+        self.callbacks: List[Callable[[TrackedAction], None]] = []
+        self.done = threading.Event()
+
+
+class OperationTracker:
+    """
+    Tracks Compute / OS Config long-running operations on one background
+    worker. Every cycle the due operations are grouped by (kind, scope)
+    and each group is polled with a single batched call; an operation
+    that is still running backs off exponentially from `min_interval` to
+    `max_interval`. When it finishes, its action's status flips from
+    "pending" to "executed" or "failed", waiters are released and
+    subscribers are called.
+    """
+
+    def __init__(
+        self,
+        pollers: Optional[Dict[str, Poller]] = None,
+        min_interval: float = 1.0,
+        max_interval: float = 30.0,
+        backoff: float = 2.0,
+        max_wait_seconds: float = 3600.0,
+        keep_finished: int = 1000,
+    ):
+        self.pollers = pollers if pollers is not None else {
+            ZONE_OPERATION: ZoneOperationPoller(),
+            PATCH_JOB: PatchJobPoller(),
+        }
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_wait_seconds = max_wait_seconds
+        self.keep_finished = keep_finished
+        self._pending: Dict[str, TrackedOperation] = {}
+        self._finished: "OrderedDict[str, TrackedOperation]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+
+    def track(self, action: TrackedAction, kind: str, scope: str, name: str) -> TrackedOperation:
+        """Register `action` as pending on operation `name` and start polling it."""
+        if kind not in self.pollers:
+            raise ValueError(f"No poller for operation kind {kind!r}")
+        action.status = "pending"
+        action.operation = name
+        op = TrackedOperation(name, kind, scope, action, time.monotonic() + self.max_wait_seconds, self.min_interval)
+        with self._cond:
+            self._pending[name] = op
+            if self._worker is None or not self._worker.is_alive():
+                self._closed = False
+                self._worker = threading.Thread(target=self._run, name="operation-tracker", daemon=True)
+                self._worker.start()
+            self._cond.notify()
+        return op
+
+    def get(self, name: str) -> TrackedOperation:
+        with self._cond:
+            op = self._pending.get(name) or self._finished.get(name)
+        if op is None:
+            raise KeyError(f"Operation {name} is not tracked")
+        return op
+
+    def subscribe(self, name: str, callback: Callable[[TrackedAction], None]) -> None:
+        """Call `callback(action)` once the operation finishes (now, if it already has)."""
+        with self._cond:
+            op = self._pending.get(name)
+            if op is not None:
+                op.callbacks.append(callback)
+                return
+        callback(self.get(name).action)
+
+    def wait(self, name: str, timeout: Optional[float] = None) -> TrackedAction:
+        """Block until the operation finishes or `timeout` passes; returns its action."""
+        op = self.get(name)
+        op.done.wait(timeout)
+        return op.action
+
+    def wait_all(self, names: List[str], timeout: Optional[float] = None) -> List[TrackedAction]:
+        """Wait on several operations against one shared deadline."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        actions = []
+        for name in names:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            actions.append(self.wait(name, remaining))
+        return actions
+
+    @property
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def poll(self, force: bool = False) -> int:
+        """
+        Run one polling cycle over the due operations (all pending ones if
+        `force`). Returns how many finished. The worker calls this; tests
+        may too.
+        """
+        now = time.monotonic()
+        groups: Dict[Tuple[str, str], List[TrackedOperation]] = defaultdict(list)
+        with self._cond:
+            for op in self._pending.values():
+                if force or op.next_poll <= now:
+                    groups[(op.kind, op.scope)].append(op)
+        settled: List[Tuple[TrackedOperation, Optional[str]]] = []
+        for (kind, scope), ops in groups.items():
+            try:
+                statuses = self.pollers[kind](scope, [op.name for op in ops])
+            except Exception as e:
+                logger.warning("Polling %d %s operations in %s failed: %s", len(ops), kind, scope, e)
+                statuses = {}
+            for op in ops:
+                status = statuses.get(op.name)
+                if status is not None and status.done:
+                    settled.append((op, status.error))
+                elif now > op.deadline:
+                    settled.append((op, f"Operation {op.name} not done after {self.max_wait_seconds:.0f}s"))
+                else:
+                    op.delay = min(op.delay * self.backoff, self.max_interval)
+                    op.next_poll = now + op.delay
+        for op, error in settled:
+            self._settle(op, error)
+        return len(settled)
+
+    def _settle(self, op: TrackedOperation, error: Optional[str]) -> None:
+        action = op.action
+        action.status = "failed" if error else "executed"
+        if error:
+            if isinstance(action, RemediationAction):
+                action.message = error
+            else:
+                action.justification = error
+            logger.error("Operation %s failed: %s", op.name, error)
+        with self._cond:
+            self._pending.pop(op.name, None)
+            self._finished[op.name] = op
+            while len(self._finished) > self.keep_finished:
+                self._finished.popitem(last=False)
+            callbacks, op.callbacks = op.callbacks, []
+        op.done.set()
+        for callback in callbacks:
+            try:
+                callback(action)
+            except Exception as e:
+                logger.error("Callback for operation %s raised: %s", op.name, e)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                delay = min(op.next_poll for op in self._pending.values()) - time.monotonic()
+                if delay > 0:
+                    # woken early by track() so new operations get their first poll on time
+                    self._cond.wait(delay)
+                    continue
+            self.poll()
+
+    def close(self) -> None:
+        """Stop the worker; pending operations stay pending."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __getstate__(self):
+        # In-flight operations (events, callbacks) belong to this process
+        state = self.__dict__.copy()
+        state["_pending"] = {}
+        state["_finished"] = OrderedDict()
+        state["_cond"] = None
+        state["_worker"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._cond = threading.Condition()
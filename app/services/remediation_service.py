@@ -1,27 +1,129 @@
-from app.tools.remediation_tools import isolate_vm, patch_vm, recover_file_from_backup
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from google.cloud import osconfig_v1
+from app.tools.remediation_tools import isolate_vm, patch_vm, patch_instances
+from app.tools.operation_tools import PATCH_JOB, ZONE_OPERATION
 from app.models.remediation_action import RemediationAction
+from app.services.file_recovery_service import FileRecoveryService
+from app.services.idempotency import IdempotencyCache
+from app.services.instance_index import InstanceIndex, locate_instances
+from app.services.operation_tracker import OperationTracker
 from app.utils.config import PlatformConfig
 
+# Upper bound on explicit instances named in one patch job's filter
+MAX_INSTANCES_PER_PATCH_JOB = 1000
+
 class RemediationService:
-    def __init__(self, config: PlatformConfig):
+    def __init__(
+        self,
+        config: PlatformConfig,
+        tracker: Optional[OperationTracker] = None,
+        dedup: Optional[IdempotencyCache] = None,
+        index: Optional[InstanceIndex] = None,
+        recovery: Optional[FileRecoveryService] = None,
+    ):
         self.config = config
+        self.tracker = tracker or OperationTracker()
+        self.dedup = dedup or IdempotencyCache(RemediationAction)
+        self.index = index
+        self.recovery = recovery or FileRecoveryService(
+            config.incident_bucket, restore_root=os.path.join(config.state_dir, "restored"),
+        )
+        self._osconfig_client: Optional[osconfig_v1.OsConfigServiceClient] = None
+
+    @property
+    def osconfig_client(self) -> osconfig_v1.OsConfigServiceClient:
+        """One OS Config client for every patch job (created lazily)."""
+        if self._osconfig_client is None:
+            self._osconfig_client = osconfig_v1.OsConfigServiceClient()
+        return self._osconfig_client
+
+    def _track(self, action: RemediationAction, kind: str, scope: str, key: Tuple[str, str, Optional[dict]]) -> RemediationAction:
+        if action.operation:
+            self.tracker.track(action, kind, scope, action.operation)
+            self.tracker.subscribe(action.operation, lambda settled: self.dedup.record(*key, settled))
+        return action
 
     def isolate_vm(self, instance_name: str, zone: str) -> RemediationAction:
-        return isolate_vm(
+        key = ("isolate_vm", f"{self.config.project_id}/{zone}/{instance_name}", None)
+        return self.dedup.run(*key, lambda: self._track(isolate_vm(
             instance_name=instance_name,
             zone=zone,
             project_id=self.config.project_id,
-        )
+        ), ZONE_OPERATION, f"{self.config.project_id}/{zone}", key))
 
     def patch_vm(self, instance_id: str, patch_job_name: str) -> RemediationAction:
-        return patch_vm(
+        key = ("patch_vm", instance_id, {"patch_job_name": patch_job_name})
+        return self.dedup.run(*key, lambda: self._track(patch_vm(
             instance_id=instance_id,
             patch_job_name=patch_job_name,
             project_id=self.config.project_id,
+            client=self.osconfig_client,
+        ), PATCH_JOB, self.config.project_id, key))
+
+    def _patch_job(self, project_id: str, patch_job_name: str, **job) -> RemediationAction:
+        key = ("patch_vms", f"projects/{project_id}", {"patch_job_name": patch_job_name, **job})
+        return self.dedup.run(*key, lambda: self._track(patch_instances(
+            project_id, patch_job_name, client=self.osconfig_client, **job,
+        ), PATCH_JOB, project_id, key))
+
+    def bulk_patch(
+        self,
+        patch_job_name: str,
+        instances: Optional[List[str]] = None,
+        labels: Optional[Dict[str, str]] = None,
+        zones: Optional[List[str]] = None,
+        rollout_mode: str = "ZONE_BY_ZONE",
+        disruption_budget_percent: int = 10,
+        duration_seconds: int = 3600,
+    ) -> List[RemediationAction]:
+        """
+        Patch a fleet with as few OS Config jobs as possible. VMs carrying
+        `labels` are covered by one label-filtered job; explicit
+        `instances` (located through the instance index) are grouped per
+        project into jobs listing them zone by zone. `zones` narrows
+        both. Each job is tracked until it finishes; VMs that cannot be
+        located come back as failed actions.
+        """
+        rollout = {
+            "zones": sorted(zones or []),
+            "rollout_mode": rollout_mode,
+            "disruption_budget_percent": disruption_budget_percent,
+            "duration_seconds": duration_seconds,
+        }
+        actions: List[RemediationAction] = []
+        if labels:
+            actions.append(self._patch_job(self.config.project_id, patch_job_name, group_labels=[labels], **rollout))
+        if not instances:
+            return actions
+        resolved, errors = locate_instances(instances, self.config.project_id, self.index)
+        by_project: Dict[str, Set[str]] = defaultdict(set)
+        for project, zone, name in resolved.values():
+            by_project[project].add(f"zones/{zone}/instances/{name}")
+        for project, paths in by_project.items():
+            paths = sorted(paths)  # groups each job's instances by zone
+            for i in range(0, len(paths), MAX_INSTANCES_PER_PATCH_JOB):
+                chunk = paths[i:i + MAX_INSTANCES_PER_PATCH_JOB]
+                actions.append(self._patch_job(project, patch_job_name, instances=chunk, **rollout))
+        actions.extend(
+            RemediationAction(action="patch_vms", resource=resource, status="failed", message=message)
+            for resource, message in errors.items()
         )
+        return actions
+
+    def wait_for_action(self, operation: str, timeout: Optional[float] = None) -> RemediationAction:
+        """The action settled by `operation`, after waiting up to `timeout` for it."""
+        return self.tracker.wait(operation, timeout)
 
     def recover_file(self, file_path: str) -> RemediationAction:
-        return recover_file_from_backup(
-            file_path=file_path,
-            backup_location=self.config.incident_bucket,
-        )
+        return self.dedup.run("recover_file", file_path, None, lambda: self.recovery.restore([file_path])[0])
+
+    def recover_files(self, file_paths: List[str], as_of: Optional[str] = None) -> List[RemediationAction]:
+        """Restore many files (or "dir/" trees) concurrently from the latest snapshot up to `as_of`."""
+        return self.recovery.restore(file_paths, as_of=as_of)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_osconfig_client"] = None
+        return state
@@ -5,6 +5,7 @@ from app.models.report import Report
 from app.services.bigquery_service import BigQueryService
 from app.utils.client_manager import PickleSafeService
 from app.utils.config import PlatformConfig
+from app.utils.rate_limiter import get_api_limiter
 import logging
 
 logger = logging.getLogger(__name__)
@@ -33,7 +34,9 @@ class ReportingService:
         report = self.get_report(report_id)
         pdf_bytes = render_report_to_pdf(report)
         blob = self.storage.bucket(self.bucket_name).blob(f"{report.id}.pdf")
-        blob.upload_from_string(pdf_bytes, content_type="application/pdf")
+        get_api_limiter().call(
+            "storage", self.bucket_name, blob.upload_from_string, pdf_bytes, content_type="application/pdf",
+        )
         return f"gs://{self.bucket_name}/{report.id}.pdf"
 
     def get_report(self, report_id: str) -> Report:
@@ -62,12 +65,13 @@ class ReportingService:
         pdf_bytes = render_report_to_pdf(report)
         bucket = self.storage.bucket(self.bucket_name)
 
-        if not bucket.exists():
+        limiter = get_api_limiter()
+        if not limiter.call("storage", self.bucket_name, bucket.exists):
             raise RuntimeError(f"GCS bucket '{self.bucket_name}' does not exist")
 
         blob_name = f"{report.id}.pdf"
         blob = bucket.blob(blob_name)
-        blob.upload_from_string(pdf_bytes, content_type="application/pdf")
+        limiter.call("storage", self.bucket_name, blob.upload_from_string, pdf_bytes, content_type="application/pdf")
         logger.info("Uploaded report PDF to gs://%s/%s", self.bucket_name, blob_name)
 
         # # 2) Verify upload
@@ -90,7 +94,8 @@ class ReportingService:
         )
 
         # 2) Record metadata into BigQuery
-        self.bq.insert_report_metadata(
+        limiter.call(
+            "bigquery", self.bq.dataset, self.bq.insert_report_metadata,
             report_id=report.id,
             title=report.title,
             generated_at=gen_at_str,
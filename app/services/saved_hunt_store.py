@@ -0,0 +1,75 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+from app.models.saved_hunt import SavedHunt
+
+class SavedHuntStore:
+    """
+    Saved hunt definitions and their cursors/cached results, persisted as
+    a single JSON document under the local state directory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._hunts: Optional[Dict[str, SavedHunt]] = None
+
+    def _load(self) -> Dict[str, SavedHunt]:
+        if self._hunts is None:
+            self._hunts = {}
+            if os.path.exists(self.path):
+                with open(self.path) as f:
+                    for item in json.load(f):
+                        hunt = SavedHunt.model_validate(item)
+                        self._hunts[hunt.id] = hunt
+        return self._hunts
+
+    def _persist(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump([h.model_dump(mode="json") for h in self._hunts.values()], f)
+        os.replace(tmp, self.path)
+
+    def get(self, hunt_id: str) -> SavedHunt:
+        with self._lock:
+            hunts = self._load()
+            if hunt_id not in hunts:
+                raise KeyError(f"Saved hunt {hunt_id} not found")
+            return hunts[hunt_id]
+
+    def list(self) -> List[SavedHunt]:
+        with self._lock:
+            return list(self._load().values())
+
+    def save(self, hunt: SavedHunt) -> SavedHunt:
+        with self._lock:
+            self._load()[hunt.id] = hunt
+            self._persist()
+        return hunt
+
+    def create(self, hunt: SavedHunt) -> SavedHunt:
+        """Like `save`, but raises ValueError if a hunt with this id exists."""
+        with self._lock:
+            hunts = self._load()
+            if hunt.id in hunts:
+                raise ValueError(f"Saved hunt {hunt.id} already exists")
+            hunts[hunt.id] = hunt
+            self._persist()
+        return hunt
+
+    def delete(self, hunt_id: str) -> None:
+        with self._lock:
+            if self._load().pop(hunt_id, None) is not None:
+                self._persist()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        state["_hunts"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -1,60 +1,409 @@
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import islice
+from datetime import datetime
 from app.services.bigquery_service import BigQueryService
 from app.services.cloud_security_service import CloudSecurityService
+from app.services.log_index_service import LogIndexService
+from app.services.saved_hunt_store import SavedHuntStore
+from app.tools.auth_tools import detect_credential_attacks
 from app.tools.threat_tools import hunt_threats
+from app.tools.hunt_aggregate import GROUP_BY_SQL, aggregate_rows, format_aggregate, resolve_group_by
+from app.tools.hunt_filter import HuntFilterError, HuntPlan, QueryParam, compile_filter, time_lower_bound
+from app.tools.hunt_sources import HUNT_SOURCES, HuntSource, canonical_row, merge_newest_first
+from app.tools.ioc_matcher import IocMatcher, extract_indicators
+from app.tools.result_shaping import ResultCache, next_page, shape_results
 from app.models.threat import Threat
-from typing import List, Dict, Any
+from app.models.saved_hunt import SavedHunt
+from app.utils.json_utils import to_json_safe
+from app.utils.time_utils import from_epoch_seconds, resumable_page, to_epoch_seconds
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
 
 class ThreatHuntingService:
-    def __init__(self, bq: BigQueryService, security: CloudSecurityService):
+    def __init__(
+        self,
+        bq: BigQueryService,
+        security: CloudSecurityService,
+        index: Optional[LogIndexService] = None,
+        hunt_store: Optional[SavedHuntStore] = None,
+    ):
         self.bq = bq
         self.security = security
+        self.index = index
+        self.hunt_store = hunt_store
+        # IOC automaton, kept across sweeps and diffed when intel changes
+        self.ioc_matcher = IocMatcher()
+        # Full hunt results stay server-side, keyed by cursor
+        self.result_cache = ResultCache()
+
+    def detect_threats(self, limit: int, filter_expression: str = "TRUE") -> List[Dict[str, Any]]:
+        plan = self.compile_filter(filter_expression)
+        if self.index is not None and plan.terms():
+            return self._hunt_indexed(plan, limit)
+        return self.bq.query_logs(query_filter=plan.sql, limit=limit, params=plan.params)
+
+    def hunt_aggregate(
+        self,
+        filter_expression: str = "TRUE",
+        group_by: Optional[str] = "ip",
+        bucket_seconds: int = 3600,
+        top_k: int = 10,
+    ) -> Dict[str, Any]:
+        """
+        Aggregate hunt: counts per time bucket and top-k `group_by` keys
+        (with each key's peak bucket) instead of raw rows. GROUP BY runs in
+        BigQuery; keyword hunts bounded to the hot window are aggregated
+        locally from the trigram index.
+        """
+        if bucket_seconds < 1:
+            raise HuntFilterError("bucket_seconds must be at least 1")
+        column = resolve_group_by(group_by)
+        plan = self.compile_filter(filter_expression)
+        since = time_lower_bound(plan.ast)
+        hot_start = None
+        if self.index is not None and plan.terms() and since is not None:
+            if self.index.is_stale():
+                self.refresh_index()
+            hot_start = self.index.hot_start
+        if hot_start is not None and since >= hot_start:
+            rows = self.index.search(plan.matches, plan.terms(), limit=self.index.doc_count)
+            raw = aggregate_rows(rows, bucket_seconds, column, top_k)
+            backend = "index"
+        else:
+            raw = self.bq.aggregate_logs(
+                query_filter=plan.sql,
+                params=plan.params,
+                bucket_seconds=bucket_seconds,
+                group_by_sql=GROUP_BY_SQL[column] if column else None,
+                top_k=top_k,
+            )
+            backend = "bigquery"
+        return format_aggregate(raw, column, bucket_seconds, backend)
+
+    def hunt_sources(
+        self,
+        filter_expression: str = "TRUE",
+        limit: int = 1000,
+        sources: Optional[List[str]] = None,
+        max_workers: int = 4,
+        timeout_seconds: float = 60.0,
+    ) -> Dict[str, Any]:
+        """
+        Fan one hunt filter out over several sources (logs, audit logs,
+        dark-web chatter) concurrently and merge the hits newest first.
+        Sources lacking a column the filter needs are skipped; sources that
+        fail or exceed `timeout_seconds` are reported without failing the hunt.
+        """
+        names = sources or list(HUNT_SOURCES)
+        unknown = [n for n in names if n not in HUNT_SOURCES]
+        if unknown:
+            raise ValueError(f"Unknown hunt source(s) {unknown}; available: {sorted(HUNT_SOURCES)}")
+
+        status: Dict[str, Dict[str, Any]] = {}
+        plans: Dict[str, HuntPlan] = {}
+        for name in names:
+            source = HUNT_SOURCES[name]
+            plan = compile_filter(filter_expression, source.columns)
+            missing = plan.fields() - source.fields
+            if missing:
+                status[name] = {"skipped": f"no {', '.join(sorted(missing))} column"}
+            else:
+                plans[name] = plan
+
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        if plans:
+            pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(plans))))
+            futures = {
+                pool.submit(self._fetch_source, HUNT_SOURCES[name], plan, limit): name
+                for name, plan in plans.items()
+            }
+            done, _ = wait(futures, timeout=timeout_seconds)
+            # Don't block on stragglers; their threads finish in the background
+            pool.shutdown(wait=False, cancel_futures=True)
+            for future, name in futures.items():
+                if future not in done:
+                    status[name] = {"error": f"timed out after {timeout_seconds}s"}
+                elif future.exception() is not None:
+                    logger.error("Hunt source %s failed: %s", name, future.exception())
+                    status[name] = {"error": str(future.exception())}
+                else:
+                    rows, seconds = future.result()
+                    results[name] = rows
+                    status[name] = {"rows": len(rows), "seconds": round(seconds, 3)}
+
+        merged = list(islice(merge_newest_first(results.values()), limit))
+        return {"rows": merged, "sources": status}
+
+    def _fetch_source(self, source: HuntSource, plan: HuntPlan, limit: int) -> tuple:
+        start = time.perf_counter()
+        rows = self.bq.query_table(
+            source.table,
+            query_filter=f"({source.base_filter}) AND ({plan.sql})",
+            limit=limit,
+            params=plan.params,
+            time_column=source.time_column,
+        )
+        return [canonical_row(source, row) for row in rows], time.perf_counter() - start
+
+    def hunt_summary(
+        self,
+        limit: int,
+        filter_expression: str = "TRUE",
+        token_budget: int = 4000,
+    ) -> Dict[str, Any]:
+        """
+        Run a hunt and return a token-budgeted response: summary (counts,
+        top IPs/messages, time histogram), a first page of rows and a cursor
+        for the remaining rows.
+        """
+        rows = self.detect_threats(limit=limit, filter_expression=filter_expression)
+        return shape_results(rows, self.result_cache, token_budget)
+
+    def shape_results(self, rows: List[Dict[str, Any]], token_budget: int = 4000) -> Dict[str, Any]:
+        return shape_results(rows, self.result_cache, token_budget)
+
+    def fetch_page(self, cursor: str, token_budget: int = 4000) -> Dict[str, Any]:
+        """
+        Next page of a previous hunt result. Raises KeyError for unknown or
+        expired cursors.
+        """
+        return next_page(cursor, self.result_cache, token_budget)
+
+    def compile_filter(self, filter_expression: str) -> HuntPlan:
+        """
+        Parse an LLM-produced filter into a typed AST and compile it to
+        parameterised SQL. Hallucinated fields (event_type, failed_login_count,
+        source_ip, ...) are mapped onto real columns or message keywords.
+        Plans are cached by normalised expression.
+        Raises HuntFilterError for expressions that cannot be parsed.
+        """
+        return compile_filter(filter_expression)
+
+    def refresh_index(self, batch_limit: int = 50000, max_batches: int = 20) -> int:
+        """
+        Pull logs newer than the index watermark into the trigram index and
+        evict segments that left the hot window. Rows are read oldest first
+        in pages of `batch_limit`, so the watermark never passes a row that
+        was not indexed; if `max_batches` pages do not catch up, the index
+        stays stale and the next hunt continues from where this one stopped.
+        Returns rows indexed.
+        """
+        if self.index is None:
+            return 0
+        watermark = self.index.watermark
+        if watermark is None:
+            # Cold start: seed with the most recent hot window
+            watermark = time.time() - self.index.hot_window_seconds
+        added = 0
+        caught_up = False
+        for _ in range(max_batches):
+            rows = self.bq.query_logs(
+                query_filter="timestamp > @watermark",
+                limit=batch_limit,
+                params=[QueryParam("watermark", "TIMESTAMP", from_epoch_seconds(watermark))],
+                ascending=True,
+            )
+            page = resumable_page(rows, batch_limit)
+            added += self.index.add_rows(page)
+            if len(rows) < batch_limit:
+                caught_up = True
+                break
+            watermark = to_epoch_seconds(page[-1].get("timestamp"))
+        self.index.flush()
+        self.index.evict()
+        if caught_up:
+            self.index.mark_refreshed()
+        else:
+            logger.warning("Log index still behind after %d batches; resuming on the next hunt", max_batches)
+        logger.info("Indexed %d new log rows", added)
+        return added
 
-    def detect_threats(self, limit: int, filter_expression: str) -> List[Dict[str, Any]]:
-        # Validate and rewrite invalid fields
-        filter_expression = self._sanitize_filter(filter_expression)
-        return self.bq.query_logs(query_filter=filter_expression, limit=limit)
+    def correlate_threats(
+        self,
+        limit: int = 1000,
+        filter_expression: str = "TRUE",
+        intel_limit: int = 1000,
+    ) -> List[Threat]:
+        """
+        Fetch logs, flag external-IP network activity, and hash-join both
+        the flagged IPs and threat-intel IOCs against the logs to produce
+        Threat models.
+        """
+        logs = self.detect_threats(limit=limit, filter_expression=filter_expression)
+        indicators = self.security.scan_network_activity(logs)
+        iocs = extract_indicators(self.bq.query_threat_intel(limit=intel_limit))
+        return hunt_threats(logs, indicators, iocs)
+
+    def credential_attacks(
+        self,
+        limit: int = 50000,
+        filter_expression: str = "TRUE",
+        window_seconds: float = 600.0,
+    ) -> List[Threat]:
+        """
+        Stream logs through the sliding-window credential attack detector
+        (brute force, password spray, credential stuffing). Rows are read
+        oldest first, parsed once and not retained; only the detector's
+        bounded windows and reorder buffer are kept.
+        """
+        plan = self.compile_filter(filter_expression)
+        rows = self.bq.iter_logs(query_filter=plan.sql, limit=limit, params=plan.params, ascending=True)
+        return detect_credential_attacks(rows, window_seconds=window_seconds)
 
-    def _sanitize_filter(self, filter_expression: str) -> str:
+    def sweep_iocs(
+        self,
+        limit: int = 100000,
+        filter_expression: str = "TRUE",
+        intel_limit: int = 1000,
+        max_hits: int = 500,
+    ) -> Dict[str, Any]:
         """
-        Converts hallucinated field references into valid log message substrings.
+        Match every known indicator (IPs, domains, CVE ids, exploit strings
+        from threat_intel) against streamed log rows in a single pass.
         """
-        import re
+        intel = self.bq.query_threat_intel(limit=intel_limit)
+        if self.ioc_matcher.update(extract_indicators(intel)):
+            logger.info("IOC automaton updated: %d indicators", len(self.ioc_matcher.automaton))
 
-        mappings = {
-            r"event_type\s*=\s*['\"]?authentication['\"]?":
-                "LOWER(message) LIKE '%authentication%'",
-            r"authentication\.type\s*=\s*['\"]?credential-stuffing['\"]?":
-                "LOWER(message) LIKE '%credential%'",
-            r"authentication\.failure_reason\s*=\s*['\"]?invalid_password['\"]?":
-                "LOWER(message) LIKE '%invalid password%'",
-            r"failed_login_count\s*>\s*\d+":
-                "LOWER(message) LIKE '%failed login%'",
-            r"source_ip\s*=\s*['\"]?([\d.]+)['\"]?":
-                r"ip = '\1'",
+        plan = self.compile_filter(filter_expression)
+        scanned = 0
+        hits: List[Dict[str, Any]] = []
+        by_indicator: Dict[str, int] = {}
+        for row in self.bq.iter_logs(query_filter=plan.sql, limit=limit, params=plan.params):
+            scanned += 1
+            text = f"{row.get('ip') or ''} {row.get('message') or ''}"
+            for indicator, kind in self.ioc_matcher.scan(text):
+                by_indicator[indicator] = by_indicator.get(indicator, 0) + 1
+                if len(hits) < max_hits:
+                    hits.append({
+                        "indicator": indicator,
+                        "kind": kind,
+                        "ip": row.get("ip"),
+                        "timestamp": row.get("timestamp"),
+                        "message": row.get("message"),
+                    })
+        return {
+            "scanned_rows": scanned,
+            "indicators": len(self.ioc_matcher.automaton),
+            "total_hits": sum(by_indicator.values()),
+            "hits_by_indicator": dict(sorted(by_indicator.items(), key=lambda kv: -kv[1])),
+            "hits": hits,
         }
 
-        for pattern, replacement in mappings.items():
-            filter_expression = re.sub(pattern, replacement, filter_expression, flags=re.IGNORECASE)
+    def save_hunt(self, name: str, filter_expression: str, limit: int = 1000, overwrite: bool = False) -> SavedHunt:
+        """
+        Store a hunt definition for repeated, incremental execution. Raises
+        ValueError if a hunt with the same id exists, unless `overwrite`
+        (which also resets its cursor and cached results).
+        """
+        if self.hunt_store is None:
+            raise RuntimeError("Saved hunts require a SavedHuntStore")
+        self.compile_filter(filter_expression)  # validate before persisting
+        hunt_id = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "hunt"
+        hunt = SavedHunt(id=hunt_id, name=name, filter_expression=filter_expression, limit=limit)
+        return self.hunt_store.save(hunt) if overwrite else self.hunt_store.create(hunt)
+
+    def run_saved_hunt(self, hunt_id: str) -> Dict[str, Any]:
+        """
+        Re-run a saved hunt, scanning only rows after its cursor, and merge
+        the new hits with the cached results from earlier runs. At most
+        `limit` new rows are scanned per run, oldest first; `caught_up` is
+        False when more remain for the next run.
+        """
+        if self.hunt_store is None:
+            raise RuntimeError("Saved hunts require a SavedHuntStore")
+        hunt = self.hunt_store.get(hunt_id)
+        plan = self.compile_filter(hunt.filter_expression)
+        scanned = self._rows_since(plan, hunt.cursor, hunt.limit)
+        caught_up = hunt.cursor is None or len(scanned) < hunt.limit
+        if hunt.cursor is not None:
+            scanned = resumable_page(scanned, hunt.limit)
+        new_rows = [to_json_safe(r) for r in scanned]
 
-        # Fallback to TRUE if the result is empty
-        if not filter_expression.strip():
-            filter_expression = "TRUE"
+        seen = {self._row_key(r) for r in hunt.results}
+        fresh: List[Dict[str, Any]] = []
+        for row in new_rows:
+            key = self._row_key(row)
+            if key not in seen:
+                seen.add(key)
+                fresh.append(row)
+        merged = sorted(
+            fresh + hunt.results,
+            key=lambda r: to_epoch_seconds(r.get("timestamp")),
+            reverse=True,
+        )[:hunt.limit]
 
-        return filter_expression
+        # Rows come back oldest first once a cursor exists: the cursor moves to
+        # the last row scanned, never past rows that did not fit this run
+        stamps = [to_epoch_seconds(r.get("timestamp")) for r in new_rows]
+        stamps = [t for t in stamps if t == t]
+        if stamps:
+            hunt.cursor = from_epoch_seconds(stamps[-1] if hunt.cursor is not None else max(stamps))
+        hunt.last_run = datetime.utcnow()
+        hunt.results = merged
+        self.hunt_store.save(hunt)
+        return {
+            "hunt_id": hunt.id,
+            "new_hits": len(fresh),
+            "total_hits": len(merged),
+            "caught_up": caught_up,
+            "cursor": hunt.cursor.isoformat() if hunt.cursor else None,
+            "results": merged,
+        }
 
+    @staticmethod
+    def _row_key(row: Dict[str, Any]) -> tuple:
+        return (str(row.get("timestamp")), row.get("ip"), row.get("message"))
 
-    
-    # def detect_threats(self, limit: int = 1000, filter_expression: str = "TRUE") -> List[Threat]:
-    #     """
-    #     Fetch recent logs from BigQuery, flag external‑IP network activity,
-    #     then run the core hunt_threats logic to produce Threat models.
-    #     """
-    #     # 1) Retrieve logs (no filter means TRUE)
-    #     logs = self.bq.query_logs(query_filter=filter_expression, limit=limit)
+    def _rows_since(self, plan: HuntPlan, cursor: Optional[datetime], limit: int) -> List[Dict[str, Any]]:
+        """
+        The oldest `limit` rows matching `plan` with timestamp > cursor
+        (without a cursor: the newest `limit` rows). Served from the local
+        index when it covers the whole range, otherwise from BigQuery with
+        the cursor pushed down as a timestamp predicate (partition pruning).
+        """
+        if cursor is None:
+            return self.detect_threats(limit=limit, filter_expression=plan.expression)
+        since = cursor.timestamp()
+        if self.index is not None and plan.terms():
+            if self.index.is_stale():
+                self.refresh_index()
+            hot_start = self.index.hot_start
+            if hot_start is not None and hot_start <= since:
+                hits = self.index.search(
+                    lambda r: plan.matches(r) and to_epoch_seconds(r.get("timestamp")) > since,
+                    plan.terms(),
+                    self.index.doc_count,
+                )
+                return sorted(hits, key=lambda r: to_epoch_seconds(r.get("timestamp")))[:limit]
+        return self.bq.query_logs(
+            query_filter=f"({plan.sql}) AND timestamp > @cursor",
+            limit=limit,
+            params=plan.params + (QueryParam("cursor", "TIMESTAMP", cursor),),
+            ascending=True,
+        )
 
-    #     # 2) Identify suspicious network activity
-    #     indicators = self.security.scan_network_activity(logs)
+    def _hunt_indexed(self, plan: HuntPlan, limit: int) -> List[Dict[str, Any]]:
+        """
+        Answer substring/keyword hunts from the trigram index for the hot
+        window and only go to BigQuery for history older than the index.
+        """
+        if self.index.is_stale():
+            self.refresh_index()
+        hot_start = self.index.hot_start
+        if hot_start is None:
+            return self.bq.query_logs(query_filter=plan.sql, limit=limit, params=plan.params)
 
-    #     # 3) Run the threat‑hunting logic
-    #     threats = hunt_threats(logs, indicators)
-    #     return threats
\ No newline at end of file
+        hits = self.index.search(plan.matches, plan.terms(), limit)
+        if len(hits) >= limit:
+            return hits
+        cold = self.bq.query_logs(
+            query_filter=f"({plan.sql}) AND timestamp < @hot_start",
+            limit=limit - len(hits),
+            params=plan.params + (QueryParam("hot_start", "TIMESTAMP", from_epoch_seconds(hot_start)),),
+        )
+        return hits + cold
@@ -0,0 +1,250 @@
+import ipaddress
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.time_utils import to_epoch_array
+
+logger = logging.getLogger(__name__)
+
+FEATURE_NAMES = [
+    "log_event_count",
+    "distinct_message_ratio",
+    "failure_ratio",
+    "audit_ratio",
+    "is_public_ip",
+    "log_events_per_minute",
+    "off_hours_ratio",
+]
+
+_FAILURE_MARKERS = ("fail", "denied", "invalid", "unauthorized", "error")
+
+
+def _average_path_length(n: np.ndarray) -> np.ndarray:
+    """
+    Expected path length of an unsuccessful BST search over n points,
+    c(n) in the isolation forest paper. Vectorised over n.
+    """
+    n = np.asarray(n, dtype=np.float64)
+    result = np.zeros_like(n)
+    result[n == 2] = 1.0
+    big = n > 2
+    result[big] = 2.0 * (np.log(n[big] - 1.0) + np.euler_gamma) - 2.0 * (n[big] - 1.0) / n[big]
+    return result
+
+
+def _is_public(ip: Optional[str]) -> bool:
+    try:
+        return not ipaddress.ip_address(ip).is_private
+    except (TypeError, ValueError):
+        return False
+
+
+def build_entity_features(logs: List[Dict[str, Any]]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Engineer one feature row per entity (source IP) for a window of logs.
+
+    Returns (entities, features, last_seen) where `features` has shape
+    (n_entities, len(FEATURE_NAMES)) and `last_seen` holds the latest epoch
+    timestamp observed for each entity.
+    """
+    if not logs:
+        return [], np.empty((0, len(FEATURE_NAMES))), np.empty(0)
+
+    keys = [str(row.get("ip") or "unknown") for row in logs]
+    messages = [str(row.get("message") or "").lower() for row in logs]
+    entities, inverse = np.unique(np.asarray(keys), return_inverse=True)
+    n_entities = len(entities)
+
+    failed = np.fromiter(
+        (any(m in msg for m in _FAILURE_MARKERS) for msg in messages), dtype=np.float64, count=len(logs)
+    )
+    audit = np.fromiter(
+        (str(row.get("log_type") or "").upper() == "AUDIT" for row in logs), dtype=np.float64, count=len(logs)
+    )
+    ts = to_epoch_array(row.get("timestamp") for row in logs)
+    valid_ts = ~np.isnan(ts)
+    hours = np.where(valid_ts, (np.nan_to_num(ts) // 3600) % 24, 12)
+    off_hours = ((hours < 6) | (hours >= 22)).astype(np.float64)
+
+    counts = np.bincount(inverse, minlength=n_entities).astype(np.float64)
+
+    # Distinct (entity, message) pairs per entity
+    _, pair_index = np.unique(
+        np.stack([inverse, np.unique(np.asarray(messages), return_inverse=True)[1]], axis=1),
+        axis=0,
+        return_index=True,
+    )
+    distinct_messages = np.bincount(inverse[pair_index], minlength=n_entities)
+
+    ts_filled = np.where(valid_ts, ts, np.nan)
+    first_seen = np.full(n_entities, np.inf)
+    last_seen = np.full(n_entities, -np.inf)
+    np.fmin.at(first_seen, inverse, ts_filled)
+    np.fmax.at(last_seen, inverse, ts_filled)
+    span_minutes = np.where(np.isfinite(last_seen - first_seen), (last_seen - first_seen) / 60.0, 0.0)
+    span_minutes = np.maximum(span_minutes, 1.0)
+    last_seen = np.where(np.isfinite(last_seen), last_seen, np.nan)
+
+    features = np.column_stack(
+        [
+            np.log1p(counts),
+            distinct_messages / counts,
+            np.bincount(inverse, weights=failed, minlength=n_entities) / counts,
+            np.bincount(inverse, weights=audit, minlength=n_entities) / counts,
+            np.fromiter((_is_public(e) for e in entities), dtype=np.float64, count=n_entities),
+            np.log1p(counts / span_minutes),
+            np.bincount(inverse, weights=off_hours, minlength=n_entities) / counts,
+        ]
+    )
+    return entities.tolist(), features, last_seen
+
+
+class IsolationForestModel:
+    """
+    CPU-only isolation forest stored as flat NumPy arrays so that a whole
+    feature matrix can be scored in one vectorised pass over all trees.
+    """
+
+    def __init__(self, n_trees: int = 100, sample_size: int = 256, seed: int = 42):
+        self.n_trees = n_trees
+        self.sample_size = sample_size
+        self.seed = seed
+        self.feature: Optional[np.ndarray] = None
+        self.threshold: Optional[np.ndarray] = None
+        self.left: Optional[np.ndarray] = None
+        self.right: Optional[np.ndarray] = None
+        self.size: Optional[np.ndarray] = None
+        self.max_depth = 0
+        self.trained_samples = 0
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.feature is not None
+
+    def fit(self, features: np.ndarray) -> "IsolationForestModel":
+        """
+        Train the forest offline on a feature matrix from `build_entity_features`.
+        """
+        features = np.asarray(features, dtype=np.float64)
+        n_samples = features.shape[0]
+        if n_samples < 2:
+            raise ValueError("At least two samples are required to train the anomaly model")
+
+        rng = np.random.default_rng(self.seed)
+        psi = min(self.sample_size, n_samples)
+        height_limit = int(np.ceil(np.log2(psi)))
+        trees = []
+        for _ in range(self.n_trees):
+            sample = features[rng.choice(n_samples, size=psi, replace=False)]
+            trees.append(self._build_tree(sample, height_limit, rng))
+
+        max_nodes = max(len(t[0]) for t in trees)
+        shape = (self.n_trees, max_nodes)
+        self.feature = np.full(shape, -1, dtype=np.int32)
+        self.threshold = np.zeros(shape)
+        self.left = np.zeros(shape, dtype=np.int32)
+        self.right = np.zeros(shape, dtype=np.int32)
+        self.size = np.zeros(shape)
+        for t, (feat, thr, left, right, size) in enumerate(trees):
+            n = len(feat)
+            self.feature[t, :n] = feat
+            self.threshold[t, :n] = thr
+            self.left[t, :n] = left
+            self.right[t, :n] = right
+            self.size[t, :n] = size
+        self.max_depth = height_limit
+        self.trained_samples = psi
+        return self
+
+    def _build_tree(self, sample: np.ndarray, height_limit: int, rng: np.random.Generator):
+        feat: List[int] = []
+        thr: List[float] = []
+        left: List[int] = []
+        right: List[int] = []
+        size: List[int] = []
+
+        def grow(rows: np.ndarray, depth: int) -> int:
+            node = len(feat)
+            feat.append(-1)
+            thr.append(0.0)
+            left.append(0)
+            right.append(0)
+            size.append(len(rows))
+            if depth >= height_limit or len(rows) <= 1:
+                return node
+            spread = rows.max(axis=0) - rows.min(axis=0)
+            candidates = np.flatnonzero(spread > 0)
+            if candidates.size == 0:
+                return node
+            f = int(rng.choice(candidates))
+            lo, hi = rows[:, f].min(), rows[:, f].max()
+            split = float(rng.uniform(lo, hi))
+            mask = rows[:, f] < split
+            feat[node] = f
+            thr[node] = split
+            left[node] = grow(rows[mask], depth + 1)
+            right[node] = grow(rows[~mask], depth + 1)
+            return node
+
+        grow(sample, 0)
+        return feat, thr, left, right, size
+
+    def score(self, features: np.ndarray) -> np.ndarray:
+        """
+        Batched inference: anomaly scores in (0, 1] for every row, higher is
+        more anomalous. All trees advance one level per iteration.
+        """
+        if not self.is_fitted:
+            raise RuntimeError("Anomaly model has not been trained")
+        features = np.asarray(features, dtype=np.float64)
+        n_samples = features.shape[0]
+        if n_samples == 0:
+            return np.empty(0)
+
+        tree_idx = np.arange(self.n_trees)[:, None]
+        sample_idx = np.broadcast_to(np.arange(n_samples), (self.n_trees, n_samples))
+        node = np.zeros((self.n_trees, n_samples), dtype=np.int32)
+        depth = np.zeros((self.n_trees, n_samples))
+        for _ in range(self.max_depth):
+            feat = self.feature[tree_idx, node]
+            internal = feat >= 0
+            if not internal.any():
+                break
+            values = features[sample_idx, np.where(internal, feat, 0)]
+            go_left = values < self.threshold[tree_idx, node]
+            child = np.where(go_left, self.left[tree_idx, node], self.right[tree_idx, node])
+            node = np.where(internal, child, node)
+            depth += internal
+
+        path = depth + _average_path_length(self.size[tree_idx, node])
+        return np.power(2.0, -path.mean(axis=0) / _average_path_length(np.array([self.trained_samples]))[0])
+
+    def save(self, path: str) -> None:
+        if not self.is_fitted:
+            raise RuntimeError("Anomaly model has not been trained")
+        np.savez_compressed(
+            path,
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            size=self.size,
+            meta=np.array([self.n_trees, self.sample_size, self.seed, self.max_depth, self.trained_samples]),
+        )
+        logger.info("Saved anomaly model to %s", path)
+
+    @classmethod
+    def load(cls, path: str) -> "IsolationForestModel":
+        with np.load(path) as data:
+            n_trees, sample_size, seed, max_depth, trained = (int(v) for v in data["meta"])
+            model = cls(n_trees=n_trees, sample_size=sample_size, seed=seed)
+            model.feature = data["feature"]
+            model.threshold = data["threshold"]
+            model.left = data["left"]
+            model.right = data["right"]
+            model.size = data["size"]
+        model.max_depth = max_depth
+        model.trained_samples = trained
+        return model
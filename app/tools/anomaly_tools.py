@@ -1,6 +1,11 @@
 from typing import List, Dict, Any
 from app.models.anomaly import Anomaly
+from app.tools.anomaly_model import IsolationForestModel, build_entity_features
+from app.tools.auth_tools import detect_credential_attacks
+from app.tools.beacon_tools import connection_endpoints, detect_beacons, encode_pairs
+from app.utils.time_utils import from_epoch_seconds, to_epoch_array
 from datetime import datetime
+import numpy as np
 
 def detect_network_anomalies(
     logs: List[Dict[str, Any]],
@@ -22,3 +27,93 @@ def detect_network_anomalies(
             )
         )
     return anomalies
+
+
+def _score_severity(score: float) -> str:
+    if score >= 0.75:
+        return "high"
+    if score >= 0.65:
+        return "medium"
+    return "low"
+
+
+def score_behavior_anomalies(
+    logs: List[Dict[str, Any]],
+    model: IsolationForestModel,
+) -> List[Anomaly]:
+    """
+    Score every entity in a log window with the behaviour model in one
+    vectorised call. Returns one Anomaly per entity carrying its anomaly_score.
+    """
+    entities, features, last_seen = build_entity_features(logs)
+    if not entities:
+        return []
+    scores = model.score(features)
+    now = datetime.utcnow()
+    anomalies: List[Anomaly] = []
+    for idx, (entity, score, seen) in enumerate(zip(entities, scores, last_seen, strict=True), start=1):
+        anomalies.append(
+            Anomaly(
+                id=f"behavior-{idx:03d}",
+                source="behavior-model",
+                severity=_score_severity(float(score)),
+                timestamp=from_epoch_seconds(seen) if np.isfinite(seen) else now,
+                description=f"Behavioural anomaly score {score:.3f} for entity {entity}",
+                affected_system=entity,
+                anomaly_score=round(float(score), 4),
+            )
+        )
+    return anomalies
+
+
+def detect_beaconing_anomalies(logs: List[Dict[str, Any]], **kwargs: Any) -> List[Anomaly]:
+    """
+    Group connections per (source, destination) pair and flag regular,
+    low-jitter beaconing patterns (likely C2 check-ins).
+    """
+    endpoints = [connection_endpoints(row) for row in logs]
+    keep = [i for i, (src, dst) in enumerate(endpoints) if src and dst]
+    if not keep:
+        return []
+    codes, pairs = encode_pairs(
+        (endpoints[i][0] for i in keep), (endpoints[i][1] for i in keep)
+    )
+    timestamps = to_epoch_array(logs[i].get("timestamp") for i in keep)
+
+    anomalies: List[Anomaly] = []
+    for idx, beacon in enumerate(detect_beacons(codes, timestamps, **kwargs), start=1):
+        src, dst = pairs[beacon["pair"]]
+        anomalies.append(
+            Anomaly(
+                id=f"beacon-{idx:03d}",
+                source="beaconing",
+                severity=beacon["severity"],
+                timestamp=beacon["last_seen"],
+                description=(
+                    f"Periodic connections {src} -> {dst}: {beacon['events']} events, "
+                    f"interval {beacon['mean_interval_s']}s, jitter {beacon['jitter']}, "
+                    f"periodicity {beacon['periodicity']}"
+                ),
+                affected_system=src,
+                anomaly_score=beacon["periodicity"],
+            )
+        )
+    return anomalies
+
+
+def detect_auth_anomalies(logs: List[Dict[str, Any]], **kwargs: Any) -> List[Anomaly]:
+    """
+    Credential attacks (brute force, password spray, credential stuffing)
+    from the sliding-window auth detector, as Anomaly records.
+    """
+    return [
+        Anomaly(
+            id=threat.id,
+            source="credential-attack",
+            severity=threat.severity,
+            timestamp=threat.timestamp,
+            description=f"{threat.type}: {threat.description}",
+            affected_system=threat.target_resource or threat.source_ip,
+        )
+        for threat in detect_credential_attacks(logs, **kwargs)
+    ]
@@ -0,0 +1,206 @@
+import math
+from itertools import pairwise
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+# Probabilities are capped below 1 so every edge keeps a positive
+# -log(p) weight (csgraph drops explicit zeros)
+MAX_EDGE_PROBABILITY = 0.999
+NODE_KINDS = ("ip", "principal", "host", "asset")
+
+
+class AttackGraph:
+    """
+    Directed attack graph over identities, hosts, IPs and assets in CSR
+    form: out-edges of node i are indices[indptr[i]:indptr[i + 1]], each
+    with the probability that an attacker can traverse it.
+
+    Shortest paths use BFS (hops); highest-risk paths use Dijkstra over
+    -log(probability), so the cheapest path maximises the product of edge
+    probabilities. Query results are memoized on the instance, which lives
+    for one investigation case.
+    """
+
+    def __init__(self, labels: List[str], indptr: np.ndarray, indices: np.ndarray, probabilities: np.ndarray):
+        self.labels = labels
+        self.indptr = indptr
+        self.indices = indices
+        self.probabilities = probabilities
+        self.node_ids: Dict[str, int] = {label: i for i, label in enumerate(labels)}
+        self._cache: Dict[Tuple[Any, ...], Any] = {}
+
+    @classmethod
+    def from_edges(
+        cls,
+        labels: List[str],
+        src: np.ndarray,
+        dst: np.ndarray,
+        probabilities: np.ndarray,
+    ) -> "AttackGraph":
+        """
+        Build the CSR arrays from an edge list. Parallel edges collapse into
+        one carrying the highest probability; self-loops are dropped.
+        """
+        n = len(labels)
+        src, dst = np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+        probabilities = np.minimum(np.asarray(probabilities, dtype=np.float64), MAX_EDGE_PROBABILITY)
+        keep = src != dst
+        src, dst, probabilities = src[keep], dst[keep], probabilities[keep]
+        if len(src):
+            keys = src * n + dst
+            order = np.argsort(keys, kind="stable")
+            keys, probabilities = keys[order], probabilities[order]
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            probabilities = np.maximum.reduceat(probabilities, starts)
+            keys = keys[starts]
+            src, dst = keys // n, keys % n
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+        return cls(labels, indptr, dst.astype(np.int64), probabilities)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.labels)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    def find(self, name: str) -> int:
+        """
+        Resolve a node by label ("host:vm-db"), bare name ("vm-db") or the
+        short name of an asset. Raises KeyError if nothing matches.
+        """
+        if name in self.node_ids:
+            return self.node_ids[name]
+        for kind in NODE_KINDS:
+            node = self.node_ids.get(f"{kind}:{name}")
+            if node is not None:
+                return node
+        suffix = "/" + name.lower()
+        for label, node in self.node_ids.items():
+            if label.startswith("asset:") and label.lower().endswith(suffix):
+                return node
+        raise KeyError(f"Unknown entity {name!r} in attack graph")
+
+    def neighbors(self, node: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.indptr[node], self.indptr[node + 1]
+        return self.indices[start:end], self.probabilities[start:end]
+
+    def _bfs(self, source: int, max_hops: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Level-synchronous BFS; each level expands the whole frontier with
+        array ops. Returns (hops, predecessor) with -1 for unreached nodes.
+        """
+        key = ("bfs", source, max_hops)
+        if key not in self._cache:
+            hops = np.full(self.node_count, -1, dtype=np.int64)
+            pred = np.full(self.node_count, -1, dtype=np.int64)
+            hops[source] = 0
+            frontier = np.array([source], dtype=np.int64)
+            level = 0
+            while len(frontier) and (max_hops is None or level < max_hops):
+                starts, ends = self.indptr[frontier], self.indptr[frontier + 1]
+                counts = ends - starts
+                if not counts.sum():
+                    break
+                parents = np.repeat(frontier, counts)
+                offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+                children = self.indices[np.repeat(starts, counts) + offsets]
+                fresh = hops[children] < 0
+                children, first = np.unique(children[fresh], return_index=True)
+                level += 1
+                hops[children] = level
+                pred[children] = parents[fresh][first]
+                frontier = children
+            self._cache[key] = (hops, pred)
+        return self._cache[key]
+
+    def _dijkstra(self, source: int) -> Tuple[np.ndarray, np.ndarray]:
+        key = ("dijkstra", source)
+        if key not in self._cache:
+            matrix = csr_matrix(
+                (-np.log(self.probabilities), self.indices, self.indptr),
+                shape=(self.node_count, self.node_count),
+            )
+            dist, pred = dijkstra(matrix, directed=True, indices=source, return_predecessors=True)
+            self._cache[key] = (dist, pred)
+        return self._cache[key]
+
+    @staticmethod
+    def _walk(pred: np.ndarray, source: int, target: int) -> List[int]:
+        path = [target]
+        while path[-1] != source:
+            parent = int(pred[path[-1]])
+            if parent < 0:
+                return []
+            path.append(parent)
+        return path[::-1]
+
+    def _edge_probability(self, a: int, b: int) -> float:
+        nbrs, probs = self.neighbors(a)
+        return float(probs[np.searchsorted(nbrs, b)])
+
+    def _describe_path(self, path: List[int]) -> Dict[str, Any]:
+        hops = [
+            {"from": self.labels[a], "to": self.labels[b], "probability": round(self._edge_probability(a, b), 3)}
+            for a, b in pairwise(path)
+        ]
+        probability = math.prod(h["probability"] for h in hops) if hops else 1.0
+        return {
+            "nodes": [self.labels[i] for i in path],
+            "hops": hops,
+            "probability": round(probability, 4),
+        }
+
+    def shortest_path(self, source: str, target: str) -> Optional[Dict[str, Any]]:
+        """Fewest-hop path, or None if target is unreachable."""
+        src, dst = self.find(source), self.find(target)
+        _, pred = self._bfs(src)
+        path = self._walk(pred, src, dst)
+        return self._describe_path(path) if path else None
+
+    def riskiest_path(self, source: str, target: str) -> Optional[Dict[str, Any]]:
+        """Path with the highest traversal probability, or None."""
+        src, dst = self.find(source), self.find(target)
+        dist, pred = self._dijkstra(src)
+        if not np.isfinite(dist[dst]):
+            return None
+        return self._describe_path(self._walk(pred, src, dst))
+
+    def blast_radius(self, source: str, max_hops: int = 3, min_probability: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        Nodes reachable from `source` within `max_hops`, with the best
+        probability of reaching each; most exposed first.
+        """
+        src = self.find(source)
+        hops, _ = self._bfs(src, max_hops)
+        dist, _ = self._dijkstra(src)
+        reached = np.flatnonzero(hops > 0)
+        probability = np.exp(-dist[reached])
+        keep = probability >= min_probability
+        reached, probability = reached[keep], probability[keep]
+        order = np.lexsort((hops[reached], -probability))
+        return [
+            {"node": self.labels[i], "hops": int(hops[i]), "probability": round(float(p), 4)}
+            for i, p in zip(reached[order], probability[order], strict=True)
+        ]
+
+    def summary(self, top: int = 10) -> Dict[str, Any]:
+        """Node/edge counts and the highest-fan-out nodes."""
+        degree = np.diff(self.indptr)
+        hubs = np.argsort(-degree, kind="stable")[:top]
+        return {
+            "nodes": self.node_count,
+            "edges": self.edge_count,
+            "top_fan_out": [
+                {"node": self.labels[i], "out_edges": int(degree[i])} for i in hubs if degree[i]
+            ],
+        }
+
+
+def kind_labels(kind: str, names: Sequence[Any]) -> List[str]:
+    return [f"{kind}:{name}" for name in names]
@@ -0,0 +1,271 @@
+import heapq
+import re
+from collections import Counter, OrderedDict, deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.models.threat import Threat
+from app.utils.time_utils import from_epoch_seconds, to_epoch_seconds
+
+_FAILURE_RE = re.compile(
+    r"failed (?:login|password|logon|sign-?in|authentication)|login failed|authentication fail"
+    r"|invalid (?:user|credentials|password)|bad password|access denied for user",
+    re.IGNORECASE,
+)
+_SUCCESS_RE = re.compile(
+    r"accepted (?:password|publickey)|(?:login|logon|sign-?in|authentication) (?:succeeded|successful)"
+    r"|successful(?:ly)? (?:login|logged in|sign-?in)|logged in",
+    re.IGNORECASE,
+)
+# "for user alice", "user=alice", "account: 'bob@corp.com'", "invalid user admin"
+_ACCOUNT_RE = re.compile(
+    r"(?:\b(?:user(?:name)?|account|principal)\b\s*[=:]?\s*|\bfor\s+(?:invalid\s+)?(?:user\s+)?)['\"]?([\w.@+-]+)",
+    re.IGNORECASE,
+)
+_ACCOUNT_KEYS = ("account", "user", "username", "principal", "principal_email")
+# Words the account pattern can pick up that are never account names
+_NOT_ACCOUNTS = {"from", "on", "via", "with", "user", "invalid", "port"}
+
+
+class AuthEvent(NamedTuple):
+    timestamp: float
+    account: Optional[str]  # None when the row names no account
+    ip: str
+    success: bool
+
+
+def parse_auth_event(row: Dict[str, Any]) -> Optional[AuthEvent]:
+    """
+    Classify a log row as a failed or successful authentication and
+    extract the target account. Returns None for non-auth rows.
+    """
+    message = str(row.get("message") or "")
+    if _FAILURE_RE.search(message):
+        success = False
+    elif _SUCCESS_RE.search(message):
+        success = True
+    else:
+        return None
+    ts = to_epoch_seconds(row.get("timestamp"))
+    if ts != ts:
+        return None
+    account = extract_account(row, message)
+    return AuthEvent(ts, account.lower() if account else None, str(row.get("ip") or "unknown"), success)
+
+
+def extract_account(row: Dict[str, Any], message: Optional[str] = None) -> Optional[str]:
+    """
+    Account a log row refers to: an explicit account/user column if the
+    row has one, else a name parsed out of the message.
+    """
+    account = next((str(row[k]) for k in _ACCOUNT_KEYS if row.get(k)), None)
+    if account is not None:
+        return account
+    if message is None:
+        message = str(row.get("message") or "")
+    for match in _ACCOUNT_RE.finditer(message):
+        candidate = match.group(1)
+        if candidate.lower() not in _NOT_ACCOUNTS:
+            return candidate
+    return None
+
+
+class _Window:
+    """
+    Time-bounded window of failed logins for one key that tracks how many
+    distinct values (accounts or IPs) it has seen. Holds at most `cap` events.
+    """
+
+    __slots__ = ("distinct", "events")
+
+    def __init__(self):
+        self.events: deque = deque()
+        self.distinct: Counter = Counter()
+
+    @property
+    def failures(self) -> int:
+        return len(self.events)
+
+    def add(self, ts: float, value: str, window: float, cap: int) -> None:
+        self.events.append((ts, value))
+        self.distinct[value] += 1
+        self.expire(ts, window, cap)
+
+    def expire(self, ts: float, window: float, cap: int) -> None:
+        while self.events and (ts - self.events[0][0] > window or len(self.events) > cap):
+            _, old = self.events.popleft()
+            self.distinct[old] -= 1
+            if not self.distinct[old]:
+                del self.distinct[old]
+
+
+class _WindowTable:
+    """
+    Per-key sliding windows with LRU eviction once `max_keys` is reached,
+    so memory stays bounded however many accounts and IPs show up.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.windows: "OrderedDict[Any, _Window]" = OrderedDict()
+
+    def add(self, key: Any, ts: float, value: str, window: float, cap: int) -> _Window:
+        win = self.windows.get(key)
+        if win is None:
+            win = self.windows[key] = _Window()
+            if len(self.windows) > self.max_keys:
+                self.windows.popitem(last=False)
+        else:
+            self.windows.move_to_end(key)
+        win.add(ts, value, window, cap)
+        return win
+
+
+class CredentialAttackDetector:
+    """
+    Sliding-window credential attack detector.
+
+    Keeps failure windows per source IP (distinct accounts tried), per
+    account (distinct source IPs) and per (account, IP) pair, and flags:
+      - brute_force: many failures for one account from one IP
+      - password_spray: one IP failing against many accounts
+      - credential_stuffing: a spraying IP that also logs in successfully
+      - distributed_attack: one account failing from many IPs
+    Events must be fed in timestamp order (see `detect`). Failures that
+    name no account are ignored: folding them into one shared account
+    would make unrelated failures look like a brute force.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 600.0,
+        brute_force_failures: int = 10,
+        spray_accounts: int = 10,
+        distributed_ips: int = 10,
+        max_keys: int = 100000,
+        max_events_per_key: int = 1000,
+        reorder_buffer: int = 10000,
+    ):
+        self.window_seconds = window_seconds
+        self.reorder_buffer = reorder_buffer
+        self.brute_force_failures = brute_force_failures
+        self.spray_accounts = spray_accounts
+        self.distributed_ips = distributed_ips
+        self.max_events_per_key = max_events_per_key
+        self.by_ip = _WindowTable(max_keys)
+        self.by_account = _WindowTable(max_keys)
+        self.by_pair = _WindowTable(max_keys)
+        # (pattern, key) -> finding; one finding per attacker/target
+        self.findings: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+
+    def _flag(self, pattern: str, key: Any, ts: float, events: int, distinct: int) -> None:
+        finding = self.findings.get((pattern, key))
+        if finding is None:
+            self.findings[(pattern, key)] = {
+                "pattern": pattern, "key": key, "first_seen": ts, "last_seen": ts,
+                "events": events, "distinct": distinct,
+            }
+        else:
+            finding["last_seen"] = ts
+            finding["events"] = max(finding["events"], events)
+            finding["distinct"] = max(finding["distinct"], distinct)
+
+    def observe(self, event: AuthEvent) -> None:
+        window, cap = self.window_seconds, self.max_events_per_key
+        ts, account, ip = event.timestamp, event.account, event.ip
+        if event.success:
+            # A success from an IP that is currently spraying many accounts
+            win = self.by_ip.windows.get(ip)
+            if win is None:
+                return
+            win.expire(ts, window, cap)
+            if len(win.distinct) >= self.spray_accounts:
+                self._flag("credential_stuffing", ip, ts, win.failures, len(win.distinct))
+            return
+        if account is None:
+            return
+
+        ip_win = self.by_ip.add(ip, ts, account, window, cap)
+        if len(ip_win.distinct) >= self.spray_accounts:
+            self._flag("password_spray", ip, ts, ip_win.failures, len(ip_win.distinct))
+        account_win = self.by_account.add(account, ts, ip, window, cap)
+        if len(account_win.distinct) >= self.distributed_ips:
+            self._flag("distributed_attack", account, ts, account_win.failures, len(account_win.distinct))
+        pair_win = self.by_pair.add((account, ip), ts, account, window, cap)
+        if pair_win.failures >= self.brute_force_failures:
+            self._flag("brute_force", (account, ip), ts, pair_win.failures, 1)
+
+    def detect(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Observe auth events as rows stream in and return the findings
+        (newest activity first). Rows should arrive roughly oldest first;
+        a heap of at most `reorder_buffer` events puts them in time order,
+        so memory stays bounded however many rows are streamed.
+        """
+        heap: List[Tuple[float, int, AuthEvent]] = []
+        for seq, event in enumerate(map(parse_auth_event, rows)):
+            if event is None:
+                continue
+            if len(heap) < self.reorder_buffer:
+                heapq.heappush(heap, (event.timestamp, seq, event))
+            else:
+                self.observe(heapq.heappushpop(heap, (event.timestamp, seq, event))[2])
+        while heap:
+            self.observe(heapq.heappop(heap)[2])
+        return sorted(self.findings.values(), key=lambda f: f["last_seen"], reverse=True)
+
+
+_SEVERITY = {
+    "credential_stuffing": "critical",
+    "password_spray": "high",
+    "distributed_attack": "high",
+    "brute_force": "medium",
+}
+_TITLES = {
+    "credential_stuffing": "Credential Stuffing",
+    "password_spray": "Password Spray",
+    "distributed_attack": "Distributed Login Attack",
+    "brute_force": "Brute Force Login",
+}
+
+
+def describe_finding(finding: Dict[str, Any]) -> Tuple[Optional[str], Optional[str], str]:
+    """
+    Returns (source_ip, target_account, description) for a finding.
+    """
+    pattern, key = finding["pattern"], finding["key"]
+    if pattern == "brute_force":
+        account, ip = key
+        return ip, account, f"{finding['events']} failed logins for account {account} from {ip}"
+    if pattern == "distributed_attack":
+        return None, key, (
+            f"{finding['events']} failed logins for account {key} from {finding['distinct']} source IPs"
+        )
+    text = f"{finding['events']} failed logins across {finding['distinct']} accounts from {key}"
+    if pattern == "credential_stuffing":
+        text += ", followed by a successful login"
+    return key, None, text
+
+
+def detect_credential_attacks(rows: Iterable[Dict[str, Any]], **kwargs: Any) -> List[Threat]:
+    """
+    Run the sliding-window detector over log rows and return one Threat
+    per attacking IP / targeted account, most severe first.
+    """
+    findings = CredentialAttackDetector(**kwargs).detect(rows)
+    order = {"critical": 0, "high": 1, "medium": 2}
+    findings.sort(key=lambda f: order[_SEVERITY[f["pattern"]]])
+    threats: List[Threat] = []
+    for idx, finding in enumerate(findings, start=1):
+        source_ip, account, description = describe_finding(finding)
+        threats.append(
+            Threat(
+                id=f"auth-{idx:03d}",
+                type=_TITLES[finding["pattern"]],
+                description=description,
+                severity=_SEVERITY[finding["pattern"]],
+                source_ip=source_ip,
+                target_resource=account,
+                timestamp=from_epoch_seconds(finding["last_seen"]),
+            )
+        )
+    return threats
@@ -0,0 +1,158 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.time_utils import from_epoch_seconds
+
+
+def encode_pairs(sources: Iterable[Any], destinations: Iterable[Any]) -> Tuple[np.ndarray, List[Tuple[Any, Any]]]:
+    """
+    Factorise (source, destination) pairs into dense integer codes.
+    Returns (codes, pairs) where pairs[code] is the original key.
+    """
+    lookup: Dict[Tuple[Any, Any], int] = {}
+    codes = np.fromiter(
+        (lookup.setdefault(key, len(lookup)) for key in zip(sources, destinations, strict=True)),
+        dtype=np.int64,
+    )
+    pairs: List[Tuple[Any, Any]] = [None] * len(lookup)  # type: ignore[list-item]
+    for key, code in lookup.items():
+        pairs[code] = key
+    return codes, pairs
+
+
+def periodicity_scores(
+    sorted_times: np.ndarray,
+    start_of: np.ndarray,
+    events: np.ndarray,
+    pair_ids: np.ndarray,
+    n_bins: int = 256,
+    chunk_size: int = 4096,
+) -> np.ndarray:
+    """
+    Autocorrelation periodicity score in [0, 1] for the selected pairs.
+
+    `sorted_times` holds connection timestamps grouped by pair (ascending
+    within a pair) and `start_of[pair]` the offset of each pair's first
+    connection. Each chunk of pairs is binned into a (pairs x bins) count
+    matrix and scored with one batched FFT. A strictly periodic pair scores
+    close to 1, random traffic close to 0.
+    """
+    scores = np.zeros(pair_ids.size)
+    lags = np.arange(2, n_bins // 2)
+    # Normalise each lag by its overlap length so long lags aren't penalised
+    overlap = (n_bins - lags) / n_bins
+    for lo in range(0, pair_ids.size, chunk_size):
+        ids = pair_ids[lo:lo + chunk_size]
+        lengths = events[ids]
+        rows = np.repeat(np.arange(ids.size), lengths)
+        offsets = np.repeat(start_of[ids] - np.r_[0, np.cumsum(lengths)[:-1]], lengths)
+        t = sorted_times[offsets + np.arange(lengths.sum())]
+
+        first = sorted_times[start_of[ids]]
+        span = np.maximum(sorted_times[start_of[ids] + lengths - 1] - first, 1e-9)
+        bins = ((t - first[rows]) / span[rows] * (n_bins - 1)).astype(np.int64)
+        counts = np.bincount(rows * n_bins + bins, minlength=ids.size * n_bins)
+        series = counts.reshape(ids.size, n_bins).astype(np.float64)
+        series -= series.mean(axis=1, keepdims=True)
+
+        # Zero-pad to avoid circular wrap, then autocorrelation = irfft(|F|^2)
+        spectrum = np.fft.rfft(series, n=2 * n_bins, axis=1)
+        acf = np.fft.irfft(spectrum * np.conj(spectrum), axis=1)[:, : n_bins // 2]
+        energy = acf[:, :1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            normalised = np.where(energy > 0, acf[:, 2:] / (energy * overlap), 0.0)
+        scores[lo:lo + ids.size] = np.nan_to_num(normalised.max(axis=1))
+    return np.clip(scores, 0.0, 1.0)
+
+
+def detect_beacons(
+    pair_codes: np.ndarray,
+    timestamps: np.ndarray,
+    min_events: int = 8,
+    min_interval: float = 1.0,
+    max_jitter: float = 0.15,
+    min_periodicity: float = 0.6,
+    max_candidate_jitter: float = 0.8,
+    n_bins: int = 256,
+) -> List[Dict[str, Any]]:
+    """
+    Vectorised beaconing detection over all (source, destination) pairs.
+
+    `pair_codes` are integer pair ids (see `encode_pairs`) and `timestamps`
+    epoch seconds, one entry per connection. A pair is flagged when it has
+    enough connections and either low inter-arrival jitter (coefficient of
+    variation) or a strong autocorrelation peak. Only pairs whose jitter is
+    below `max_candidate_jitter` (random traffic sits near 1.0) go through
+    the FFT stage.
+    """
+    pair_codes = np.asarray(pair_codes, dtype=np.int64)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    valid = ~np.isnan(timestamps)
+    pair_codes, timestamps = pair_codes[valid], timestamps[valid]
+    if pair_codes.size < 2:
+        return []
+
+    # One argsort on a combined (pair, time) key is much cheaper than lexsort
+    t_min = timestamps.min()
+    span = timestamps.max() - t_min + 1.0
+    order = np.argsort(pair_codes * span + (timestamps - t_min))
+    p = pair_codes[order]
+    t = timestamps[order]
+    n_pairs = int(p.max()) + 1
+
+    events = np.bincount(p, minlength=n_pairs)
+    starts = np.flatnonzero(np.r_[True, p[1:] != p[:-1]])
+    ends = np.r_[starts[1:], p.size] - 1
+    start_of = np.zeros(n_pairs, dtype=np.int64)
+    start_of[p[starts]] = starts
+    first_seen = np.zeros(n_pairs)
+    last_seen = np.zeros(n_pairs)
+    first_seen[p[starts]] = t[starts]
+    last_seen[p[starts]] = t[ends]
+
+    same = p[1:] == p[:-1]
+    gaps = np.diff(t)[same]
+    gap_pair = p[1:][same]
+    n_gaps = np.bincount(gap_pair, minlength=n_pairs)
+    gap_sum = np.bincount(gap_pair, weights=gaps, minlength=n_pairs)
+    gap_sq = np.bincount(gap_pair, weights=gaps * gaps, minlength=n_pairs)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = gap_sum / n_gaps
+        std = np.sqrt(np.maximum(gap_sq / n_gaps - mean * mean, 0.0))
+        jitter = std / mean
+
+    candidates = np.flatnonzero(
+        (events >= min_events) & (mean >= min_interval) & (jitter <= max_candidate_jitter)
+    )
+    if candidates.size == 0:
+        return []
+    periodicity = np.zeros(n_pairs)
+    periodicity[candidates] = periodicity_scores(t, start_of, events, candidates, n_bins)
+
+    regular = jitter[candidates] <= max_jitter
+    periodic = periodicity[candidates] >= min_periodicity
+    flagged = candidates[regular | periodic]
+
+    return [
+        {
+            "pair": int(code),
+            "events": int(events[code]),
+            "mean_interval_s": round(float(mean[code]), 3),
+            "jitter": round(float(jitter[code]), 4),
+            "periodicity": round(float(periodicity[code]), 4),
+            "severity": "high" if jitter[code] <= max_jitter and periodicity[code] >= min_periodicity else "medium",
+            "first_seen": from_epoch_seconds(first_seen[code]),
+            "last_seen": from_epoch_seconds(last_seen[code]),
+        }
+        for code in flagged
+    ]
+
+
+def connection_endpoints(row: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Extract (source, destination) from a log or VPC flow log row.
+    """
+    src = row.get("src_ip") or row.get("ip")
+    dst = row.get("dest_ip") or row.get("dst_ip") or row.get("destination") or row.get("resource")
+    return src, dst
@@ -1,19 +1,55 @@
+import re
 from app.models.containment_action import ContainmentAction
-# from datetime import datetime
+from app.utils.rate_limiter import ApiRateLimiter, get_api_limiter
+from datetime import datetime
 from google.cloud import compute_v1
 from logging import getLogger
-import datetime
+from typing import Optional, Tuple
 
 logger = getLogger(__name__)
 
-def isolate_vm(instance_name: str, zone: str, project_id: str) -> ContainmentAction:
-    """Stops a VM instance."""
+# projects/<p>/zones/<z>/instances/<name>, optionally as a full API or asset URL
+_INSTANCE_PATH_RE = re.compile(r"projects/([^/]+)/zones/([^/]+)/instances/([^/]+)$")
+
+def parse_instance(resource: str, default_project: str) -> Tuple[str, Optional[str], str]:
+    """
+    Split a VM reference into (project, zone, instance). Accepts a full
+    resource name or URL, "zone/instance", or a bare instance name (zone
+    unknown, returned as None).
+    """
+    match = _INSTANCE_PATH_RE.search(resource)
+    if match:
+        return match.group(1), match.group(2), match.group(3)
+    if "/" in resource:
+        zone, name = resource.rsplit("/", 1)
+        return default_project, zone.rsplit("/", 1)[-1], name
+    return default_project, None, resource
+
+def isolate_vm(
+    instance_name: str,
+    zone: str,
+    project_id: str,
+    client: Optional[compute_v1.InstancesClient] = None,
+    timeout: Optional[float] = None,
+    limiter: Optional[ApiRateLimiter] = None,
+) -> ContainmentAction:
+    """
+    Requests a VM stop. The action stays "pending" with the stop
+    operation's name until an OperationTracker settles it. Pass `client`
+    to reuse one across many calls. The call goes through the shared
+    Compute rate limiter (or `limiter`).
+    """
+    operation = None
     try:
-        client = compute_v1.InstancesClient()
-        op = client.stop(project=project_id, zone=zone, instance=instance_name)
-        logger.info(f"Stopped VM {instance_name} (zone={zone}): op={op.name}")
-        status = "executed"
-        message = f"VM {instance_name} stopped successfully."
+        client = client or compute_v1.InstancesClient()
+        op = (limiter or get_api_limiter()).call(
+            "compute", project_id, client.stop,
+            project=project_id, zone=zone, instance=instance_name, timeout=timeout, max_wait=timeout,
+        )
+        logger.info(f"Stopping VM {instance_name} (zone={zone}): op={op.name}")
+        status = "pending"
+        operation = op.name
+        message = f"Stop of VM {instance_name} requested."
     except Exception as e:
         logger.error(f"Failed to stop VM {instance_name}: {e}")
         status = "failed"
@@ -24,6 +60,7 @@ def isolate_vm(instance_name: str, zone: str, project_id: str) -> ContainmentAct
         action_type="isolate_vm",
         status=status,
         justification=message,
+        operation=operation,
         timestamp=datetime.utcnow().isoformat(),
     )
 
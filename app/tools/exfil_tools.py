@@ -0,0 +1,271 @@
+import ipaddress
+from functools import lru_cache
+from itertools import islice
+from statistics import NormalDist
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.investigation_result import ExfiltrationEstimate
+from app.tools.investigation_tools import factorize
+from app.utils.time_utils import from_epoch_seconds, to_epoch_array
+
+HOUR_SECONDS = 3600
+
+
+@lru_cache(maxsize=65536)
+def _is_public(ip: Any) -> bool:
+    try:
+        return ipaddress.ip_address(ip).is_global
+    except (TypeError, ValueError):
+        return False
+
+
+class HeavyHitters:
+    """
+    Mergeable Misra-Gries summary of weighted keys holding at most
+    `capacity` counters. Each kept count underestimates the key's true
+    total by at most `offset`; untracked keys total at most `offset`.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Dict[Hashable, float] = {}
+        self.offset = 0.0
+
+    def prune(self, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Reduce a batch of exact weights to its own top `capacity` before
+        merging (summaries stay mergeable; the error bound adds up).
+        Returns (indices kept, their adjusted weights).
+        """
+        excess = len(weights) - self.capacity
+        if excess <= 0:
+            return np.arange(len(weights)), weights
+        threshold = float(np.partition(weights, excess - 1)[excess - 1])
+        self.offset += threshold
+        kept = np.flatnonzero(weights > threshold)
+        return kept, weights[kept] - threshold
+
+    def merge(self, keys: Sequence[Hashable], weights: Sequence[float]) -> None:
+        counts = self.counts
+        for key, weight in zip(keys, weights, strict=True):
+            counts[key] = counts.get(key, 0.0) + weight
+        excess = len(counts) - self.capacity
+        if excess > 0:
+            # Subtract the (capacity + 1)-th largest count from every counter
+            values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+            threshold = float(np.partition(values, excess - 1)[excess - 1])
+            self.offset += threshold
+            self.counts = {k: c - threshold for k, c in counts.items() if c > threshold}
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[Hashable, float, float]]:
+        """(key, lower bound, upper bound) for the heaviest keys."""
+        ranked = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:n]
+        return [(key, c, c + self.offset) for key, c in ranked]
+
+
+class ExfiltrationEstimator:
+    """
+    One-pass, bounded-memory estimator of data exfiltrated over flow logs.
+
+    Rows are consumed in chunks; each chunk is reduced with array ops to
+      - exact bytes out per (source, hour), the per-source baselines;
+      - bytes per (source, destination, hour), merged into a heavy-hitter
+        summary that names the top destinations.
+    Only internal -> public traffic counts. An hour is anomalous when it
+    exceeds the mean of the source's other hours by `anomaly_z` standard
+    deviations; its excess over that baseline is the exfiltration
+    estimate, bounded by the baseline's `confidence` interval.
+    """
+
+    def __init__(
+        self,
+        confidence: float = 0.95,
+        anomaly_z: float = 3.0,
+        min_bytes: int = 50 * 2 ** 20,
+        min_baseline_hours: int = 3,
+        top_k: int = 1000,
+        max_sources: int = 50000,
+        chunk_size: int = 50000,
+    ):
+        self.confidence = confidence
+        self.z = NormalDist().inv_cdf((1 + confidence) / 2)
+        self.anomaly_z = anomaly_z
+        self.min_bytes = min_bytes
+        self.min_baseline_hours = min_baseline_hours
+        self.max_sources = max_sources
+        self.chunk_size = chunk_size
+        self.flows = HeavyHitters(top_k)
+        self.source_ids: Dict[str, int] = {}
+        self.hourly: Dict[int, np.ndarray] = {}  # hour -> bytes out per source id
+        self.rows = 0
+        self.outbound_bytes = 0.0
+        self.untracked_bytes = 0.0  # from sources beyond max_sources
+        self.first_ts = np.inf
+        self.last_ts = -np.inf
+
+    def add_rows(self, rows: Iterable[Dict[str, Any]]) -> "ExfiltrationEstimator":
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                return self
+            self._add_chunk(chunk)
+
+    def _source_codes(self, names: List[Any]) -> np.ndarray:
+        ids = np.empty(len(names), dtype=np.int64)
+        for i, name in enumerate(names):
+            source_id = self.source_ids.get(name)
+            if source_id is None:
+                if len(self.source_ids) >= self.max_sources:
+                    ids[i] = -1
+                    continue
+                source_id = self.source_ids[name] = len(self.source_ids)
+            ids[i] = source_id
+        return ids
+
+    def _add_chunk(self, chunk: List[Dict[str, Any]]) -> None:
+        self.rows += len(chunk)
+        src_codes, src_names = factorize([r.get("src_ip") for r in chunk])
+        dst_codes, dst_names = factorize([r.get("dest_ip") for r in chunk])
+        sent = np.array([r.get("bytes_sent") or 0 for r in chunk], dtype=np.float64)
+        ts = to_epoch_array([r.get("timestamp") for r in chunk])
+
+        # Classify each distinct address once
+        internal_src = np.array([not _is_public(s) for s in src_names] + [False])
+        public_dst = np.array([_is_public(d) for d in dst_names] + [False])
+        keep = internal_src[src_codes] & public_dst[dst_codes] & (sent > 0) & ~np.isnan(ts)
+        if not keep.any():
+            return
+        src_codes, dst_codes, sent, ts = src_codes[keep], dst_codes[keep], sent[keep], ts[keep]
+        self.first_ts = min(self.first_ts, float(ts.min()))
+        self.last_ts = max(self.last_ts, float(ts.max()))
+        self.outbound_bytes += float(sent.sum())
+        hours = (ts // HOUR_SECONDS).astype(np.int64)
+
+        # Per (source, destination, hour) totals into the heavy-hitter summary
+        h0 = int(hours.min())
+        n_dst, n_hours = len(dst_names), int(hours.max()) - h0 + 1
+        flow_key = (src_codes * n_dst + dst_codes) * n_hours + (hours - h0)
+        keys, inverse = np.unique(flow_key, return_inverse=True)
+        kept, totals = self.flows.prune(np.bincount(inverse, weights=sent))
+        keys = keys[kept]
+        pairs, hour_part = keys // n_hours, (keys % n_hours + h0).tolist()
+        srcs, dsts = (pairs // n_dst).tolist(), (pairs % n_dst).tolist()
+        self.flows.merge(
+            [(src_names[s], dst_names[d], h) for s, d, h in zip(srcs, dsts, hour_part, strict=True)],
+            totals.tolist(),
+        )
+
+        # Exact per (source, hour) totals
+        used = np.unique(src_codes)
+        chunk_ids = np.full(len(src_names), -1, dtype=np.int64)
+        chunk_ids[used] = self._source_codes([src_names[i] for i in used])
+        source_ids = chunk_ids[src_codes]
+        tracked = source_ids >= 0
+        self.untracked_bytes += float(sent[~tracked].sum())
+        size = len(self.source_ids)
+        for hour in np.unique(hours[tracked]).tolist():
+            mask = tracked & (hours == hour)
+            row = np.bincount(source_ids[mask], weights=sent[mask], minlength=size)
+            current = self.hourly.get(hour)
+            if current is not None:
+                row[:len(current)] += current
+            self.hourly[hour] = row
+
+    def estimate(
+        self,
+        window_start: Optional[float] = None,
+        window_end: Optional[float] = None,
+        top: int = 10,
+    ) -> ExfiltrationEstimate:
+        start = window_start if window_start is not None else self.first_ts
+        end = window_end if window_end is not None else self.last_ts
+        anomalous: List[Dict[str, Any]] = []
+        if self.hourly:
+            first_hour = int(min(start, self.first_ts) // HOUR_SECONDS)
+            last_hour = int(max(end - 1, self.last_ts) // HOUR_SECONDS)
+            # (hours x sources); silent hours count as zero traffic
+            matrix = np.zeros((last_hour - first_hour + 1, len(self.source_ids)))
+            for hour, row in self.hourly.items():
+                matrix[hour - first_hour, :len(row)] = row
+            anomalous = self._judge(matrix, first_hour)
+
+        names = list(self.source_ids)
+        for finding in anomalous:
+            finding["source"] = names[finding["source"]]
+        flagged = {(f["source"], f["hour"]) for f in anomalous}
+        destinations = []
+        for (src, dst, hour), lower, upper in self.flows.top():
+            hour_start = from_epoch_seconds(hour * HOUR_SECONDS)
+            if (src, hour_start) in flagged:
+                destinations.append({
+                    "source": src, "destination": dst, "hour": hour_start,
+                    "bytes_lower": int(lower), "bytes_upper": int(upper),
+                })
+                if len(destinations) >= top:
+                    break
+        return ExfiltrationEstimate(
+            estimated_bytes=int(sum(f["excess_bytes"] for f in anomalous)),
+            lower_bytes=int(sum(f["excess_lower"] for f in anomalous)),
+            upper_bytes=int(sum(f["excess_upper"] for f in anomalous)),
+            confidence=self.confidence,
+            window_start=from_epoch_seconds(start) if np.isfinite(start) else None,
+            window_end=from_epoch_seconds(end) if np.isfinite(end) else None,
+            flows_scanned=self.rows,
+            outbound_bytes=int(self.outbound_bytes),
+            anomalous_hours=anomalous[:top],
+            top_destinations=destinations,
+        )
+
+    def _judge(self, matrix: np.ndarray, first_hour: int) -> List[Dict[str, Any]]:
+        """
+        Compare every (hour, source) cell against the source's other hours
+        (leave-one-out mean and standard deviation, without a second pass).
+        """
+        n = matrix.shape[0]
+        mean = matrix.mean(axis=0)
+        dev = matrix - mean
+        m2 = (dev ** 2).sum(axis=0)
+        k = n - 1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            loo_mean = mean - dev / k if k else np.zeros_like(matrix)
+            loo_m2 = np.maximum(m2 - dev ** 2 * n / k, 0.0) if k else np.zeros_like(matrix)
+            loo_std = np.sqrt(loo_m2 / (k - 1)) if k > 1 else np.zeros_like(matrix)
+        if k >= self.min_baseline_hours:
+            flagged = (matrix >= self.min_bytes) & (matrix - loo_mean > self.anomaly_z * loo_std)
+            lower = np.maximum(matrix - (loo_mean + self.z * loo_std), 0.0)
+            upper = np.minimum(matrix - np.maximum(loo_mean - self.z * loo_std, 0.0), matrix)
+        else:
+            # No usable baseline: anything up to the full volume may be exfiltration
+            flagged = matrix >= self.min_bytes
+            loo_mean, lower, upper = np.zeros_like(matrix), np.zeros_like(matrix), matrix
+        excess = np.maximum(matrix - loo_mean, 0.0)
+        findings = [
+            {
+                "source": int(s),
+                "hour": from_epoch_seconds((first_hour + int(h)) * HOUR_SECONDS),
+                "bytes": int(matrix[h, s]),
+                "baseline_bytes": int(loo_mean[h, s]),
+                "excess_bytes": int(excess[h, s]),
+                "excess_lower": int(lower[h, s]),
+                "excess_upper": int(upper[h, s]),
+            }
+            for h, s in zip(*np.nonzero(flagged), strict=True)
+        ]
+        findings.sort(key=lambda f: f["excess_bytes"], reverse=True)
+        return findings
+
+
+def estimate_exfiltration(
+    rows: Iterable[Dict[str, Any]],
+    window_start: Optional[float] = None,
+    window_end: Optional[float] = None,
+    **kwargs: Any,
+) -> ExfiltrationEstimate:
+    """
+    Stream flow-log rows (src_ip, dest_ip, bytes_sent, timestamp) through
+    an ExfiltrationEstimator and return its estimate.
+    """
+    return ExfiltrationEstimator(**kwargs).add_rows(rows).estimate(window_start, window_end)
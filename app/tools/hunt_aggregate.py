@@ -0,0 +1,110 @@
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.tools.hunt_filter import HuntFilterError, resolve_column
+from app.utils.json_utils import to_json_safe
+from app.utils.time_utils import from_epoch_seconds, to_epoch_seconds
+
+MAX_KEY_CHARS = 120
+
+# GROUP BY expressions per groupable column; long messages are truncated
+# so near-identical lines still collapse into one key
+GROUP_BY_SQL: Dict[str, str] = {
+    "ip": "ip",
+    "log_type": "log_type",
+    "message": f"SUBSTR(message, 1, {MAX_KEY_CHARS})",
+}
+
+
+def resolve_group_by(group_by: Optional[str]) -> Optional[str]:
+    """
+    Validate the aggregation key. Raises HuntFilterError for timestamps or
+    unknown fields.
+    """
+    if not group_by:
+        return None
+    column = resolve_column(group_by)
+    if column not in GROUP_BY_SQL:
+        raise HuntFilterError(f"Cannot group by {group_by!r}; choose one of {', '.join(GROUP_BY_SQL)}")
+    return column
+
+
+def aggregate_rows(
+    rows: Iterable[Dict[str, Any]],
+    bucket_seconds: int,
+    group_by: Optional[str] = None,
+    top_k: int = 10,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Local counterpart of `BigQueryService.aggregate_logs` for rows that
+    are already in memory (e.g. served from the hot index). Returns the
+    same raw {"histogram": [...], "top": [...]} shape.
+    """
+    histogram: Counter = Counter()
+    per_key: Dict[Any, Counter] = {}
+    first: Dict[Any, float] = {}
+    last: Dict[Any, float] = {}
+    for row in rows:
+        ts = to_epoch_seconds(row.get("timestamp"))
+        if ts != ts:
+            continue
+        bucket = ts // bucket_seconds * bucket_seconds
+        histogram[bucket] += 1
+        if group_by is None:
+            continue
+        key = row.get(group_by)
+        if group_by == "message" and key is not None:
+            key = str(key)[:MAX_KEY_CHARS]
+        per_key.setdefault(key, Counter())[bucket] += 1
+        first[key] = min(first.get(key, ts), ts)
+        last[key] = max(last.get(key, ts), ts)
+
+    totals = sorted(((sum(c.values()), k) for k, c in per_key.items()), key=lambda t: t[0], reverse=True)
+    top = []
+    for count, key in totals[:top_k]:
+        peak_bucket, peak_count = per_key[key].most_common(1)[0]
+        top.append({
+            "key": key,
+            "count": count,
+            "first_seen": from_epoch_seconds(first[key]),
+            "last_seen": from_epoch_seconds(last[key]),
+            "peak": {"bucket": from_epoch_seconds(peak_bucket), "count": peak_count},
+        })
+    return {
+        "histogram": [{"bucket": from_epoch_seconds(b), "count": c} for b, c in sorted(histogram.items())],
+        "top": top,
+    }
+
+
+def format_aggregate(
+    raw: Dict[str, List[Dict[str, Any]]],
+    group_by: Optional[str],
+    bucket_seconds: int,
+    backend: str,
+) -> Dict[str, Any]:
+    """
+    Compact, JSON-safe aggregate response: per-bucket counts, the busiest
+    bucket, and top keys with their own peak bucket (spike candidates).
+    """
+    histogram = [{"start": h["bucket"], "count": int(h["count"])} for h in raw["histogram"]]
+    peak = max(histogram, key=lambda h: h["count"], default=None)
+    top = [
+        {
+            group_by: t["key"],
+            "count": int(t["count"]),
+            "first_seen": t["first_seen"],
+            "last_seen": t["last_seen"],
+            "peak_start": t["peak"]["bucket"],
+            "peak_count": int(t["peak"]["count"]),
+        }
+        for t in raw["top"]
+    ]
+    return to_json_safe({
+        "total_rows": sum(h["count"] for h in histogram),
+        "bucket_seconds": bucket_seconds,
+        "group_by": group_by,
+        "histogram": histogram,
+        "peak_bucket": peak,
+        "top": top,
+        "backend": backend,
+    })
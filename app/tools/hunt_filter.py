@@ -0,0 +1,536 @@
+"""
+Hunt-filter DSL: parses the WHERE-clause style expressions the LLM passes
+to `hunt()` into a typed AST, then compiles that AST into parameterised
+BigQuery SQL (and an equivalent in-process predicate for local backends).
+"""
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple, Union
+
+from app.utils.time_utils import to_epoch_seconds
+
+
+class HuntFilterError(ValueError):
+    """Raised when a hunt filter expression cannot be parsed or compiled."""
+
+
+# Real columns of the `logs` table and their BigQuery parameter types
+COLUMNS: Dict[str, str] = {
+    "ip": "STRING",
+    "timestamp": "TIMESTAMP",
+    "log_type": "STRING",
+    "message": "STRING",
+}
+
+FIELD_ALIASES: Dict[str, str] = {
+    "source_ip": "ip",
+    "src_ip": "ip",
+    "client_ip": "ip",
+    "ip_address": "ip",
+    "time": "timestamp",
+    "event_time": "timestamp",
+    "logtype": "log_type",
+    "type": "log_type",
+    "msg": "message",
+    "text": "message",
+}
+
+# Hallucinated field/value pairs mapped onto message keywords
+MESSAGE_HINTS: Dict[Tuple[str, str], str] = {
+    ("event_type", "authentication"): "authentication",
+    ("authentication.type", "credential-stuffing"): "credential",
+    ("authentication.failure_reason", "invalid_password"): "invalid password",
+}
+
+# Hallucinated counter fields mapped onto message keywords
+COUNT_HINTS: Dict[str, str] = {
+    "failed_login_count": "failed login",
+    "failed_logins": "failed login",
+    "login_failures": "failed login",
+}
+
+
+# --- AST -------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Const:
+    value: bool
+
+
+@dataclass(frozen=True)
+class Compare:
+    field: str
+    op: str  # "=", "!=", "<", "<=", ">", ">="
+    value: Union[str, float, datetime]
+
+
+@dataclass(frozen=True)
+class Contains:
+    """Case-insensitive substring match on a column."""
+    field: str
+    term: str
+
+
+@dataclass(frozen=True)
+class Like:
+    field: str
+    pattern: str
+    case_insensitive: bool = False
+
+
+@dataclass(frozen=True)
+class InList:
+    field: str
+    values: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class And:
+    items: Tuple["Node", ...]
+
+
+@dataclass(frozen=True)
+class Or:
+    items: Tuple["Node", ...]
+
+
+@dataclass(frozen=True)
+class Not:
+    item: "Node"
+
+
+Node = Union[Const, Compare, Contains, Like, InList, And, Or, Not]
+
+
+# --- Tokenizer -------------------------------------------------------------
+
+_TOKEN_RE = re.compile(
+    r"""
+    \s*(?:
+        (?P<string>'(?:[^']|'')*'|"(?:[^"]|"")*")
+      | (?P<ipv4>\d{1,3}(?:\.\d{1,3}){3}(?:/\d{1,2})?)
+      | (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<op><=|>=|!=|<>|==|=|<|>)
+      | (?P<punct>[(),])
+      | (?P<word>[A-Za-z_][\w.\-]*)
+    )
+    """,
+    re.VERBOSE,
+)
+
+_KEYWORDS = {"AND", "OR", "NOT", "LIKE", "IN", "TRUE", "FALSE", "LOWER", "UPPER", "CONTAINS"}
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+
+
+def tokenize(expression: str) -> List[Token]:
+    tokens: List[Token] = []
+    pos = 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = _TOKEN_RE.match(expression, pos)
+        if not match or match.end() == pos:
+            raise HuntFilterError(f"Unexpected input at position {pos}: {expression[pos:pos + 20]!r}")
+        kind = match.lastgroup or ""
+        text = match.group(kind)
+        if kind == "word" and text.upper() in _KEYWORDS:
+            kind, text = "keyword", text.upper()
+        elif kind == "string":
+            quote = text[0]
+            text = text[1:-1].replace(quote * 2, quote)
+        elif kind == "op" and text in ("<>", "=="):
+            text = "!=" if text == "<>" else "="
+        tokens.append(Token(kind, text))
+        pos = match.end()
+        while pos < len(expression) and expression[pos].isspace():
+            pos += 1
+    return tokens
+
+
+def normalize(expression: str) -> str:
+    """
+    Canonical form of an expression (whitespace and keyword case folded),
+    used as the plan cache key.
+    """
+    parts = []
+    for tok in tokenize(expression):
+        if tok.kind == "string":
+            parts.append("'" + tok.text.replace("'", "''") + "'")
+        else:
+            parts.append(tok.text)
+    return " ".join(parts) or "TRUE"
+
+
+# --- Parser ----------------------------------------------------------------
+
+class _Parser:
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset: int = 0) -> Optional[Token]:
+        idx = self.pos + offset
+        return self.tokens[idx] if idx < len(self.tokens) else None
+
+    def next(self) -> Token:
+        tok = self.peek()
+        if tok is None:
+            raise HuntFilterError("Unexpected end of filter expression")
+        self.pos += 1
+        return tok
+
+    def accept(self, kind: str, text: Optional[str] = None) -> bool:
+        tok = self.peek()
+        if tok and tok.kind == kind and (text is None or tok.text == text):
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, kind: str, text: Optional[str] = None) -> Token:
+        tok = self.next()
+        if tok.kind != kind or (text is not None and tok.text != text):
+            raise HuntFilterError(f"Expected {text or kind}, got {tok.text!r}")
+        return tok
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            return Const(True)
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise HuntFilterError(f"Unexpected token {self.peek().text!r}")
+        return node
+
+    def parse_or(self) -> Node:
+        items = [self.parse_and()]
+        while self.accept("keyword", "OR"):
+            items.append(self.parse_and())
+        return items[0] if len(items) == 1 else Or(tuple(items))
+
+    def parse_and(self) -> Node:
+        items = [self.parse_unary()]
+        while self.accept("keyword", "AND"):
+            items.append(self.parse_unary())
+        return items[0] if len(items) == 1 else And(tuple(items))
+
+    def parse_unary(self) -> Node:
+        if self.accept("keyword", "NOT"):
+            return Not(self.parse_unary())
+        return self.parse_primary()
+
+    def parse_primary(self) -> Node:
+        tok = self.peek()
+        if tok is None:
+            raise HuntFilterError("Unexpected end of filter expression")
+        if self.accept("punct", "("):
+            node = self.parse_or()
+            self.expect("punct", ")")
+            return node
+        if self.accept("keyword", "TRUE"):
+            return Const(True)
+        if self.accept("keyword", "FALSE"):
+            return Const(False)
+        if tok.kind == "string":
+            # A bare quoted string is a keyword search over the message
+            self.next()
+            return Contains("message", tok.text.lower())
+        return self.parse_predicate()
+
+    def parse_operand(self) -> Tuple[str, bool]:
+        tok = self.next()
+        if tok.kind == "keyword" and tok.text in ("LOWER", "UPPER"):
+            self.expect("punct", "(")
+            name = self.expect("word").text
+            self.expect("punct", ")")
+            return name, True
+        if tok.kind != "word":
+            raise HuntFilterError(f"Expected a field name, got {tok.text!r}")
+        return tok.text, False
+
+    def parse_value(self) -> Union[str, float]:
+        tok = self.next()
+        if tok.kind in ("string", "ipv4"):
+            return tok.text
+        if tok.kind == "number":
+            return float(tok.text)
+        if tok.kind == "word":
+            # Unquoted identifiers as values, e.g. log_type = AUDIT
+            return tok.text
+        raise HuntFilterError(f"Expected a value, got {tok.text!r}")
+
+    def parse_predicate(self) -> Node:
+        name, folded = self.parse_operand()
+        negate = self.accept("keyword", "NOT")
+        if self.accept("keyword", "LIKE"):
+            node = _make_like(name, str(self.parse_value()), folded)
+        elif self.accept("keyword", "IN"):
+            self.expect("punct", "(")
+            values = [str(self.parse_value())]
+            while self.accept("punct", ","):
+                values.append(str(self.parse_value()))
+            self.expect("punct", ")")
+            node = _make_in(name, values)
+        elif self.accept("keyword", "CONTAINS"):
+            node = _make_contains(name, str(self.parse_value()))
+        else:
+            if negate:
+                raise HuntFilterError("NOT must be followed by LIKE or IN here")
+            op = self.expect("op").text
+            return _make_compare(name, op, self.parse_value())
+        return Not(node) if negate else node
+
+
+def _resolve_field(name: str) -> Optional[str]:
+    key = name.lower()
+    key = FIELD_ALIASES.get(key, key)
+    return key if key in COLUMNS else None
+
+
+def _make_compare(name: str, op: str, value: Union[str, float]) -> Node:
+    column = _resolve_field(name)
+    if column is None:
+        key = name.lower()
+        hint = MESSAGE_HINTS.get((key, str(value).lower()))
+        if hint is not None:
+            if op not in ("=", "!="):
+                raise HuntFilterError(f"{name} can only be compared with = or !=")
+            return Not(Contains("message", hint)) if op == "!=" else Contains("message", hint)
+        if key in COUNT_HINTS:
+            # Rows carry no counter; "more than N failures" narrows to rows
+            # that record a failure, anything else cannot be expressed
+            if op not in (">", ">="):
+                raise HuntFilterError(f"{name} can only be used as {name} > N")
+            return Contains("message", COUNT_HINTS[key])
+        raise HuntFilterError(
+            f"Unknown field {name!r}; available fields: {', '.join(sorted(COLUMNS))}"
+        )
+    if column == "timestamp":
+        if isinstance(value, float):
+            raise HuntFilterError("timestamp must be compared with an ISO-8601 string")
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError as e:
+            raise HuntFilterError(f"Invalid timestamp literal {value!r}") from e
+    elif isinstance(value, float):
+        value = str(int(value)) if value.is_integer() else str(value)
+    return Compare(column, op, value)
+
+
+def _make_like(name: str, pattern: str, folded: bool) -> Node:
+    column = _resolve_field(name)
+    if column is None:
+        raise HuntFilterError(f"Unknown field {name!r}")
+    inner = pattern[1:-1] if len(pattern) >= 2 and pattern.startswith("%") and pattern.endswith("%") else None
+    if inner and not any(c in inner for c in "%_"):
+        return Contains(column, inner.lower())
+    return Like(column, pattern.lower() if folded else pattern, folded)
+
+
+def _make_in(name: str, values: List[str]) -> Node:
+    column = _resolve_field(name)
+    if column is None or column == "timestamp":
+        raise HuntFilterError(f"IN is not supported for field {name!r}")
+    return InList(column, tuple(values))
+
+
+def _make_contains(name: str, term: str) -> Node:
+    column = _resolve_field(name)
+    if column is None:
+        raise HuntFilterError(f"Unknown field {name!r}")
+    return Contains(column, term.lower())
+
+
+def parse_filter(expression: str) -> Node:
+    return _Parser(tokenize(expression or "")).parse()
+
+
+# --- Compilation -----------------------------------------------------------
+
+class QueryParam(NamedTuple):
+    name: str
+    type: str  # BigQuery scalar type, e.g. "STRING" or "TIMESTAMP"
+    value: Any
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@lru_cache(maxsize=256)
+def _like_regex(pattern: str, case_insensitive: bool) -> "re.Pattern[str]":
+    body = "".join(".*" if c == "%" else "." if c == "_" else re.escape(c) for c in pattern)
+    return re.compile(f"^{body}$", (re.IGNORECASE if case_insensitive else 0) | re.DOTALL)
+
+
+_OPS: Dict[str, Callable[[Any, Any], bool]] = {
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+@dataclass(frozen=True)
+class HuntPlan:
+    """
+    A compiled hunt filter: the AST, parameterised SQL for a given column
+    mapping, and a row predicate for local evaluation.
+    """
+    expression: str
+    ast: Node
+    sql: str
+    params: Tuple[QueryParam, ...]
+    columns: Tuple[Tuple[str, str], ...] = ()
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        return evaluate(self.ast, row, dict(self.columns))
+
+    def terms(self) -> List[str]:
+        """Message substrings that every matching row must contain."""
+        return required_terms(self.ast)
+
+    def fields(self) -> Set[str]:
+        """Logical columns the filter references."""
+        return referenced_fields(self.ast)
+
+
+class _SqlCompiler:
+    def __init__(self, columns: Dict[str, str]):
+        self.columns = columns
+        self.params: List[QueryParam] = []
+
+    def param(self, type_: str, value: Any) -> str:
+        name = f"p{len(self.params)}"
+        self.params.append(QueryParam(name, type_, value))
+        return f"@{name}"
+
+    def col(self, name: str) -> str:
+        return self.columns.get(name, name)
+
+    def compile(self, node: Node) -> str:
+        if isinstance(node, Const):
+            return "TRUE" if node.value else "FALSE"
+        if isinstance(node, Compare):
+            return f"{self.col(node.field)} {node.op} {self.param(COLUMNS[node.field], node.value)}"
+        if isinstance(node, Contains):
+            return f"LOWER({self.col(node.field)}) LIKE {self.param('STRING', '%' + _escape_like(node.term) + '%')}"
+        if isinstance(node, Like):
+            target = f"LOWER({self.col(node.field)})" if node.case_insensitive else self.col(node.field)
+            return f"{target} LIKE {self.param('STRING', node.pattern)}"
+        if isinstance(node, InList):
+            return f"{self.col(node.field)} IN UNNEST({self.param('ARRAY<STRING>', list(node.values))})"
+        if isinstance(node, Not):
+            return f"NOT ({self.compile(node.item)})"
+        joiner = " AND " if isinstance(node, And) else " OR "
+        return "(" + joiner.join(self.compile(item) for item in node.items) + ")"
+
+
+def evaluate(node: Node, row: Dict[str, Any], columns: Optional[Dict[str, str]] = None) -> bool:
+    """
+    Evaluate a filter AST against an in-memory row (local backends).
+    """
+    columns = columns or {}
+
+    def get(name: str) -> Any:
+        return row.get(columns.get(name, name))
+
+    if isinstance(node, Const):
+        return node.value
+    if isinstance(node, Compare):
+        value = get(node.field)
+        if value is None:
+            return False
+        if node.field == "timestamp":
+            return _OPS[node.op](to_epoch_seconds(value), to_epoch_seconds(node.value))
+        return _OPS[node.op](str(value), node.value)
+    if isinstance(node, Contains):
+        return node.term in str(get(node.field) or "").lower()
+    if isinstance(node, Like):
+        value = str(get(node.field) or "")
+        return bool(_like_regex(node.pattern, node.case_insensitive).match(value))
+    if isinstance(node, InList):
+        return str(get(node.field)) in node.values
+    if isinstance(node, Not):
+        return not evaluate(node.item, row, columns)
+    if isinstance(node, And):
+        return all(evaluate(item, row, columns) for item in node.items)
+    return any(evaluate(item, row, columns) for item in node.items)
+
+
+def required_terms(node: Node) -> List[str]:
+    if isinstance(node, Contains) and node.field == "message":
+        return [node.term]
+    if isinstance(node, And):
+        return [t for item in node.items for t in required_terms(item)]
+    return []
+
+
+def referenced_fields(node: Node) -> Set[str]:
+    """Logical columns an expression reads."""
+    if isinstance(node, (Compare, Contains, Like, InList)):
+        return {node.field}
+    if isinstance(node, Not):
+        return referenced_fields(node.item)
+    if isinstance(node, (And, Or)):
+        return {f for item in node.items for f in referenced_fields(item)}
+    return set()
+
+
+def time_lower_bound(node: Node) -> Optional[float]:
+    """
+    Earliest timestamp (epoch seconds) a matching row can have, if the
+    expression bounds it from below with a top-level `timestamp >`/`>=`.
+    """
+    if isinstance(node, Compare) and node.field == "timestamp" and node.op in (">", ">=", "="):
+        return to_epoch_seconds(node.value)
+    if isinstance(node, And):
+        bounds = [b for b in map(time_lower_bound, node.items) if b is not None]
+        return max(bounds) if bounds else None
+    return None
+
+
+def resolve_column(name: str) -> str:
+    """
+    Map a (possibly aliased) field name onto a real column.
+    Raises HuntFilterError for unknown fields.
+    """
+    column = _resolve_field(name)
+    if column is None:
+        raise HuntFilterError(f"Unknown field {name!r}; available fields: {', '.join(sorted(COLUMNS))}")
+    return column
+
+
+@lru_cache(maxsize=512)
+def _compile_normalized(normalized: str, columns: Tuple[Tuple[str, str], ...]) -> HuntPlan:
+    ast = parse_filter(normalized)
+    compiler = _SqlCompiler(dict(columns))
+    sql = compiler.compile(ast)
+    return HuntPlan(normalized, ast, sql, tuple(compiler.params), columns)
+
+
+def compile_node(node: Node, columns: Optional[Dict[str, str]] = None) -> HuntPlan:
+    """
+    Compile an AST built in code (rather than parsed from an expression)
+    into a HuntPlan; used for filters derived from structured inputs.
+    """
+    mapping = tuple(sorted((columns or {}).items()))
+    compiler = _SqlCompiler(dict(mapping))
+    sql = compiler.compile(node)
+    return HuntPlan(sql, node, sql, tuple(compiler.params), mapping)
+
+
+def compile_filter(expression: str, columns: Optional[Dict[str, str]] = None) -> HuntPlan:
+    """
+    Compile a hunt filter into a cached HuntPlan. Equivalent expressions
+    (modulo whitespace and keyword case) share one plan and produce
+    byte-identical SQL, so repeat hunts hit BigQuery's query cache.
+    `columns` optionally maps logical fields to a source's column names.
+    """
+    mapping = tuple(sorted((columns or {}).items()))
+    return _compile_normalized(normalize(expression or "TRUE"), mapping)
@@ -0,0 +1,60 @@
+import heapq
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional
+
+from app.tools.hunt_filter import COLUMNS
+from app.utils.time_utils import to_epoch_seconds
+
+
+class HuntSource(NamedTuple):
+    """
+    A table a fan-out hunt can target. `columns` maps logical hunt-filter
+    fields onto the table's physical columns (None: same names); `fields`
+    lists the logical fields the table actually has, so filters on missing
+    ones skip it.
+    """
+    name: str
+    table: str
+    base_filter: str = "TRUE"
+    columns: Optional[Dict[str, str]] = None
+    fields: FrozenSet[str] = frozenset(COLUMNS)
+
+    @property
+    def time_column(self) -> str:
+        return (self.columns or {}).get("timestamp", "timestamp")
+
+
+HUNT_SOURCES: Dict[str, HuntSource] = {
+    # `logs` and `audit_logs` partition the logs table so fan-out never returns a row twice
+    "logs": HuntSource("logs", "logs", "(log_type IS NULL OR log_type != 'AUDIT')"),
+    "audit_logs": HuntSource("audit_logs", "logs", "log_type = 'AUDIT'"),
+    "darkweb_chatter": HuntSource(
+        "darkweb_chatter",
+        "darkweb_chatter",
+        columns={"message": "chatter_text", "timestamp": "event_time"},
+        fields=frozenset({"message", "timestamp"}),
+    ),
+}
+
+
+def canonical_row(source: HuntSource, row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Expose a source row under logical field names and tag its origin.
+    """
+    out = dict(row)
+    for logical, physical in (source.columns or {}).items():
+        out[logical] = row.get(physical)
+    out["hunt_source"] = source.name
+    return out
+
+
+def _sort_key(row: Dict[str, Any]) -> float:
+    ts = to_epoch_seconds(row.get("timestamp"))
+    return ts if ts == ts else float("-inf")
+
+
+def merge_newest_first(streams: Iterable[List[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+    """
+    Lazy k-way merge of per-source results that are each already sorted
+    newest first; rows without a usable timestamp sort last.
+    """
+    return heapq.merge(*streams, key=_sort_key, reverse=True)
@@ -0,0 +1,213 @@
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+_IPV4_RE = re.compile(r"(?<![\d.])(?:(?:25[0-5]|2[0-4]\d|1?\d?\d)\.){3}(?:25[0-5]|2[0-4]\d|1?\d?\d)(?![\d.])")
+_DOMAIN_RE = re.compile(r"(?<![\w.-])(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,24}(?![\w-])", re.IGNORECASE)
+_CVE_RE = re.compile(r"CVE-\d{4}-\d{4,7}", re.IGNORECASE)
+_IOC_KEYS = ("indicators", "iocs", "exploit_strings", "signatures")
+# File-like suffixes that the domain pattern would otherwise pick up
+_NOT_TLDS = {"py", "js", "sh", "exe", "dll", "txt", "html", "php", "json", "xml", "md", "zip", "log"}
+_WORD_CHARS = set("abcdefghijklmnopqrstuvwxyz0123456789-_.")
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton for case-insensitive multi-pattern matching.
+
+    Adding patterns inserts into the existing trie and recomputes failure
+    links (linear in trie size); removed patterns are tombstoned and the
+    trie is only rebuilt from scratch once tombstones dominate.
+    """
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self._reset()
+        for pattern in patterns:
+            self.add(pattern)
+
+    def _reset(self) -> None:
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[int]] = [[]]
+        # Nearest proper suffix state that has output, so we don't copy lists
+        self.dict_link: List[int] = [0]
+        self.patterns: List[str] = []
+        self.pattern_ids: Dict[str, int] = {}
+        self.removed: Set[int] = set()
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self.patterns) - len(self.removed)
+
+    def add(self, pattern: str) -> None:
+        pattern = pattern.lower()
+        if not pattern:
+            return
+        existing = self.pattern_ids.get(pattern)
+        if existing is not None:
+            self.removed.discard(existing)
+            return
+        state = 0
+        for ch in pattern:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.dict_link.append(0)
+            state = nxt
+        pid = len(self.patterns)
+        self.patterns.append(pattern)
+        self.pattern_ids[pattern] = pid
+        self.output[state].append(pid)
+        self._dirty = True
+
+    def remove(self, pattern: str) -> None:
+        pid = self.pattern_ids.get(pattern.lower())
+        if pid is None:
+            return
+        self.removed.add(pid)
+        if len(self.removed) > len(self.patterns) // 2:
+            live = [p for i, p in enumerate(self.patterns) if i not in self.removed]
+            self._reset()
+            for p in live:
+                self.add(p)
+
+    def build(self) -> None:
+        """(Re)compute failure and dictionary links breadth-first."""
+        queue = deque()
+        for child in self.goto[0].values():
+            self.fail[child] = 0
+            self.dict_link[child] = 0
+            queue.append(child)
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[child] = target if target != child else 0
+                fs = self.fail[child]
+                self.dict_link[child] = fs if self.output[fs] else self.dict_link[fs]
+        self._dirty = False
+
+    def search(self, text: str) -> List[Tuple[int, str]]:
+        """
+        Scan text once and return (start_offset, pattern) for every match.
+        """
+        if self._dirty:
+            self.build()
+        matches: List[Tuple[int, str]] = []
+        goto, fail, output, dict_link = self.goto, self.fail, self.output, self.dict_link
+        state = 0
+        for pos, ch in enumerate(text.lower()):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            s = state
+            while s:
+                for pid in output[s]:
+                    if pid not in self.removed:
+                        pattern = self.patterns[pid]
+                        matches.append((pos - len(pattern) + 1, pattern))
+                s = dict_link[s]
+        return matches
+
+
+def _classify(value: str) -> str:
+    if _IPV4_RE.fullmatch(value):
+        return "ip"
+    if _CVE_RE.fullmatch(value):
+        return "cve"
+    if _DOMAIN_RE.fullmatch(value) and value.rsplit(".", 1)[-1] not in _NOT_TLDS:
+        return "domain"
+    return "exploit_string"
+
+
+def extract_indicators(intel: Iterable[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Pull matchable indicators out of threat_intel rows: IPs, domains and
+    CVE ids mentioned in the summary, plus the values of explicit IOC
+    fields in raw_data. The rest of raw_data (whole NVD items, Reddit
+    posts) is not scanned; its reference hosts and version strings would
+    otherwise become indicators and flag benign traffic.
+    Returns indicator -> kind.
+    """
+    indicators: Dict[str, str] = {}
+    for item in intel:
+        raw = item.get("raw_data")
+        if isinstance(raw, dict):
+            for key in _IOC_KEYS:
+                values = raw.get(key)
+                if isinstance(values, list):
+                    for value in values:
+                        if isinstance(value, str) and len(value) >= 4:
+                            value = value.strip().lower()
+                            indicators.setdefault(value, _classify(value))
+        text = item.get("summary") or ""
+        for ip in _IPV4_RE.findall(text):
+            indicators.setdefault(ip, "ip")
+        for cve in _CVE_RE.findall(text):
+            indicators.setdefault(cve.lower(), "cve")
+        for domain in _DOMAIN_RE.findall(text):
+            domain = domain.lower()
+            if domain.rsplit(".", 1)[-1] not in _NOT_TLDS and not _IPV4_RE.fullmatch(domain):
+                indicators.setdefault(domain, "domain")
+    return indicators
+
+
+class IocMatcher:
+    """
+    Cached IOC automaton. `update()` diffs the indicator set so intel
+    changes only touch the affected patterns.
+    """
+
+    def __init__(self):
+        self.automaton = AhoCorasick()
+        self.kinds: Dict[str, str] = {}
+        self.fingerprint: Optional[int] = None
+
+    def update(self, indicators: Dict[str, str]) -> bool:
+        """
+        Sync the automaton with `indicators`. Returns True if anything changed.
+        """
+        fingerprint = hash(frozenset(indicators.items()))
+        if fingerprint == self.fingerprint:
+            return False
+        current, wanted = set(self.kinds), set(indicators)
+        for pattern in current - wanted:
+            self.automaton.remove(pattern)
+        for pattern in wanted - current:
+            self.automaton.add(pattern)
+        self.kinds = dict(indicators)
+        self.fingerprint = fingerprint
+        return True
+
+    def scan(self, text: str) -> List[Tuple[str, str]]:
+        """
+        Return (indicator, kind) hits in text. IP and domain hits must sit
+        on token boundaries so 10.0.0.1 does not match inside 110.0.0.15.
+        """
+        hits: List[Tuple[str, str]] = []
+        seen: Set[str] = set()
+        lowered = text.lower()
+        for start, pattern in self.automaton.search(lowered):
+            if pattern in seen:
+                continue
+            kind = self.kinds.get(pattern, "exploit_string")
+            if kind in ("ip", "domain"):
+                end = start + len(pattern)
+                before = lowered[start - 1] if start > 0 else " "
+                after = lowered[end] if end < len(lowered) else " "
+                # Subdomains (x.evil.com) still count as a domain hit
+                if (before in _WORD_CHARS and not (kind == "domain" and before == ".")) or (
+                    after in _WORD_CHARS and after != "."
+                ):
+                    continue
+            seen.add(pattern)
+            hits.append((pattern, kind))
+        return hits
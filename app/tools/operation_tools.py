@@ -0,0 +1,97 @@
+import logging
+from typing import Dict, List, NamedTuple, Optional
+
+from google.cloud import compute_v1, osconfig_v1
+
+from app.utils.rate_limiter import get_api_limiter
+
+logger = logging.getLogger(__name__)
+
+# Operation kinds understood by OperationTracker
+ZONE_OPERATION = "zone_operation"  # scope: "<project>/<zone>"
+PATCH_JOB = "patch_job"            # scope: "<project>"
+
+# Names per zoneOperations.list filter; keeps the filter expression short
+LIST_BATCH = 50
+
+_PATCH_JOB_FAILED = {
+    osconfig_v1.PatchJob.State.COMPLETED_WITH_ERRORS,
+    osconfig_v1.PatchJob.State.CANCELED,
+    osconfig_v1.PatchJob.State.TIMED_OUT,
+}
+
+
+class OperationStatus(NamedTuple):
+    done: bool
+    error: Optional[str] = None
+
+
+class ZoneOperationPoller:
+    """
+    Polls Compute zone operations. All names in one zone are fetched with
+    a single filtered `zoneOperations.list` call per batch instead of one
+    `get` (or blocking `wait`) per operation.
+    """
+
+    def __init__(self, client: Optional[compute_v1.ZoneOperationsClient] = None):
+        self._client = client
+
+    @property
+    def client(self) -> compute_v1.ZoneOperationsClient:
+        if self._client is None:
+            self._client = compute_v1.ZoneOperationsClient()
+        return self._client
+
+    def __call__(self, scope: str, names: List[str]) -> Dict[str, OperationStatus]:
+        project, zone = scope.split("/", 1)
+        statuses: Dict[str, OperationStatus] = {}
+        for i in range(0, len(names), LIST_BATCH):
+            batch = names[i:i + LIST_BATCH]
+            request = compute_v1.ListZoneOperationsRequest(
+                project=project,
+                zone=zone,
+                filter=" OR ".join(f'(name = "{name}")' for name in batch),
+            )
+            for op in get_api_limiter().call("compute", project, self.client.list, request=request):
+                if op.status != compute_v1.Operation.Status.DONE:
+                    statuses[op.name] = OperationStatus(False)
+                    continue
+                errors = [e.message for e in op.error.errors] if op.error else []
+                statuses[op.name] = OperationStatus(True, "; ".join(errors) or None)
+        return statuses
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_client"] = None
+        return state
+
+
+class PatchJobPoller:
+    """Polls OS Config patch jobs (the API has no batch get; one cheap read each)."""
+
+    def __init__(self, client: Optional[osconfig_v1.OsConfigServiceClient] = None):
+        self._client = client
+
+    @property
+    def client(self) -> osconfig_v1.OsConfigServiceClient:
+        if self._client is None:
+            self._client = osconfig_v1.OsConfigServiceClient()
+        return self._client
+
+    def __call__(self, scope: str, names: List[str]) -> Dict[str, OperationStatus]:
+        statuses: Dict[str, OperationStatus] = {}
+        for name in names:
+            job = get_api_limiter().call("osconfig", scope, self.client.get_patch_job, name=name)
+            if job.state == osconfig_v1.PatchJob.State.SUCCEEDED:
+                statuses[name] = OperationStatus(True)
+            elif job.state in _PATCH_JOB_FAILED:
+                state = osconfig_v1.PatchJob.State(job.state).name
+                statuses[name] = OperationStatus(True, job.error_message or f"Patch job ended {state}")
+            else:
+                statuses[name] = OperationStatus(False)
+        return statuses
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_client"] = None
+        return state
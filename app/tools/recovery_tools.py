@@ -0,0 +1,44 @@
+import base64
+import os
+import posixpath
+from typing import List, Tuple
+
+import google_crc32c
+
+_READ_BLOCK = 1 << 20
+
+
+def backup_key(path: str) -> str:
+    """
+    Normalise a file path to its key below a backup snapshot
+    ("/etc/nginx/nginx.conf" -> "etc/nginx/nginx.conf"). A trailing "/"
+    is kept to mark a directory; ".." cannot climb above the root. Raises
+    ValueError for an empty path (or the root itself).
+    """
+    key = posixpath.normpath("/" + path.replace("\\", "/")).lstrip("/")
+    if not key:
+        raise ValueError(f"Invalid file path {path!r}")
+    return key + "/" if path.endswith("/") else key
+
+
+def restore_destination(root: str, key: str) -> str:
+    """Where `key` is written below `root`; never outside it."""
+    root = os.path.abspath(root)
+    dest = os.path.abspath(os.path.join(root, *key.split("/")))
+    if os.path.commonpath([root, dest]) != root:
+        raise ValueError(f"Refusing to restore {key!r} outside {root}")
+    return dest
+
+
+def chunk_ranges(size: int, chunk_size: int) -> List[Tuple[int, int]]:
+    """Inclusive (start, end) byte ranges covering `size` bytes."""
+    return [(start, min(start + chunk_size, size) - 1) for start in range(0, size, chunk_size)]
+
+
+def crc32c_b64(file_path: str) -> str:
+    """CRC32C of a file, base64-encoded as in GCS object metadata."""
+    checksum = google_crc32c.Checksum()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(_READ_BLOCK), b""):
+            checksum.update(block)
+    return base64.b64encode(checksum.digest()).decode("ascii")
@@ -1,20 +1,27 @@
 import logging
+from typing import Dict, List, Optional
 from google.cloud import compute_v1, osconfig_v1
 from app.models.remediation_action import RemediationAction
+from app.utils.rate_limiter import ApiRateLimiter, get_api_limiter
 
 logger = logging.getLogger(__name__)
 
-def isolate_vm(instance_name: str, zone: str, project_id: str) -> RemediationAction:
-    """Stops a VM instance as part of containment/remediation."""
+def isolate_vm(
+    instance_name: str, zone: str, project_id: str, limiter: Optional[ApiRateLimiter] = None,
+) -> RemediationAction:
+    """Requests a VM stop; the action stays pending on the returned operation."""
     try:
         instances_client = compute_v1.InstancesClient()
-        operation = instances_client.stop(project=project_id, zone=zone, instance=instance_name)
+        operation = (limiter or get_api_limiter()).call(
+            "compute", project_id, instances_client.stop, project=project_id, zone=zone, instance=instance_name,
+        )
         logger.info(f"Stopping VM {instance_name} in zone {zone}: {operation.name}")
         return RemediationAction(
             action="isolate_vm",
             resource=instance_name,
-            status="executed",
-            message="VM stopped successfully."
+            status="pending",
+            message=f"Stop of VM {instance_name} requested.",
+            operation=operation.name,
         )
     except Exception as e:
         logger.error(f"Failed to isolate VM: {e}")
@@ -25,26 +32,50 @@ def isolate_vm(instance_name: str, zone: str, project_id: str) -> RemediationAct
             message=str(e)
         )
 
-def patch_vm(instance_id: str, patch_job_name: str, project_id: str) -> RemediationAction:
-    """Triggers a patch job using OS Config."""
+def _execute_patch_job(
+    client: osconfig_v1.OsConfigServiceClient,
+    project_id: str,
+    patch_job_name: str,
+    instance_filter: osconfig_v1.PatchInstanceFilter,
+    duration_seconds: int,
+    rollout: Optional[osconfig_v1.PatchRollout] = None,
+    limiter: Optional[ApiRateLimiter] = None,
+) -> osconfig_v1.PatchJob:
+    request = osconfig_v1.ExecutePatchJobRequest(
+        parent=f"projects/{project_id}",
+        display_name=patch_job_name,
+        description="Auto-triggered patch job from RemediatorAgent",
+        instance_filter=instance_filter,
+        duration={"seconds": duration_seconds},
+        rollout=rollout,
+    )
+    # Not idempotent: a retried 5xx/deadline could launch a second fleet-wide job
+    return (limiter or get_api_limiter()).call(
+        "osconfig", project_id, client.execute_patch_job, request=request, retry_transient=False,
+    )
+
+def patch_vm(
+    instance_id: str,
+    patch_job_name: str,
+    project_id: str,
+    client: Optional[osconfig_v1.OsConfigServiceClient] = None,
+) -> RemediationAction:
+    """Triggers a patch job using OS Config; the action stays pending on the job."""
     try:
-        patch_client = osconfig_v1.OsConfigServiceClient()
-        parent = f"projects/{project_id}"
-        patch_job = osconfig_v1.PatchJob(
-            display_name=patch_job_name,
-            instance_filter=osconfig_v1.PatchInstanceFilter(
-                instance_name_prefixes=[instance_id]
-            ),
-            description="Auto-triggered patch job from RemediatorAgent",
-            duration={"seconds": 600}
+        response = _execute_patch_job(
+            client or osconfig_v1.OsConfigServiceClient(),
+            project_id,
+            patch_job_name,
+            osconfig_v1.PatchInstanceFilter(instance_name_prefixes=[instance_id]),
+            duration_seconds=600,
         )
-        response = patch_client.execute_patch_job(parent=parent, patch_job=patch_job)
         logger.info(f"Patch job triggered: {response.name}")
         return RemediationAction(
             action="patch_vm",
             resource=instance_id,
-            status="executed",
-            message=f"Patch job {response.name} triggered."
+            status="pending",
+            message=f"Patch job {response.name} triggered.",
+            operation=response.name,
         )
     except Exception as e:
         logger.error(f"Failed to patch VM: {e}")
@@ -55,22 +86,55 @@ def patch_vm(instance_id: str, patch_job_name: str, project_id: str) -> Remediat
             message=str(e)
         )
 
-def recover_file_from_backup(file_path: str, backup_location: str) -> RemediationAction:
-    """Simulates restoring a file from a known secure backup."""
+def patch_instances(
+    project_id: str,
+    patch_job_name: str,
+    instances: Optional[List[str]] = None,
+    group_labels: Optional[List[Dict[str, str]]] = None,
+    zones: Optional[List[str]] = None,
+    rollout_mode: str = "ZONE_BY_ZONE",
+    disruption_budget_percent: int = 10,
+    duration_seconds: int = 3600,
+    client: Optional[osconfig_v1.OsConfigServiceClient] = None,
+) -> RemediationAction:
+    """
+    Triggers one patch job covering many VMs: explicit `instances`
+    ("zones/<zone>/instances/<name>") and/or every VM carrying any of the
+    `group_labels` sets, optionally limited to `zones`. The rollout patches
+    at most `disruption_budget_percent` of the VMs at a time, zone by zone
+    (or across zones concurrently with rollout_mode="CONCURRENT_ZONES").
+    """
+    if group_labels:
+        resource = " OR ".join(",".join(f"{k}={v}" for k, v in sorted(g.items())) for g in group_labels)
+    else:
+        resource = f"{len(instances or [])} instances in projects/{project_id}"
     try:
-        # TODO: Integrate with Cloud Storage / Filestore or backup system
-        logger.info(f"Restoring {file_path} from {backup_location}")
+        instance_filter = osconfig_v1.PatchInstanceFilter(
+            instances=instances or [],
+            group_labels=[osconfig_v1.PatchInstanceFilter.GroupLabel(labels=g) for g in group_labels or []],
+            zones=zones or [],
+        )
+        rollout = osconfig_v1.PatchRollout(
+            mode=osconfig_v1.PatchRollout.Mode[rollout_mode],
+            disruption_budget=osconfig_v1.FixedOrPercent(percent=disruption_budget_percent),
+        )
+        response = _execute_patch_job(
+            client or osconfig_v1.OsConfigServiceClient(),
+            project_id, patch_job_name, instance_filter, duration_seconds, rollout,
+        )
+        logger.info(f"Patch job triggered for {resource}: {response.name}")
         return RemediationAction(
-            action="recover_file",
-            resource=file_path,
-            status="executed",
-            message=f"File recovered from {backup_location}"
+            action="patch_vms",
+            resource=resource,
+            status="pending",
+            message=f"Patch job {response.name} triggered ({rollout_mode}, {disruption_budget_percent}% at a time).",
+            operation=response.name,
         )
     except Exception as e:
-        logger.error(f"Failed to recover file: {e}")
+        logger.error(f"Failed to patch {resource}: {e}")
         return RemediationAction(
-            action="recover_file",
-            resource=file_path,
+            action="patch_vms",
+            resource=resource,
             status="failed",
             message=str(e)
         )
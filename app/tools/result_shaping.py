@@ -0,0 +1,166 @@
+import base64
+import json
+import secrets
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.json_utils import to_json_safe
+from app.utils.time_utils import from_epoch_seconds, to_epoch_seconds
+
+MAX_MESSAGE_CHARS = 300
+
+
+def estimate_tokens(obj: Any) -> int:
+    """
+    Rough LLM token estimate (~4 characters per token of serialised JSON).
+    """
+    return len(json.dumps(obj, default=str)) // 4 + 1
+
+
+def _compact_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    row = to_json_safe(row)
+    message = row.get("message")
+    if isinstance(message, str) and len(message) > MAX_MESSAGE_CHARS:
+        row["message"] = message[:MAX_MESSAGE_CHARS] + "..."
+    return row
+
+
+def summarize_rows(rows: List[Dict[str, Any]], top_k: int = 5, buckets: int = 12) -> Dict[str, Any]:
+    """
+    Compact summary of a hunt result: counts, top IPs/messages/log types
+    and a time histogram with `buckets` equal-width bins.
+    """
+    ips = Counter(r.get("ip") for r in rows if r.get("ip"))
+    messages = Counter(str(r.get("message"))[:120] for r in rows if r.get("message"))
+    log_types = Counter(r.get("log_type") for r in rows if r.get("log_type"))
+    stamps = [t for t in (to_epoch_seconds(r.get("timestamp")) for r in rows) if t == t]
+
+    histogram: List[Dict[str, Any]] = []
+    time_range: Optional[Dict[str, str]] = None
+    if stamps:
+        first, last = min(stamps), max(stamps)
+        time_range = {"first": from_epoch_seconds(first).isoformat(), "last": from_epoch_seconds(last).isoformat()}
+        width = max((last - first) / buckets, 1.0)
+        counts = Counter(min(int((t - first) // width), buckets - 1) for t in stamps)
+        histogram = [
+            {"start": from_epoch_seconds(first + b * width).isoformat(), "count": counts[b]}
+            for b in range(buckets)
+            if counts[b]
+        ]
+
+    return {
+        "total_rows": len(rows),
+        "time_range": time_range,
+        "top_ips": [{"ip": k, "count": v} for k, v in ips.most_common(top_k)],
+        "top_messages": [{"message": k, "count": v} for k, v in messages.most_common(top_k)],
+        "log_types": dict(log_types.most_common(top_k)),
+        "time_histogram": histogram,
+    }
+
+
+def fit_page(rows: List[Dict[str, Any]], offset: int, token_budget: int) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Take compacted rows starting at `offset` until `token_budget` is spent.
+    Returns (page, next_offset). Always returns at least one row if any remain.
+    """
+    page: List[Dict[str, Any]] = []
+    used = 0
+    idx = offset
+    while idx < len(rows):
+        row = _compact_row(rows[idx])
+        cost = estimate_tokens(row)
+        if page and used + cost > token_budget:
+            break
+        page.append(row)
+        used += cost
+        idx += 1
+    return page, idx
+
+
+def encode_cursor(result_id: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(f"{result_id}:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        result_id, offset = raw.rsplit(":", 1)
+        return result_id, int(offset)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise KeyError(f"Invalid cursor {cursor!r}") from e
+
+
+class ResultCache:
+    """
+    Server-side LRU/TTL cache holding full result sets behind opaque
+    cursors, so only a page at a time crosses the LLM tool boundary.
+    """
+
+    def __init__(self, max_entries: int = 64, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, rows: List[Dict[str, Any]]) -> str:
+        result_id = secrets.token_hex(8)
+        with self._lock:
+            self._entries[result_id] = (time.time(), rows)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result_id
+
+    def get(self, result_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(result_id)
+            if entry is None or time.time() - entry[0] > self.ttl_seconds:
+                self._entries.pop(result_id, None)
+                raise KeyError(f"Result set {result_id} expired or unknown; re-run the hunt")
+            self._entries.move_to_end(result_id)
+            return entry[1]
+
+    def __getstate__(self):
+        return {"max_entries": self.max_entries, "ttl_seconds": self.ttl_seconds}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+def shape_results(
+    rows: List[Dict[str, Any]],
+    cache: ResultCache,
+    token_budget: int,
+) -> Dict[str, Any]:
+    """
+    Build the first response for a result set: summary plus as many rows
+    as fit in what's left of `token_budget`, and a cursor for the rest.
+    """
+    summary = summarize_rows(rows)
+    remaining = token_budget - estimate_tokens(summary)
+    if remaining < token_budget // 4:
+        # Keep room for at least a few sample rows
+        summary["top_messages"] = summary["top_messages"][:2]
+        remaining = token_budget - estimate_tokens(summary)
+    page, next_offset = fit_page(rows, 0, max(remaining, 1))
+    response = {"summary": summary, "rows": page, "returned": len(page), "next_cursor": None}
+    if next_offset < len(rows):
+        response["next_cursor"] = encode_cursor(cache.put(rows), next_offset)
+    return response
+
+
+def next_page(cursor: str, cache: ResultCache, token_budget: int) -> Dict[str, Any]:
+    """
+    Fetch the page behind `cursor` from the server-side cache.
+    """
+    result_id, offset = decode_cursor(cursor)
+    rows = cache.get(result_id)
+    page, next_offset = fit_page(rows, offset, token_budget)
+    return {
+        "rows": page,
+        "returned": len(page),
+        "offset": offset,
+        "total_rows": len(rows),
+        "next_cursor": encode_cursor(result_id, next_offset) if next_offset < len(rows) else None,
+    }
@@ -1,17 +1,116 @@
-from typing import List
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 from app.models.threat import Threat
+from app.utils.time_utils import from_epoch_seconds, to_epoch_seconds
 from datetime import datetime
 
-def hunt_threats(logs: list, indicators: list) -> List[Threat]:
-    # Fake detection logic — simulate 1 threat
-    return [
-        Threat(
-            id="threat-001",
-            type="Credential Stuffing",
-            description="Repeated failed logins detected from known malicious IP.",
-            severity="critical",
-            source_ip="192.0.2.10",
-            target_resource="login-service",
-            timestamp=datetime.utcnow()
+# Rows (list of dicts) or a columnar batch (column name -> sequence)
+LogBatch = Union[List[Dict[str, Any]], Dict[str, Any]]
+
+_RESOURCE_KEYS = ("resource", "target_resource", "dest_host", "domain", "dest_ip")
+
+
+def _columns(logs: LogBatch) -> Iterator[Tuple[Any, Any, Any]]:
+    """
+    Yield (ip, resource, timestamp) for every row of a batch without
+    materialising per-row dicts for columnar input. The resource is the
+    first non-empty `_RESOURCE_KEYS` value in both layouts.
+    """
+    if isinstance(logs, dict):
+        n = max((len(v) for v in logs.values()), default=0)
+        ips = logs.get("ip", [None] * n)
+        present = [logs[k] for k in _RESOURCE_KEYS if k in logs]
+        if len(present) > 1:
+            resources: Any = (next((v for v in values if v), None) for values in zip(*present, strict=True))
+        else:
+            resources = present[0] if present else [None] * n
+        stamps = logs.get("timestamp", [None] * n)
+        return zip(ips, resources, stamps, strict=True)
+    return (
+        (
+            row.get("ip"),
+            next((row[k] for k in _RESOURCE_KEYS if row.get(k)), None),
+            row.get("timestamp"),
+        )
+        for row in logs
+    )
+
+
+def hunt_threats(
+    logs: LogBatch,
+    indicators: list,
+    iocs: Optional[Dict[str, str]] = None,
+    min_indicator_events: int = 10,
+) -> List[Threat]:
+    """
+    Correlate log rows with network-activity indicators and intel IOCs.
+
+    Indicators (from `scan_network_activity`) are hashed on IP and IOCs
+    (indicator -> kind, see `extract_indicators`) on IP/resource, then
+    every log row probes those tables once: O(n + m) overall. Hits are
+    aggregated per (source IP, resource) into one Threat each.
+
+    Severity: IOC and indicator together -> critical, IOC only -> high,
+    indicator only with at least `min_indicator_events` rows -> medium.
+    """
+    flagged_ips = {str(i.get("ip")) for i in indicators if i.get("ip")}
+    ioc_table = {k.lower(): v for k, v in (iocs or {}).items()}
+
+    groups: Dict[Tuple[Any, Any], Dict[str, Any]] = {}
+    for ip, resource, ts in _columns(logs):
+        ip_key = str(ip) if ip else None
+        res_key = str(resource).lower() if resource else None
+        ioc_hits = []
+        if ip_key and ip_key in ioc_table:
+            ioc_hits.append(ip_key)
+        if res_key and res_key in ioc_table:
+            ioc_hits.append(res_key)
+        flagged = ip_key in flagged_ips
+        if not ioc_hits and not flagged:
+            continue
+
+        group = groups.get((ip_key, resource))
+        if group is None:
+            group = groups[(ip_key, resource)] = {
+                "events": 0, "iocs": set(), "indicator": False, "first": None, "last": None,
+            }
+        group["events"] += 1
+        group["iocs"].update(ioc_hits)
+        group["indicator"] = group["indicator"] or flagged
+        t = to_epoch_seconds(ts)
+        if t == t:
+            group["first"] = t if group["first"] is None else min(group["first"], t)
+            group["last"] = t if group["last"] is None else max(group["last"], t)
+
+    threats: List[Threat] = []
+    now = datetime.utcnow()
+    for (ip, resource), group in groups.items():
+        if group["iocs"]:
+            severity = "critical" if group["indicator"] else "high"
+            kinds = sorted({ioc_table[i] for i in group["iocs"]})
+            threat_type = "Known IOC Contact"
+            description = (
+                f"{group['events']} events matched threat-intel {', '.join(kinds)} "
+                f"indicators: {', '.join(sorted(group['iocs']))}"
+            )
+        elif group["events"] >= min_indicator_events:
+            severity = "medium"
+            threat_type = "Suspicious External Traffic"
+            description = f"{group['events']} events of outbound traffic to public IP {ip}"
+        else:
+            continue
+        threats.append(
+            Threat(
+                id="",
+                type=threat_type,
+                description=description,
+                severity=severity,
+                source_ip=ip,
+                target_resource=str(resource) if resource else None,
+                timestamp=from_epoch_seconds(group["last"]) if group["last"] is not None else now,
+            )
         )
-    ]
+    order = {"critical": 0, "high": 1, "medium": 2}
+    threats.sort(key=lambda t: order[t.severity])
+    for idx, threat in enumerate(threats, start=1):
+        threat.id = f"threat-{idx:03d}"
+    return threats
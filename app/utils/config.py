@@ -22,6 +22,9 @@ class PlatformConfig:
     financial_system: str
     agents: Dict[str, AgentConfig]
     reports_bucket: str
+    state_dir: str = ".cyberguard"  # Local indexes, caches and journals
+    hunt_token_budget: int = 4000   # Max LLM tokens per hunt tool response
+    flow_logs_table: str = "compute_googleapis_com_vpc_flows"  # VPC flow logs sink table
 
     @classmethod
     def from_env(cls):
@@ -37,4 +40,7 @@ class PlatformConfig:
             incident_bucket = os.getenv("INCIDENT_BUCKET", "cyberguardian-incidents"),
             agents={},
             reports_bucket=reports_bucket,  # new
+            state_dir=os.getenv("CYBERGUARD_STATE_DIR", ".cyberguard"),
+            hunt_token_budget=int(os.getenv("HUNT_TOKEN_BUDGET", "4000")),
+            flow_logs_table=os.getenv("FLOW_LOGS_TABLE", "compute_googleapis_com_vpc_flows"),
         )
@@ -0,0 +1,308 @@
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+from google.api_core import exceptions as api_exceptions
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: refills at `rate` tokens per second up to
+    `capacity`. Callers reserve tokens up front and sleep off any deficit
+    outside the lock, so concurrent waiters are served in arrival order
+    without busy-polling.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1.0))
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1.0, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Take `tokens`, returning how long the caller must wait before using
+        them, or None (nothing taken) if that would exceed `max_wait`.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (tokens - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= tokens
+            return wait
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Block until `tokens` are available; False if not within `timeout`."""
+        wait = self.reserve(tokens, timeout)
+        if wait is None:
+            return False
+        if wait:
+            time.sleep(wait)
+        return True
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """
+    Token bucket whose rate follows AIMD: every success adds roughly
+    `increase_per_second` tokens/s per second of traffic, a throttle
+    response halves the rate (at most once per `decrease_cooldown`
+    seconds, so one burst of 429s counts as one signal). The rate stays
+    within [min_rate, max_rate] and converges just under the real quota
+    instead of swinging between flooding and idling.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        max_rate: Optional[float] = None,
+        min_rate: float = 0.5,
+        increase_per_second: float = 1.0,
+        decrease_factor: float = 0.5,
+        decrease_cooldown: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(rate, max(rate, 1.0), clock)
+        self.max_rate = float(max_rate if max_rate is not None else rate)
+        self.min_rate = min_rate
+        self.increase_per_second = increase_per_second
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self._last_decrease = float("-inf")
+
+    def on_success(self) -> None:
+        with self._lock:
+            # +increase_per_second/rate per call adds ~increase_per_second each second
+            self.rate = min(self.max_rate, self.rate + self.increase_per_second / self.rate)
+
+    def on_throttle(self) -> None:
+        with self._lock:
+            now = self._clock()
+            if now - self._last_decrease < self.decrease_cooldown:
+                return
+            self._last_decrease = now
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._tokens = min(self._tokens, 0.0)  # drain the burst allowance too
+            logger.warning("API throttled; client rate lowered to %.2f/s", self.rate)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an API whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive throttled/unavailable
+    responses and fails calls fast for `reset_timeout` seconds; then lets
+    one probe through (half-open) and closes again if it succeeds.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if self._clock() - self._opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._clock() - self._opened_at < self.reset_timeout or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    logger.warning("Circuit opened after %d consecutive failures", self._failures)
+                self._opened_at = self._clock()
+                self._probing = False
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def _is_throttle(error: Exception) -> bool:
+    if isinstance(error, api_exceptions.TooManyRequests):  # 429 / RESOURCE_EXHAUSTED
+        return True
+    # Compute reports per-user rate limits as 403 rateLimitExceeded
+    return isinstance(error, api_exceptions.Forbidden) and "ratelimitexceeded" in str(error).replace("_", "").lower()
+
+
+def _is_transient(error: Exception) -> bool:
+    return isinstance(error, api_exceptions.ServerError)  # 5xx, including deadline exceeded
+
+
+# Starting (and maximum) client-side request rates per API, per scope
+DEFAULT_API_RATES: Dict[str, float] = {
+    "compute": 20.0,
+    "osconfig": 5.0,
+    "cloudasset": 5.0,
+    "storage": 50.0,
+    "bigquery": 10.0,
+}
+
+
+class ApiRateLimiter:
+    """
+    Client-side guard shared by every tool and service that calls Google
+    APIs, keyed by (api, scope); scope is a project, or a bucket for Cloud
+    Storage whose limits are per bucket.
+
+    - an adaptive token bucket paces calls, starting at (and never
+      exceeding) the API's rate from `rates`;
+    - a circuit breaker fails fast on an API that keeps throttling or
+      returning 5xx, instead of every caller hammering it;
+    - throttled and 5xx calls are retried with exponential backoff and
+      full jitter. Other errors pass straight through.
+    """
+
+    def __init__(
+        self,
+        rates: Optional[Dict[str, float]] = None,
+        default_rate: float = 10.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        self.rates = {**DEFAULT_API_RATES, **(rates or {})}
+        self.default_rate = default_rate
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._guards: Dict[Tuple[str, str], Tuple[AdaptiveTokenBucket, CircuitBreaker]] = {}
+        self._lock = threading.Lock()
+
+    def guard(self, api: str, scope: str) -> Tuple[AdaptiveTokenBucket, CircuitBreaker]:
+        key = (api, scope)
+        with self._lock:
+            guard = self._guards.get(key)
+            if guard is None:
+                guard = self._guards[key] = (
+                    AdaptiveTokenBucket(self.rates.get(api, self.default_rate)),
+                    CircuitBreaker(self.failure_threshold, self.reset_timeout),
+                )
+            return guard
+
+    def call(
+        self,
+        api: str,
+        scope: str,
+        fn: Callable[..., T],
+        *args: Any,
+        max_wait: Optional[float] = None,
+        retry_transient: bool = True,
+        **kwargs: Any,
+    ) -> T:
+        """
+        Call `fn(*args, **kwargs)` under the (api, scope) guard. `max_wait`
+        bounds the whole call, including queueing and backoff. Pass
+        `retry_transient=False` for non-idempotent creates: a 5xx or
+        deadline may come after the server accepted the request, so only
+        throttled (rejected) calls are retried.
+        """
+        bucket, breaker = self.guard(api, scope)
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        attempt = 0
+        while True:
+            open_error = CircuitOpenError(f"{api} API for {scope} is failing; not calling it for now")
+            if breaker.state == "open":
+                raise open_error
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not bucket.acquire(timeout=remaining):
+                raise TimeoutError(f"No {api} quota for {scope} within {max_wait}s")
+            # Only take a half-open probe once the call is certain to be made
+            if not breaker.allow():
+                raise open_error
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                throttled = _is_throttle(e)
+                if not throttled and not _is_transient(e):
+                    breaker.record_success()  # the API answered; the request itself was bad
+                    raise
+                if throttled:
+                    bucket.on_throttle()
+                breaker.record_failure()
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                attempt += 1
+                if not throttled and not retry_transient:
+                    raise
+                if attempt > self.max_retries or (deadline is not None and time.monotonic() + delay > deadline):
+                    raise
+                logger.info("%s call for %s failed (%s); retry %d in %.2fs", api, scope, e, attempt, delay)
+                time.sleep(delay)
+                continue
+            bucket.on_success()
+            breaker.record_success()
+            return result
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+_api_limiter: Optional[ApiRateLimiter] = None
+_api_limiter_lock = threading.Lock()
+
+
+def get_api_limiter() -> ApiRateLimiter:
+    """The process-wide limiter every API caller shares by default."""
+    global _api_limiter
+    with _api_limiter_lock:
+        if _api_limiter is None:
+            _api_limiter = ApiRateLimiter()
+        return _api_limiter
@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+
+def to_epoch_seconds(value: Any) -> float:
+    """
+    Normalise a log timestamp (datetime, ISO string or epoch number) to
+    UTC epoch seconds. Naive datetimes are treated as UTC, matching how
+    BigQuery TIMESTAMP columns come back from the client.
+    Returns NaN when the value cannot be interpreted.
+    """
+    if value is None:
+        return float("nan")
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return float("nan")
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return float("nan")
+
+
+def to_epoch_array(values: Iterable[Any]) -> np.ndarray:
+    """
+    Vectorised counterpart of `to_epoch_seconds` for a column of timestamps.
+    """
+    values = list(values)
+    try:
+        # Columns that are already epoch numbers convert in one C call
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.fromiter((to_epoch_seconds(v) for v in values), dtype=np.float64, count=len(values))
+
+
+def from_epoch_seconds(seconds: float) -> datetime:
+    """
+    Convert epoch seconds back to a timezone-aware UTC datetime.
+    """
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+
+def resumable_page(rows: List[Dict[str, Any]], limit: int, key: str = "timestamp") -> List[Dict[str, Any]]:
+    """
+    The part of an oldest-first page of at most `limit` rows that can be
+    consumed before resuming with `timestamp > <last kept>`. A full page
+    may have cut a group of rows sharing its last timestamp, so that group
+    is dropped and refetched by the next page (unless it is the whole page).
+    """
+    if len(rows) < limit or not rows:
+        return rows
+    last = to_epoch_seconds(rows[-1].get(key))
+    cut = len(rows)
+    while cut > 0 and to_epoch_seconds(rows[cut - 1].get(key)) == last:
+        cut -= 1
+    return rows[:cut] or rows
@@ -0,0 +1,44 @@
+"""
+Correlation benchmark at the scale the hash-join rewrite targets:
+1M log rows x 100k intel indicators. Slow; run with
+RUN_BENCHMARKS=1 pytest tests/benchmark -s
+"""
+import os
+import time
+
+import pytest
+
+from app.tools.threat_tools import hunt_threats
+
+N_LOGS = 1_000_000
+N_IOCS = 100_000
+# Generous ceiling so only a return to per-row scans over the IOC list fails
+MAX_SECONDS = 30.0
+
+pytestmark = [
+    pytest.mark.slow,
+    pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run benchmarks"),
+]
+
+
+def _ip(i: int) -> str:
+    return f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+
+
+def test_hunt_threats_1m_logs_100k_iocs():
+    logs = {
+        "ip": [_ip(i % 250_000) for i in range(N_LOGS)],
+        "domain": [f"host{i % 50_000}.example.net" for i in range(N_LOGS)],
+        "timestamp": [1_750_000_000.0 + i for i in range(N_LOGS)],
+    }
+    # every 5th IOC is an IP seen in the logs, the rest are domains nobody contacts
+    iocs = {(_ip(i) if i % 5 == 0 else f"c2-{i}.bad.example"): ("ip" if i % 5 == 0 else "domain") for i in range(N_IOCS)}
+    indicators = [{"ip": _ip(i)} for i in range(0, 1000)]
+
+    began = time.perf_counter()
+    threats = hunt_threats(logs, indicators, iocs)
+    elapsed = time.perf_counter() - began
+    print(f"hunt_threats: {N_LOGS} logs x {N_IOCS} iocs -> {len(threats)} threats in {elapsed:.2f}s")
+
+    assert threats
+    assert elapsed < MAX_SECONDS
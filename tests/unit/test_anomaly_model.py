@@ -0,0 +1,62 @@
+import numpy as np
+from unittest.mock import MagicMock
+from app.tools.anomaly_model import IsolationForestModel, build_entity_features, FEATURE_NAMES
+from app.services.detectron_service import DetectronService
+
+
+def _logs():
+    logs = []
+    for i in range(40):
+        logs.append({
+            "ip": f"10.0.0.{i}",
+            "timestamp": f"2025-06-19T12:{i:02d}:00Z",
+            "message": "user login ok",
+            "log_type": "APP",
+        })
+    # One noisy public host with many failures
+    for i in range(60):
+        logs.append({
+            "ip": "203.0.113.7",
+            "timestamp": f"2025-06-19T02:{i:02d}:00Z",
+            "message": f"failed login attempt {i} for user admin",
+            "log_type": "AUDIT",
+        })
+    return logs
+
+
+def test_build_entity_features_shape():
+    entities, features, last_seen = build_entity_features(_logs())
+    assert len(entities) == 41
+    assert features.shape == (41, len(FEATURE_NAMES))
+    assert np.all(np.isfinite(last_seen))
+
+
+def test_isolation_forest_ranks_outlier_highest(tmp_path):
+    entities, features, _ = build_entity_features(_logs())
+    model = IsolationForestModel(n_trees=50).fit(features)
+    scores = model.score(features)
+    assert entities[int(np.argmax(scores))] == "203.0.113.7"
+
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+    assert np.allclose(IsolationForestModel.load(path).score(features), scores)
+
+
+def test_detect_anomalies_caches_model_and_bulk_inserts():
+    bq = MagicMock()
+    bq.query_logs.return_value = _logs()
+    sec = MagicMock()
+    sec.scan_network_activity.return_value = []
+    svc = DetectronService(bq, sec)
+
+    svc.detect_anomalies()
+    model = svc._model
+    svc.detect_anomalies()
+
+    assert svc._model is model
+    status = svc.persistence_status(flush=True)
+    # 41 scored entities + 1 brute-force finding per run
+    assert status["written_rows"] == 84
+    rows = [r for call in bq.insert_anomalies.call_args_list for r in call[0][0]]
+    assert len(rows) == 84
+    assert all(r["anomaly_score"] is not None for r in rows if r["source"] == "behavior-model")
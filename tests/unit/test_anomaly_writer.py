@@ -0,0 +1,27 @@
+import threading
+from unittest.mock import MagicMock
+from app.services.anomaly_writer import AnomalyWriter
+
+
+def test_submit_does_not_block_and_flush_reports_writes():
+    gate = threading.Event()
+    bq = MagicMock()
+    bq.insert_anomalies.side_effect = lambda rows: gate.wait(5)
+    writer = AnomalyWriter(bq)
+
+    assert writer.submit([{"id": "a"}, {"id": "b"}])
+    assert writer.status()["pending_rows"] == 2
+    gate.set()
+    status = writer.flush(timeout=5)
+    assert status["pending_rows"] == 0
+    assert status["written_rows"] == 2
+
+
+def test_flush_surfaces_insert_failures():
+    bq = MagicMock()
+    bq.insert_anomalies.side_effect = RuntimeError("BigQuery insert_anomalies errors: quota")
+    writer = AnomalyWriter(bq)
+    writer.submit([{"id": "a"}])
+    status = writer.flush(timeout=5)
+    assert status["failed_rows"] == 1
+    assert "quota" in status["recent_errors"][0]
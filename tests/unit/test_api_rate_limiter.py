@@ -0,0 +1,107 @@
+import pickle
+from unittest.mock import MagicMock, patch
+
+import pytest
+from google.api_core import exceptions
+
+from app.tools.containment_tools import isolate_vm
+from app.utils.rate_limiter import AdaptiveTokenBucket, ApiRateLimiter, CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_adaptive_bucket_halves_once_per_burst_and_recovers():
+    clock = FakeClock()
+    bucket = AdaptiveTokenBucket(20, min_rate=1, clock=clock)
+    bucket.on_throttle()
+    bucket.on_throttle()  # same burst: ignored
+    assert bucket.rate == 10
+    clock.now = 2
+    bucket.on_throttle()
+    assert bucket.rate == 5
+    for _ in range(200):
+        bucket.on_success()
+    assert bucket.rate == 20  # capped at the configured rate
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    clock.now = 11
+    assert breaker.allow()  # one probe
+    assert not breaker.allow()
+    breaker.record_failure()  # probe failed: open again
+    assert not breaker.allow()
+    clock.now = 22
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+@patch("app.utils.rate_limiter.time.sleep")
+def test_call_retries_throttled_requests(sleep):
+    limiter = ApiRateLimiter(rates={"compute": 100})
+    fn = MagicMock(side_effect=[exceptions.TooManyRequests("slow down"), "ok"])
+    assert limiter.call("compute", "p", fn, 1, zone="z") == "ok"
+    assert fn.call_count == 2
+    fn.assert_called_with(1, zone="z")
+    assert limiter.guard("compute", "p")[0].rate < 100
+
+
+@patch("app.utils.rate_limiter.time.sleep")
+def test_call_passes_client_errors_through_and_opens_on_outage(sleep):
+    limiter = ApiRateLimiter(max_retries=0, failure_threshold=2)
+    with pytest.raises(exceptions.NotFound):
+        limiter.call("compute", "p", MagicMock(side_effect=exceptions.NotFound("gone")))
+    down = MagicMock(side_effect=exceptions.ServiceUnavailable("down"))
+    for _ in range(2):
+        with pytest.raises(exceptions.ServiceUnavailable):
+            limiter.call("compute", "p", down)
+    with pytest.raises(CircuitOpenError):
+        limiter.call("compute", "p", down)
+    assert down.call_count == 2
+    limiter.call("compute", "other", MagicMock())  # other projects unaffected
+    assert pickle.loads(pickle.dumps(limiter)).guard("compute", "p")[1].state == "open"
+
+
+def test_isolate_vm_fails_fast_when_circuit_is_open():
+    limiter = ApiRateLimiter(failure_threshold=1)
+    limiter.guard("compute", "p")[1].record_failure()
+    client = MagicMock()
+    action = isolate_vm("vm", "z", "p", client=client, limiter=limiter)
+    assert action.status == "failed"
+    client.stop.assert_not_called()
+
+
+def test_quota_timeout_does_not_hold_the_half_open_probe():
+    limiter = ApiRateLimiter(failure_threshold=1, reset_timeout=0)
+    bucket, breaker = limiter.guard("compute", "p")
+    breaker.record_failure()
+    bucket.rate = 0.001
+    bucket._tokens = 0
+    with pytest.raises(TimeoutError):
+        limiter.call("compute", "p", MagicMock(), max_wait=0.01)
+    bucket._tokens = 1
+    assert limiter.call("compute", "p", MagicMock(return_value="ok")) == "ok"
+    assert breaker.state == "closed"
+
+
+@patch("app.utils.rate_limiter.time.sleep")
+def test_non_idempotent_calls_are_not_retried_on_server_errors(sleep):
+    limiter = ApiRateLimiter()
+    create = MagicMock(side_effect=[exceptions.DeadlineExceeded("slow"), "job"])
+    with pytest.raises(exceptions.DeadlineExceeded):
+        limiter.call("osconfig", "p", create, retry_transient=False)
+    assert create.call_count == 1
+    create = MagicMock(side_effect=[exceptions.TooManyRequests("slow down"), "job"])
+    assert limiter.call("osconfig", "p", create, retry_transient=False) == "job"
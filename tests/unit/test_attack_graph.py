@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from app.tools.attack_graph import AttackGraph
+
+
+def _graph():
+    labels = ["ip:1.2.3.4", "principal:alice", "host:vm-web", "host:vm-db", "asset://bq/datasets/pii"]
+    src = [0, 0, 1, 1, 2, 3, 1]
+    dst = [1, 1, 2, 3, 3, 4, 4]
+    prob = [0.3, 0.6, 0.9, 0.2, 0.9, 0.9, 0.1]
+    return AttackGraph.from_edges(labels, np.array(src), np.array(dst), np.array(prob))
+
+
+def test_csr_layout_collapses_parallel_edges():
+    graph = _graph()
+    assert graph.edge_count == 6
+    assert list(graph.indptr) == [0, 1, 4, 5, 6, 6]
+    nbrs, probs = graph.neighbors(0)
+    assert list(nbrs) == [1] and probs[0] == pytest.approx(0.6)
+
+
+def test_shortest_and_riskiest_paths_differ():
+    graph = _graph()
+    assert graph.shortest_path("1.2.3.4", "pii")["nodes"] == ["ip:1.2.3.4", "principal:alice", "asset://bq/datasets/pii"]
+    riskiest = graph.riskiest_path("ip:1.2.3.4", "asset://bq/datasets/pii")
+    assert riskiest["nodes"] == [
+        "ip:1.2.3.4", "principal:alice", "host:vm-web", "host:vm-db", "asset://bq/datasets/pii",
+    ]
+    assert riskiest["probability"] == pytest.approx(0.6 * 0.9 ** 3, abs=1e-3)
+    assert graph.riskiest_path("host:vm-db", "ip:1.2.3.4") is None
+
+
+def test_blast_radius_is_hop_bounded_and_memoized():
+    graph = _graph()
+    radius = graph.blast_radius("alice", max_hops=1)
+    # Best probability may come from a longer path than the hop bound
+    assert [r["node"] for r in radius] == ["host:vm-web", "host:vm-db", "asset://bq/datasets/pii"]
+    assert all(r["hops"] == 1 for r in radius)
+    cached = len(graph._cache)
+    graph.blast_radius("alice", max_hops=1)
+    assert len(graph._cache) == cached
+    with pytest.raises(KeyError):
+        graph.find("nope")
+
+
+def test_service_keeps_graph_per_case():
+    from unittest.mock import MagicMock
+    from app.services.investigation_service import InvestigationService
+
+    bq = MagicMock()
+    bq.iter_logs.return_value = [
+        {"timestamp": 1.0, "ip": "45.33.12.7", "principal": "alice", "host": "vm-web", "message": "Accepted password for alice"},
+        {"timestamp": 2.0, "ip": "10.0.0.5", "principal": "alice", "host": "vm-db", "message": "ssh into vm-db"},
+    ]
+    sec = MagicMock()
+    sec.list_assets.return_value = []
+    svc = InvestigationService(bq, sec)
+    svc.investigate(case_id="inc-1")
+    paths = svc.attack_paths("45.33.12.7", "vm-db", case_id="inc-1")
+    assert paths["shortest"]["nodes"] == ["ip:45.33.12.7", "principal:alice", "host:vm-db"]
+    assert {r["node"] for r in svc.blast_radius("alice", case_id="inc-1")} == {"host:vm-web", "host:vm-db"}
+    with pytest.raises(KeyError):
+        svc.blast_radius("alice", case_id="inc-2")
@@ -0,0 +1,62 @@
+from unittest.mock import MagicMock
+from app.tools.anomaly_tools import detect_auth_anomalies
+from app.tools.auth_tools import CredentialAttackDetector, detect_credential_attacks, parse_auth_event
+from app.services.threat_hunting_service import ThreatHuntingService
+
+T0 = 1_750_000_000.0
+
+
+def _row(ts, ip, message):
+    return {"timestamp": T0 + ts, "ip": ip, "message": message}
+
+
+def test_parse_auth_event_extracts_account_and_outcome():
+    failed = parse_auth_event(_row(0, "1.2.3.4", "Failed password for invalid user admin from 1.2.3.4 port 22"))
+    assert failed.account == "admin" and not failed.success
+    ok = parse_auth_event(_row(0, "1.2.3.4", "Accepted password for alice from 1.2.3.4"))
+    assert ok.account == "alice" and ok.success
+    assert parse_auth_event(_row(0, "1.2.3.4", "GET /index.html 200")) is None
+
+
+def test_spray_followed_by_success_is_stuffing():
+    rows = [_row(i, "203.0.113.9", f"login failed for user u{i}") for i in range(12)]
+    rows.append(_row(20, "203.0.113.9", "login successful for user u99"))
+    threats = detect_credential_attacks(rows, spray_accounts=10)
+    assert [t.type for t in threats] == ["Credential Stuffing", "Password Spray"]
+    assert threats[0].severity == "critical" and threats[0].source_ip == "203.0.113.9"
+
+
+def test_windows_expire_and_stay_bounded():
+    # Failures spaced beyond the window never accumulate into a brute force
+    rows = [_row(i * 700, "198.51.100.1", "failed login for user bob") for i in range(20)]
+    assert detect_credential_attacks(rows, window_seconds=600, brute_force_failures=3) == []
+
+    detector = CredentialAttackDetector(max_keys=5, brute_force_failures=3)
+    detector.detect(_row(i, f"10.0.0.{i}", f"failed login for user u{i}") for i in range(50))
+    assert len(detector.by_ip.windows) == 5 and len(detector.by_pair.windows) == 5
+
+
+def test_distributed_attack_and_brute_force_as_anomalies():
+    rows = [_row(i, f"10.0.1.{i}", "authentication failure user=root") for i in range(10)]
+    rows += [_row(i, "10.0.2.1", "failed login for user carol") for i in range(10)]
+    anomalies = detect_auth_anomalies(rows)
+    assert {a.description.split(":")[0] for a in anomalies} == {"Distributed Login Attack", "Brute Force Login"}
+    assert all(a.source == "credential-attack" for a in anomalies)
+
+
+def test_service_streams_logs_through_detector():
+    bq = MagicMock()
+    bq.iter_logs.return_value = iter(_row(i, "10.0.2.1", "failed login for user dave") for i in range(10))
+    svc = ThreatHuntingService(bq, MagicMock())
+    threats = svc.credential_attacks(limit=100)
+    assert len(threats) == 1 and threats[0].target_resource == "dave"
+
+
+def test_streams_through_bounded_reorder_buffer_and_skips_unattributed_failures():
+    # newest first, as a DESC query would return them
+    rows = [_row(i, "198.51.100.7", "failed login for user erin") for i in reversed(range(10))]
+    rows += [_row(i, f"10.9.0.{i % 3}", "authentication failure") for i in range(30)]
+    detector = CredentialAttackDetector(brute_force_failures=10, reorder_buffer=10)
+    findings = detector.detect(iter(rows))
+    assert [(f["pattern"], f["key"]) for f in findings] == [("brute_force", ("erin", "198.51.100.7"))]
+    assert parse_auth_event(_row(0, "10.9.0.1", "authentication failure")).account is None
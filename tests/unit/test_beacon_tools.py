@@ -0,0 +1,36 @@
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from app.tools.beacon_tools import detect_beacons, encode_pairs
+from app.tools.anomaly_tools import detect_beaconing_anomalies
+
+
+def test_detect_beacons_flags_periodic_pair_only():
+    rng = np.random.default_rng(1)
+    noise_codes = rng.integers(1, 50, 5000)
+    noise_ts = rng.uniform(0, 3600, 5000)
+    beacon_ts = np.arange(0, 3600, 60.0) + rng.normal(0, 1.0, 60)
+    codes = np.concatenate([noise_codes, np.zeros(60, dtype=int)])
+    ts = np.concatenate([noise_ts, beacon_ts])
+
+    beacons = detect_beacons(codes, ts)
+    assert [b["pair"] for b in beacons] == [0]
+    assert abs(beacons[0]["mean_interval_s"] - 60) < 2
+    assert beacons[0]["severity"] == "high"
+
+
+def test_encode_pairs_round_trip():
+    codes, pairs = encode_pairs(["a", "b", "a"], ["x", "y", "x"])
+    assert codes.tolist() == [0, 1, 0]
+    assert pairs == [("a", "x"), ("b", "y")]
+
+
+def test_detect_beaconing_anomalies_from_logs():
+    start = datetime(2025, 6, 19, tzinfo=timezone.utc)
+    logs = [
+        {"src_ip": "10.0.0.5", "dest_ip": "198.51.100.9", "timestamp": start + timedelta(seconds=30 * i)}
+        for i in range(40)
+    ]
+    anomalies = detect_beaconing_anomalies(logs)
+    assert len(anomalies) == 1
+    assert anomalies[0].source == "beaconing"
+    assert anomalies[0].affected_system == "10.0.0.5"
@@ -0,0 +1,92 @@
+import threading
+import time
+from unittest.mock import MagicMock
+from app.models.containment_action import ContainmentAction
+from app.models.containment_policy import ContainmentPolicy
+from app.services.containment_executor import ContainmentExecutor, ContainmentTask
+from app.tools.containment_tools import parse_instance
+from app.utils.rate_limiter import TokenBucket
+
+
+def _task(name, delay=0.05, project="proj"):
+    def run(timeout):
+        time.sleep(delay)
+        return ContainmentAction(resource_id=name, action_type="isolate_vm", status="executed")
+    return ContainmentTask(name, "isolate_vm", project, run)
+
+
+def test_runs_concurrently_in_input_order():
+    executor = ContainmentExecutor(max_workers=50)
+    # the first 50 tasks only get past the barrier if all 50 run at once
+    barrier = threading.Barrier(50)
+
+    def gated(name):
+        def run(timeout):
+            barrier.wait(timeout=10)
+            return ContainmentAction(resource_id=name, action_type="isolate_vm", status="executed")
+        return ContainmentTask(name, "isolate_vm", "proj", run)
+
+    tasks = [gated(f"vm-{i}") for i in range(50)]
+    tasks += [_task(f"vm-{i}", delay=0.05 if i % 2 else 0.01) for i in range(50, 200)]
+    results = executor.run(tasks)
+    assert [r.status for r in results] == ["executed"] * 200
+    assert [r.resource_id for r in results] == [f"vm-{i}" for i in range(200)]
+
+
+def test_slow_and_failing_actions_do_not_stall_the_batch():
+    def boom(timeout):
+        raise RuntimeError("quota exceeded")
+
+    executor = ContainmentExecutor(max_workers=4, action_timeout_seconds=0.2)
+    results = executor.run([_task("vm-ok"), _task("vm-hung", delay=5), ContainmentTask("vm-err", "isolate_vm", "proj", boom)])
+    assert [r.status for r in results] == ["executed", "failed", "failed"]
+    assert "Timed out" in results[1].justification
+    assert results[2].justification == "quota exceeded"
+
+
+def test_token_bucket_paces_per_project():
+    clock = MagicMock(return_value=0.0)
+    bucket = TokenBucket(rate=10, capacity=2, clock=clock)
+    assert bucket.reserve() == 0.0 and bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.1
+    assert bucket.reserve(max_wait=0.1) is None
+    clock.return_value = 1.0
+    assert bucket.reserve() == 0.0
+
+
+def test_apply_policy_fans_out_resources_and_actions():
+    from app.services.containment_service import ContainmentService
+
+    config = MagicMock(project_id="proj")
+    tracker = MagicMock()
+    svc = ContainmentService(config, executor=ContainmentExecutor(max_workers=8), tracker=tracker)
+    svc._instances_client = MagicMock()
+    svc._instances_client.stop.return_value.name = "operation-1"
+    policy = ContainmentPolicy(
+        id="pol-1", name="Quarantine", description=None, justification=None,
+        target_resources=["us-central1-a/vm-1", "projects/other/zones/us-east1-b/instances/vm-2", "vm-3"],
+        actions=["isolate_vm", "tag_vm"],
+    )
+    results = svc.apply_policy(policy)
+    assert [(r.resource_id, r.action_type) for r in results][:2] == [("vm-1", "isolate_vm"), ("us-central1-a/vm-1", "tag_vm")]
+    assert [r.status for r in results if r.action_type == "isolate_vm"] == ["pending", "pending", "failed"]
+    tracker.track.assert_any_call(results[2], "zone_operation", "other/us-east1-b", "operation-1")
+    svc._instances_client.stop.assert_any_call(project="other", zone="us-east1-b", instance="vm-2", timeout=30.0)
+    assert parse_instance("vm-3", "proj") == ("proj", None, "vm-3")
+
+
+def test_vm_stops_go_through_the_shared_compute_limiter():
+    from app.services.containment_service import ContainmentService
+    from app.utils.rate_limiter import ApiRateLimiter
+
+    limiter = ApiRateLimiter(failure_threshold=1)
+    limiter.guard("compute", "other")[1].record_failure()  # Compute for "other" is failing
+    svc = ContainmentService(MagicMock(project_id="proj"), executor=ContainmentExecutor(max_workers=4),
+                             tracker=MagicMock(), limiter=limiter)
+    svc._instances_client = MagicMock()
+    svc._instances_client.stop.return_value.name = "operation-1"
+    results = svc.bulk_isolate(["us-central1-a/vm-1", "projects/other/zones/us-east1-b/instances/vm-2"])
+    assert [r.status for r in results] == ["pending", "failed"]
+    svc._instances_client.stop.assert_called_once_with(project="proj", zone="us-central1-a", instance="vm-1", timeout=30.0)
+    bucket = limiter.guard("compute", "proj")[0]
+    assert bucket.capacity - 1 <= bucket._tokens < bucket.capacity  # one token per stop
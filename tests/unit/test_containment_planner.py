@@ -0,0 +1,64 @@
+from unittest.mock import MagicMock
+from app.models.containment_policy import ContainmentPolicy
+from app.services.containment_executor import ContainmentExecutor
+from app.services.containment_service import ContainmentService
+from app.services.instance_index import InstanceIndex
+
+
+def _inventory():
+    vms = [{"name": f"api-{i}", "project": "proj", "zone": f"us-central1-{'abc'[i % 3]}", "labels": {"service": "checkout"}} for i in range(3)]
+    vms += [{"name": f"web-{i}", "project": "proj", "zone": "us-east1-b", "labels": {"app": "storefront"}} for i in range(200)]
+    return vms
+
+
+def _service():
+    source = MagicMock(side_effect=_inventory)
+    index = InstanceIndex(source)
+    index.refresh()
+    svc = ContainmentService(MagicMock(project_id="proj"), executor=ContainmentExecutor(max_workers=8), tracker=MagicMock(), index=index)
+    svc._instances_client = MagicMock()
+    svc._instances_client.stop.return_value.name = "operation-1"
+    return svc, source
+
+
+def test_plan_estimates_calls_and_impact_without_cloud_calls():
+    svc, source = _service()
+    targets = [f"api-{i}" for i in range(3)] + [f"web-{i}" for i in range(60)] + ["us-east1-b/web-0", "ghost"]
+    policy = ContainmentPolicy(id="p1", name="Quarantine", description=None, justification=None,
+                               target_resources=targets, actions=["isolate_vm", "tag_vm", "reboot"])
+
+    plan = svc.plan_policy(policy)
+    assert source.call_count == 1 and not svc._instances_client.stop.called
+
+    assert len(plan.actions) == 65 * 3
+    assert plan.estimated_api_calls == 63 + 65  # unique stops + tags; duplicate / ghost / unsupported cost nothing
+    assert plan.estimated_poll_calls_per_cycle == 3 + 2  # one list per zone, 50 operations each
+    assert plan.unresolved == ["ghost"]
+    assert plan.zones == ["us-central1-a", "us-central1-b", "us-central1-c", "us-east1-b"]
+    assert [(s.service, s.targeted_instances, s.total_instances, s.fully_down) for s in plan.impacted_services] == [
+        ("checkout", 3, 3, True), ("storefront", 60, 200, False),
+    ]
+    dup = next(a for a in plan.actions if a.resource_id == "us-east1-b/web-0" and a.action_type == "isolate_vm")
+    assert dup.api_calls == 0 and "duplicate" in dup.skip_reason
+
+
+def test_execute_plan_runs_precomputed_actions_and_replans_as_reused():
+    svc, source = _service()
+    policy = ContainmentPolicy(id="p1", name="Quarantine", description=None, justification=None,
+                               target_resources=["api-0", "web-1", "ghost"], actions=["isolate_vm"])
+    plan = svc.plan_policy(policy)
+    results = svc.execute_plan(plan)
+    assert [r.status for r in results] == ["pending", "pending", "failed"]
+    assert svc._instances_client.stop.call_count == 2 and source.call_count == 1
+    assert svc.plan_policy(policy).estimated_api_calls == 0  # both stops are in flight: nothing to call
+
+
+def test_plan_loads_an_index_that_was_never_refreshed():
+    source = MagicMock(return_value=[{"name": "web-1", "project": "proj", "zone": "us-east1-b", "labels": {}}])
+    svc = ContainmentService(MagicMock(project_id="proj"), tracker=MagicMock(), index=InstanceIndex(source))
+    policy = ContainmentPolicy(id="p1", name="Quarantine", description=None, justification=None,
+                               target_resources=["web-1"], actions=["isolate_vm"])
+    plan = svc.plan_policy(policy)
+    assert plan.unresolved == [] and plan.estimated_api_calls == 1
+    svc.plan_policy(policy)
+    assert source.call_count == 1  # warm index: later plans stay offline
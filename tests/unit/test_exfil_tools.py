@@ -0,0 +1,63 @@
+import pytest
+from app.tools.exfil_tools import HeavyHitters, estimate_exfiltration
+from app.tools.investigation_tools import run_attack_investigation
+
+MB = 2 ** 20
+
+
+def _flows(spike_mb=2000):
+    rows = []
+    for hour in range(24):
+        # Steady ~10 MB/hour of backups from the web host to a public mirror
+        rows.append({"src_ip": "10.0.0.5", "dest_ip": "45.33.12.7", "bytes_sent": (10 + hour % 3) * MB, "timestamp": hour * 3600 + 60})
+        # Inbound and internal traffic never counts
+        rows.append({"src_ip": "45.33.12.7", "dest_ip": "10.0.0.5", "bytes_sent": 900 * MB, "timestamp": hour * 3600 + 61})
+        rows.append({"src_ip": "10.0.0.5", "dest_ip": "10.0.0.9", "bytes_sent": 900 * MB, "timestamp": hour * 3600 + 62})
+    # The database host suddenly ships 2 GB out in hour 20, split across flows
+    for k in range(20):
+        rows.append({"src_ip": "10.0.0.9", "dest_ip": "104.16.0.1" if k else "8.8.8.8", "bytes_sent": spike_mb // 20 * MB, "timestamp": 20 * 3600 + k})
+    return rows
+
+
+def test_heavy_hitters_keep_heavy_keys_with_bounds():
+    sketch = HeavyHitters(capacity=3)
+    for i in range(100):
+        sketch.merge([f"noise-{i}", "heavy"], [1.0, 5.0])
+    key, lower, upper = sketch.top(1)[0]
+    assert key == "heavy"
+    assert lower <= 500.0 <= upper
+    assert len(sketch.counts) <= 3
+
+
+def test_estimate_flags_only_anomalous_outbound_hours():
+    estimate = estimate_exfiltration(_flows(), chunk_size=7)
+    assert estimate.flows_scanned == 92
+    assert [h["source"] for h in estimate.anomalous_hours] == ["10.0.0.9"]
+    assert estimate.lower_bytes <= estimate.estimated_bytes <= estimate.upper_bytes
+    assert estimate.estimated_bytes == pytest.approx(2000 * MB, rel=0.01)
+    assert estimate.top_destinations[0]["destination"] == "104.16.0.1"
+
+    quiet = estimate_exfiltration([r for r in _flows() if r["src_ip"] != "10.0.0.9"])
+    assert quiet.estimated_bytes == 0 and quiet.anomalous_hours == []
+
+
+def test_measured_exfiltration_sets_result_flag():
+    result = run_attack_investigation([], [], exfiltration=estimate_exfiltration(_flows()))
+    assert result.data_exfiltrated is True
+    assert result.exfiltration.estimated_bytes > 0
+
+
+def test_investigation_scans_flow_logs_once_per_refresh():
+    from unittest.mock import MagicMock
+    from app.services.investigation_service import InvestigationService
+
+    bq = MagicMock()
+    bq.iter_logs.return_value = []
+    bq.iter_flow_logs.side_effect = lambda *a, **kw: iter(_flows())
+    sec = MagicMock()
+    sec.list_assets.return_value = []
+    svc = InvestigationService(bq, sec)
+    result = svc.investigate(case_id="inc-1", start="1970-01-01T00:00:00Z", end="1970-01-02T00:00:00Z")
+    assert result.data_exfiltrated and result.exfiltration.anomalous_hours[0]["source"] == "10.0.0.9"
+    svc.investigate(case_id="inc-1")
+    assert bq.iter_flow_logs.call_count == 1
@@ -0,0 +1,79 @@
+import pytest
+from unittest.mock import MagicMock
+from app.services.bigquery_service import BigQueryService
+from app.services.log_index_service import LogIndexService
+from app.services.threat_hunting_service import ThreatHuntingService
+from app.tools.hunt_aggregate import aggregate_rows, format_aggregate
+from app.tools.hunt_filter import HuntFilterError
+
+
+def _rows():
+    rows = [{"ip": "203.0.113.7", "message": "failed login", "timestamp": f"2025-06-19T02:{i:02d}:00Z"} for i in range(30)]
+    rows += [{"ip": "10.0.0.1", "message": "failed login", "timestamp": f"2025-06-19T0{h}:05:00Z"} for h in range(5)]
+    return rows
+
+
+def test_local_aggregate_histogram_and_top_k():
+    result = format_aggregate(aggregate_rows(_rows(), 3600, "ip", top_k=1), "ip", 3600, "local")
+    assert result["total_rows"] == 35
+    assert result["peak_bucket"] == {"start": "2025-06-19T02:00:00+00:00", "count": 31}
+    assert len(result["histogram"]) == 5
+    assert result["top"] == [{
+        "ip": "203.0.113.7", "count": 30,
+        "first_seen": "2025-06-19T02:00:00+00:00", "last_seen": "2025-06-19T02:29:00+00:00",
+        "peak_start": "2025-06-19T02:00:00+00:00", "peak_count": 30,
+    }]
+
+
+def test_aggregate_pushes_group_by_into_bigquery():
+    bq = MagicMock()
+    bq.aggregate_logs.return_value = {"histogram": [], "top": []}
+    svc = ThreatHuntingService(bq, MagicMock())
+    result = svc.hunt_aggregate("'failed login'", group_by="source_ip", bucket_seconds=300)
+    kwargs = bq.aggregate_logs.call_args.kwargs
+    assert kwargs["group_by_sql"] == "ip" and kwargs["bucket_seconds"] == 300
+    assert "LIKE @p0" in kwargs["query_filter"]
+    assert result["backend"] == "bigquery" and result["group_by"] == "ip"
+    bq.query_logs.assert_not_called()
+
+    with pytest.raises(HuntFilterError):
+        svc.hunt_aggregate("TRUE", group_by="timestamp")
+
+
+def test_hot_window_keyword_aggregate_uses_index(tmp_path):
+    index = LogIndexService(str(tmp_path / "idx"))
+    index.add_rows(_rows())
+    index.mark_refreshed()
+    bq = MagicMock()
+    svc = ThreatHuntingService(bq, MagicMock(), index=index)
+    result = svc.hunt_aggregate("'failed' AND timestamp >= '2025-06-19T01:00:00Z'")
+    assert result["backend"] == "index" and result["total_rows"] == 34
+    bq.aggregate_logs.assert_not_called()
+    bq.query_logs.assert_not_called()
+
+
+def test_index_aggregate_refreshes_a_stale_index_first():
+    index = MagicMock(hot_start=0.0, doc_count=0, watermark=1.0)
+    index.is_stale.return_value = True
+    index.search.return_value = []
+    bq = MagicMock()
+    bq.query_logs.return_value = []
+    svc = ThreatHuntingService(bq, MagicMock(), index=index)
+    result = svc.hunt_aggregate("'failed' AND timestamp >= '2025-06-19T01:00:00Z'")
+    assert result["backend"] == "index"
+    bq.query_logs.assert_called_once()
+    index.mark_refreshed.assert_called_once()
+
+
+def test_bigquery_aggregate_binds_bucket_parameters():
+    bq = BigQueryService.__new__(BigQueryService)
+    bq.dataset = "sec"
+    bq.client_manager = MagicMock()
+    client = bq.client_manager.get_bigquery_client.return_value
+    client.query.return_value.result.return_value = []
+    bq.aggregate_logs("ip = @p0", [("p0", "STRING", "1.2.3.4")], bucket_seconds=60, group_by_sql="ip", top_k=5)
+    assert client.query.call_count == 2
+    sql, = client.query.call_args_list[1].args
+    assert "GROUP BY key, bucket" in sql and "LIMIT @top_k" in sql
+    names = [p.name for p in client.query.call_args.kwargs["job_config"].query_parameters]
+    assert names == ["p0", "bucket_seconds", "top_k"]
@@ -0,0 +1,53 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from app.tools.hunt_filter import HuntFilterError, compile_filter
+from app.services.threat_hunting_service import ThreatHuntingService
+
+
+def test_hallucinated_fields_compile_to_parameterised_sql():
+    plan = compile_filter("event_type = 'authentication' AND source_ip = 192.0.2.10")
+    assert plan.sql == "(LOWER(message) LIKE @p0 AND ip = @p1)"
+    assert [p.value for p in plan.params] == ["%authentication%", "192.0.2.10"]
+
+
+def test_hinted_fields_respect_the_operator():
+    plan = compile_filter("event_type != 'authentication'")
+    assert plan.sql == "NOT (LOWER(message) LIKE @p0)"
+    assert not plan.matches({"message": "authentication failure"})
+    for expression in ("failed_logins < 3", "event_type > 'authentication'", "severity = 'high'"):
+        with pytest.raises(HuntFilterError):
+            compile_filter(expression)
+
+
+def test_timestamp_pushdown_uses_typed_parameter():
+    plan = compile_filter("failed_login_count > 5 AND timestamp >= '2025-06-19T00:00:00Z'")
+    assert plan.sql == "(LOWER(message) LIKE @p0 AND timestamp >= @p1)"
+    assert plan.params[1].type == "TIMESTAMP"
+    assert plan.params[1].value == datetime(2025, 6, 19, tzinfo=timezone.utc)
+
+
+def test_equivalent_expressions_share_cached_plan():
+    a = compile_filter("ip = '1.2.3.4'   and   LOWER(message) like '%denied%'")
+    b = compile_filter("ip = '1.2.3.4' AND LOWER(message) LIKE '%denied%'")
+    assert a is b
+
+
+def test_plan_matches_rows_locally():
+    plan = compile_filter("'failed login' AND NOT ip LIKE '10.%'")
+    assert plan.matches({"message": "Failed login for bob", "ip": "203.0.113.7"})
+    assert not plan.matches({"message": "Failed login for bob", "ip": "10.0.0.1"})
+
+
+def test_injection_attempt_is_rejected():
+    with pytest.raises(HuntFilterError):
+        compile_filter("ip = '1.2.3.4'; DROP TABLE logs")
+
+
+def test_detect_threats_passes_params():
+    bq = MagicMock()
+    svc = ThreatHuntingService(bq, MagicMock())
+    svc.detect_threats(limit=5, filter_expression="log_type = 'AUDIT'")
+    bq.query_logs.assert_called_once_with(
+        query_filter="log_type = @p0", limit=5, params=compile_filter("log_type = 'AUDIT'").params
+    )
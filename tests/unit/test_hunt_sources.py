@@ -0,0 +1,49 @@
+import threading
+from unittest.mock import MagicMock
+from app.services.threat_hunting_service import ThreatHuntingService
+from app.tools.hunt_sources import HUNT_SOURCES, canonical_row, merge_newest_first
+
+
+def test_merge_is_newest_first_across_sources():
+    a = [{"timestamp": "2025-06-19T12:00:00Z"}, {"timestamp": "2025-06-19T08:00:00Z"}]
+    b = [{"timestamp": "2025-06-19T10:00:00Z"}, {"timestamp": None}]
+    merged = list(merge_newest_first([a, b]))
+    assert [r["timestamp"] for r in merged] == [
+        "2025-06-19T12:00:00Z", "2025-06-19T10:00:00Z", "2025-06-19T08:00:00Z", None,
+    ]
+
+
+def test_darkweb_rows_use_logical_names():
+    row = canonical_row(HUNT_SOURCES["darkweb_chatter"], {"id": "x", "chatter_text": "selling creds", "event_time": "t"})
+    assert row["message"] == "selling creds" and row["timestamp"] == "t"
+    assert row["hunt_source"] == "darkweb_chatter"
+
+
+def _bq(barrier=None):
+    def query_table(table, query_filter=None, limit=1000, params=None, time_column="timestamp"):
+        if barrier is not None:
+            barrier.wait()  # raises BrokenBarrierError unless every source is in flight at once
+        if table == "darkweb_chatter":
+            assert "chatter_text" in query_filter and time_column == "event_time"
+            return [{"id": "d1", "chatter_text": "acme vpn creds", "event_time": "2025-06-19T11:00:00Z"}]
+        if "'AUDIT'" in query_filter and "IS NULL" not in query_filter:
+            return [{"ip": "10.0.0.1", "message": "acme admin login", "timestamp": "2025-06-19T12:00:00Z"}]
+        return [{"ip": "10.0.0.2", "message": "acme vpn", "timestamp": "2025-06-19T10:00:00Z"}]
+
+    bq = MagicMock()
+    bq.query_table.side_effect = query_table
+    return bq
+
+
+def test_fanout_runs_sources_concurrently_and_merges():
+    svc = ThreatHuntingService(_bq(threading.Barrier(len(HUNT_SOURCES), timeout=5)), MagicMock())
+    result = svc.hunt_sources("'acme'", limit=10)
+    assert [r["hunt_source"] for r in result["rows"]] == ["audit_logs", "darkweb_chatter", "logs"]
+    assert all(result["sources"][n]["rows"] == 1 for n in HUNT_SOURCES)
+
+
+def test_fanout_skips_sources_missing_filter_columns():
+    svc = ThreatHuntingService(_bq(), MagicMock())
+    result = svc.hunt_sources("ip = '10.0.0.1'", limit=10)
+    assert "skipped" in result["sources"]["darkweb_chatter"]
+    assert {r["hunt_source"] for r in result["rows"]} == {"logs", "audit_logs"}
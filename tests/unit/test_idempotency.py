@@ -0,0 +1,87 @@
+import json
+import threading
+import time
+from unittest.mock import MagicMock
+from app.models.containment_action import ContainmentAction
+from app.services.idempotency import ActionJournal, IdempotencyCache
+
+
+def _isolate(status="pending"):
+    return MagicMock(side_effect=lambda: ContainmentAction(resource_id="vm-1", action_type="isolate_vm", status=status))
+
+
+def test_duplicates_in_flight_and_within_ttl_run_once():
+    clock = MagicMock(return_value=1000.0)
+    cache = IdempotencyCache(ContainmentAction, ttl_seconds=600, clock=clock)
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return ContainmentAction(resource_id="vm-1", action_type="isolate_vm", status="pending")
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.run("isolate_vm", "p/z/vm-1", None, slow))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and all(r is results[0] for r in results)
+
+    fn = _isolate()
+    assert cache.run("isolate_vm", "p/z/vm-1", None, fn) is results[0] and not fn.called
+    cache.run("isolate_vm", "p/z/vm-2", None, fn)  # other resource
+    cache.run("tag_vm", "vm-1", {"policy": "a"}, fn)
+    cache.run("tag_vm", "vm-1", {"policy": "b"}, fn)  # other params
+    assert fn.call_count == 3
+
+    clock.return_value = 1601.0
+    cache.run("isolate_vm", "p/z/vm-1", None, fn)  # expired
+    assert fn.call_count == 4
+
+
+def test_failed_results_are_retried():
+    cache = IdempotencyCache(ContainmentAction)
+    failing, ok = _isolate("failed"), _isolate()
+    cache.run("isolate_vm", "vm-1", None, failing)
+    cache.run("isolate_vm", "vm-1", None, ok)
+    cache.run("isolate_vm", "vm-1", None, ok)
+    assert failing.call_count == 1 and ok.call_count == 1
+
+
+def test_journal_survives_restart_and_ships_batches(tmp_path):
+    client = MagicMock()
+    path = str(tmp_path / "journal.jsonl")
+    journal = ActionJournal(path, bucket_name="incidents", prefix="journal/containment", flush_batch=2, storage_client=client)
+    cache = IdempotencyCache(ContainmentAction, journal)
+    cache.run("isolate_vm", "vm-1", None, _isolate())
+    settled = ContainmentAction(resource_id="vm-1", action_type="isolate_vm", status="executed", operation="op-1")
+    cache.record("isolate_vm", "vm-1", None, settled)
+    journal.close()
+
+    blob = client.bucket.return_value.blob
+    assert client.bucket.call_args.args == ("incidents",)
+    assert blob.call_args.args[0].startswith("journal/containment/")
+    shipped = [json.loads(line) for line in blob.return_value.upload_from_string.call_args.args[0].splitlines()]
+    assert [r["result"]["status"] for r in shipped] == ["pending", "executed"]
+
+    restarted = IdempotencyCache(ContainmentAction, ActionJournal(path))
+    fn = _isolate()
+    assert restarted.run("isolate_vm", "vm-1", None, fn).status == "executed"
+    assert not fn.called
+
+
+def test_pending_results_are_not_replayed_after_restart(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = ActionJournal(path)
+    IdempotencyCache(ContainmentAction, journal).run("isolate_vm", "vm-2", None, _isolate())
+    journal.close()
+
+    restarted = IdempotencyCache(ContainmentAction, ActionJournal(path))
+    assert not restarted.would_reuse("isolate_vm", "vm-2")
+    fn = _isolate()
+    restarted.run("isolate_vm", "vm-2", None, fn)
+    assert fn.called
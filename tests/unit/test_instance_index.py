@@ -0,0 +1,58 @@
+from unittest.mock import MagicMock
+from app.services.containment_executor import ContainmentExecutor
+from app.services.containment_service import ContainmentService
+from app.services.instance_index import InstanceIndex
+
+INVENTORY = [
+    {"name": "web-1", "project": "proj", "zone": "us-central1-a"},
+    {"name": "web-2", "project": "proj", "zone": "us-east1-b"},
+    {"name": "db-1", "project": "proj", "zone": "us-central1-a"},
+    {"name": "db-1", "project": "other", "zone": "europe-west1-c"},
+    {"name": "dup", "project": "a", "zone": "us-central1-a"},
+    {"name": "dup", "project": "b", "zone": "us-central1-b"},
+]
+
+
+def test_resolves_bare_names_with_ttl_and_single_miss_refresh():
+    clock = MagicMock(return_value=0.0)
+    source = MagicMock(return_value=INVENTORY)
+    index = InstanceIndex(source, ttl_seconds=900, miss_refresh_seconds=60, clock=clock)
+
+    resolved, errors = index.resolve_many(["web-1", "db-1", "us-west1-a/x", "dup", "ghost", "gone"], "proj")
+    assert resolved == {
+        "web-1": ("proj", "us-central1-a", "web-1"),
+        "db-1": ("proj", "us-central1-a", "db-1"),  # default project wins
+        "us-west1-a/x": ("proj", "us-west1-a", "x"),
+    }
+    assert "ambiguous" in errors["dup"] and "not found" in errors["ghost"]
+    assert source.call_count == 1  # misses within miss_refresh_seconds don't rescan
+
+    clock.return_value = 120.0
+    source.return_value = INVENTORY + [{"name": "ghost", "project": "proj", "zone": "us-east1-b"}]
+    assert index.resolve("ghost", "proj") == ("proj", "us-east1-b", "ghost")
+    assert index.resolve("web-2", "proj") == ("proj", "us-east1-b", "web-2")
+    assert source.call_count == 2
+
+
+def test_bulk_isolate_groups_by_zone_and_keeps_input_order():
+    svc = ContainmentService(
+        MagicMock(project_id="proj"),
+        executor=ContainmentExecutor(max_workers=1),
+        tracker=MagicMock(),
+        index=InstanceIndex(MagicMock(return_value=INVENTORY)),
+    )
+    svc._instances_client = MagicMock()
+    svc._instances_client.stop.return_value.name = "operation-1"
+
+    results = svc.bulk_isolate(["web-1", "db-1", "web-2", "ghost"])
+    assert [(r.resource_id, r.status) for r in results] == [
+        ("web-1", "pending"), ("db-1", "pending"), ("web-2", "pending"), ("ghost", "failed"),
+    ]
+    zones = [c.kwargs["zone"] for c in svc._instances_client.stop.call_args_list]
+    assert zones == ["us-central1-a", "us-east1-b", "us-central1-a"]  # interleaved across zones
+
+    svc._instances_client.stop.assert_called_with(project="proj", zone="us-central1-a", instance="db-1", timeout=30.0)
+    # same VM by bare name and by zone/name: resolved to one key, stopped once
+    assert svc.perform_vm_isolation("web-2") is results[2]
+    assert svc.perform_vm_isolation("web-2", "us-east1-b") is results[2]
+    assert svc._instances_client.stop.call_count == 3
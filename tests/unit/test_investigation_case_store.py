@@ -0,0 +1,115 @@
+import pickle
+import pytest
+from unittest.mock import MagicMock
+from app.services.investigation_case_store import InvestigationCaseStore
+from app.services.investigation_service import InvestigationService
+
+
+def _rows():
+    return [
+        {"timestamp": 100.0, "ip": "45.33.12.7", "principal": "alice", "host": "vm-web", "message": "Accepted password for alice"},
+        {"timestamp": 200.0, "ip": "10.0.0.5", "principal": "alice", "host": "vm-web", "message": "sudo su root"},
+    ]
+
+
+@pytest.fixture
+def services():
+    bq = MagicMock()
+    bq.iter_logs.return_value = _rows()
+    sec = MagicMock()
+    sec.list_assets.return_value = []
+    return bq, sec
+
+
+def test_follow_up_ingests_only_new_evidence(services, tmp_path):
+    bq, sec = services
+    store = InvestigationCaseStore(str(tmp_path / "cases.sqlite"))
+    svc = InvestigationService(bq, sec, store=store)
+    first = svc.investigate(case_id="inc-1")
+    assert len(first.timeline) == 2
+
+    bq.iter_logs.return_value = [
+        {"timestamp": 300.0, "ip": "10.0.0.5", "principal": "alice", "host": "vm-db", "message": "ssh into vm-db"},
+    ]
+    second = svc.investigate(case_id="inc-1")
+    kwargs = bq.iter_logs.call_args.kwargs
+    assert kwargs["query_filter"] == "timestamp > @p0"
+    assert kwargs["params"][0].value.timestamp() == 200.0
+    assert len(second.timeline) == 3
+    # Assets are reused within their TTL
+    assert sec.list_assets.call_count == 1
+    assert "host:vm-db" in {r["node"] for r in svc.blast_radius("alice", case_id="inc-1")}
+
+
+
+def test_capped_follow_up_resumes_from_last_ingested_event(services, tmp_path):
+    bq, sec = services
+    svc = InvestigationService(bq, sec, store=InvestigationCaseStore(str(tmp_path / "cases.sqlite")))
+    svc.investigate(case_id="inc-1")
+
+    bq.iter_logs.return_value = [
+        {"timestamp": ts, "ip": "10.0.0.5", "principal": "alice", "host": "vm-db", "message": f"ssh {i}"}
+        for i, ts in enumerate([300.0, 400.0, 400.0])
+    ]
+    svc.investigate(case_id="inc-1", limit=3)
+    assert bq.iter_logs.call_args.kwargs["ascending"] is True
+    case = svc.store.get("inc-1")
+    # the 400.0 rows may continue past the cap, so they wait for the next call
+    assert case.watermark == 300.0
+    assert case.events.messages[-1] == "ssh 0"
+
+
+def test_cases_survive_restart(services, tmp_path):
+    bq, sec = services
+    path = str(tmp_path / "cases.sqlite")
+    InvestigationService(bq, sec, store=InvestigationCaseStore(path)).investigate(case_id="inc-1")
+
+    reopened = InvestigationCaseStore(path)
+    case = reopened.get("inc-1")
+    assert case.watermark == 200.0
+    assert case.events.messages == [r["message"] for r in _rows()]
+    assert case.result is not None and len(case.result.timeline) == 2
+    assert case.graph.find("alice") >= 0
+    with pytest.raises(KeyError):
+        reopened.get("inc-2")
+
+    bq.iter_logs.return_value = []
+    result = InvestigationService(bq, sec, store=pickle.loads(pickle.dumps(reopened))).investigate(case_id="inc-1")
+    assert result.timeline == case.result.timeline
+
+
+def test_trimmed_case_is_rewritten(services, tmp_path):
+    bq, sec = services
+    path = str(tmp_path / "cases.sqlite")
+    svc = InvestigationService(bq, sec, store=InvestigationCaseStore(path, max_events=2))
+    svc.investigate(case_id="inc-1")
+    bq.iter_logs.return_value = [{"timestamp": 300.0, "ip": "10.0.0.5", "message": "ssh to vm-db"}]
+    svc.investigate(case_id="inc-1")
+    events = InvestigationCaseStore(path).get("inc-1").events
+    assert list(events.ts) == [200.0, 300.0]
+
+
+def test_seeded_investigation_pushes_down_entities(services):
+    bq, sec = services
+    sec.search_assets.return_value = [
+        {"name": "//compute.googleapis.com/projects/p/zones/z/instances/vm-web", "asset_type": "compute.googleapis.com/Instance"},
+    ]
+    svc = InvestigationService(bq, sec)
+    result = svc.investigate(
+        case_id="inc-9", seed_entities=["ip:45.33.12.7", "principal:alice"], start="1970-01-01T00:00:00Z",
+    )
+    kwargs = bq.iter_logs.call_args.kwargs
+    assert kwargs["query_filter"] == "((ip IN UNNEST(@p0) OR LOWER(message) LIKE @p1) AND timestamp >= @p2)"
+    assert kwargs["params"][0].value == ["45.33.12.7"]
+    sec.search_assets.assert_called_once_with(["alice"], asset_types=None)
+    sec.list_assets.assert_not_called()
+    assert any(r.endswith("instances/vm-web") for r in result.compromised_resources)
+
+    # Follow-ups keep the case's seeds; new seeds restart the evidence
+    svc.investigate(case_id="inc-9")
+    assert "@p0" in bq.iter_logs.call_args.kwargs["query_filter"]
+    svc.investigate(case_id="inc-9", seed_entities=["host:vm-db"])
+    assert svc.store.get("inc-9").watermark == 200.0
+    assert svc.store.get("inc-9").seeds == ["host:vm-db"]
+    with pytest.raises(ValueError):
+        svc.investigate(case_id="inc-9", start="last tuesday")
@@ -0,0 +1,86 @@
+import numpy as np
+from app.tools.investigation_tools import classify_stage, run_attack_investigation, sessionize, STAGES
+
+T0 = 1_750_000_000.0
+
+
+def _attack_logs():
+    noise = [
+        {"timestamp": T0 + i * 60, "ip": f"10.0.0.{i % 20}", "host": f"vm-{i % 7}", "message": "GET /health 200"}
+        for i in range(500)
+    ]
+    attack = [
+        {"timestamp": T0 + 100, "ip": "45.33.12.7", "host": "vm-web", "message": "Accepted password for alice from 45.33.12.7"},
+        {"timestamp": T0 + 400, "ip": "45.33.12.7", "principal": "alice", "message": "setIamPolicy role granted roles/owner"},
+        # Different IP and host: linked to the above only through alice's session
+        {"timestamp": T0 + 900, "ip": "10.0.0.99", "principal": "alice", "host": "vm-db", "message": "ssh into vm-db"},
+        {"timestamp": T0 + 1200, "ip": "10.0.0.99", "host": "vm-db", "message": "BigQuery extract job exported to gs://drop"},
+    ]
+    # Unrelated failed login elsewhere must not join the chain
+    other = [{"timestamp": T0 + 50_000, "ip": "10.9.9.9", "host": "vm-x", "message": "failed login for user bob"}]
+    return noise + attack + other
+
+
+def test_classify_stage():
+    assert STAGES[classify_stage("login from new device for root")] == "initial_access"
+    assert classify_stage("Accepted publickey for root") == -1  # routine unless anomalous
+    assert STAGES[classify_stage("SetIamPolicy: role granted")] == "privilege_escalation"
+    assert classify_stage("GET /health 200") == -1
+
+
+def test_sessionize_splits_on_gap_per_entity():
+    codes = np.array([0, 0, 0, 1, 1, -1])
+    ts = np.array([0.0, 10.0, 5000.0, 20.0, 30.0, 40.0])
+    session, count = sessionize(codes, ts, gap_seconds=100)
+    assert count == 3
+    assert session[0] == session[1] != session[2]
+    assert session[3] == session[4] and session[5] == -1
+
+
+def test_reconstructs_chain_across_ip_and_host():
+    assets = [{"name": "//compute.googleapis.com/projects/p/zones/z/instances/vm-db"}]
+    result = run_attack_investigation(_attack_logs(), assets)
+    assert [line.split(" - ")[1].split(":")[0] for line in result.timeline] == [
+        "initial_access", "privilege_escalation", "lateral_movement", "exfiltration",
+    ]
+    assert result.attack_path[0].startswith("ip:45.33.12.7 -> principal:alice")
+    assert result.attack_path[-1].endswith("instances/vm-db (p=0.8)")
+    assert "//compute.googleapis.com/projects/p/zones/z/instances/vm-db" in result.compromised_resources
+    assert "vm-x" not in result.compromised_resources
+    assert result.data_exfiltrated is True
+    assert result.estimated_risk_score == 10.0
+
+
+def test_columnar_batch_and_no_evidence():
+    logs = {
+        "timestamp": [T0, T0 + 1],
+        "ip": ["10.0.0.1", "10.0.0.1"],
+        "principal": ["svc", "svc"],
+        "message": ["GET / 200", "GET / 200"],
+    }
+    result = run_attack_investigation(logs, [])
+    assert result.timeline == [] and result.estimated_risk_score == 0.0
+
+
+def test_routine_internal_logins_are_not_a_compromise():
+    logs = [
+        {"timestamp": T0 + i * 60, "ip": f"10.0.1.{i % 3}", "host": f"web-{i % 3}",
+         "message": "Accepted publickey for deploy from 10.0.1.5"}
+        for i in range(20)
+    ]
+    result = run_attack_investigation(logs, [])
+    assert result.timeline == [] and result.compromised_resources == []
+    assert result.estimated_risk_score == 0.0
+
+
+def test_internal_login_after_failures_is_initial_access():
+    logs = [
+        {"timestamp": T0, "ip": "10.0.1.9", "host": "web-0", "message": "failed password for deploy"},
+        {"timestamp": T0 + 30, "ip": "10.0.1.9", "host": "web-0", "message": "Accepted password for deploy"},
+        {"timestamp": T0 + 60, "ip": "10.0.1.4", "host": "web-1", "message": "Accepted password for ops"},
+    ]
+    result = run_attack_investigation(logs, [])
+    assert [line.split(" - ")[1].split(":")[0] for line in result.timeline] == [
+        "credential_access", "initial_access",
+    ]
+    assert "web-1" not in result.compromised_resources
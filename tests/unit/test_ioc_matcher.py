@@ -0,0 +1,56 @@
+from unittest.mock import MagicMock
+from app.tools.ioc_matcher import AhoCorasick, IocMatcher, extract_indicators
+from app.services.threat_hunting_service import ThreatHuntingService
+
+
+def test_automaton_finds_overlapping_patterns():
+    ac = AhoCorasick(["he", "she", "his", "hers"])
+    found = sorted(p for _, p in ac.search("ushers"))
+    assert found == ["he", "hers", "she"]
+
+
+def test_incremental_update_adds_and_removes():
+    matcher = IocMatcher()
+    matcher.update({"evil.com": "domain"})
+    assert matcher.scan("GET http://evil.com/x") == [("evil.com", "domain")]
+    matcher.update({"203.0.113.9": "ip"})
+    assert matcher.scan("GET http://evil.com/x") == []
+    assert matcher.scan("conn from 203.0.113.9") == [("203.0.113.9", "ip")]
+    assert matcher.scan("conn from 203.0.113.99") == []
+
+
+def test_extract_indicators_from_intel_rows():
+    intel = [{
+        "summary": "CVE-2024-3400 exploited from 198.51.100.7 via c2.badhost.net",
+        "raw_data": {"exploit_strings": ["${jndi:ldap://"]},
+    }]
+    found = extract_indicators(intel)
+    assert found["198.51.100.7"] == "ip"
+    assert found["c2.badhost.net"] == "domain"
+    assert found["cve-2024-3400"] == "cve"
+    assert found["${jndi:ldap://"] == "exploit_string"
+
+
+def test_extract_indicators_ignores_reference_payloads():
+    intel = [{
+        "summary": "Remote code execution in ExampleServer",
+        "raw_data": {
+            "cve": {"references": [{"url": "https://github.com/x/y"}, {"url": "https://nvd.nist.gov/vuln"}]},
+            "configurations": [{"criteria": "cpe:2.3:a:example:server:10.2.3.4:*"}],
+            "iocs": ["203.0.113.50", "Evil.Example.NET"],
+        },
+    }]
+    assert extract_indicators(intel) == {"203.0.113.50": "ip", "evil.example.net": "domain"}
+
+
+def test_sweep_iocs_scans_stream_once():
+    bq = MagicMock()
+    bq.query_threat_intel.return_value = [{"summary": "bad ip 198.51.100.7", "raw_data": {}}]
+    bq.iter_logs.return_value = iter([
+        {"ip": "198.51.100.7", "message": "login"},
+        {"ip": "10.0.0.2", "message": "ok"},
+    ])
+    svc = ThreatHuntingService(bq, MagicMock())
+    result = svc.sweep_iocs(limit=10)
+    assert result["scanned_rows"] == 2
+    assert result["hits_by_indicator"] == {"198.51.100.7": 1}
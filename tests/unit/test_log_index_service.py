@@ -0,0 +1,66 @@
+import time
+from unittest.mock import MagicMock
+from app.services.log_index_service import LogIndexService, decode_postings, encode_postings
+from app.services.threat_hunting_service import ThreatHuntingService
+
+
+def _rows(now):
+    return [
+        {"ip": f"203.0.113.{i % 5}", "timestamp": now - i, "message": msg}
+        for i, msg in enumerate(["Failed login for alice", "credential reset", "ok", "FAILED LOGIN for bob"] * 5)
+    ]
+
+
+def test_postings_round_trip():
+    ids = [0, 3, 4, 300, 70000]
+    data = encode_postings(ids)
+    assert decode_postings(data, 0, len(data)) == ids
+
+
+def test_search_spans_buffer_and_mmapped_segments(tmp_path):
+    now = time.time()
+    index = LogIndexService(str(tmp_path), segment_rows=7)
+    index.add_rows(_rows(now))
+    assert len(index.segments) == 2  # 14 rows flushed, 6 still buffered
+
+    hits = index.search(lambda r: "failed login" in r["message"].lower(), ["failed login"], limit=100)
+    assert len(hits) == 10
+    assert all("failed login" in h["message"].lower() for h in hits)
+
+    # Reopening the directory reads the same segments back from disk
+    reopened = LogIndexService(str(tmp_path))
+    assert reopened.doc_count == 14
+
+
+def test_keyword_hunt_uses_index_and_bigquery_only_for_cold_history(tmp_path):
+    now = time.time()
+    index = LogIndexService(str(tmp_path))
+    index.add_rows(_rows(now))
+    index.mark_refreshed()
+    bq = MagicMock()
+    bq.query_logs.return_value = [{"message": "old failed login"}]
+    svc = ThreatHuntingService(bq, MagicMock(), index=index)
+
+    rows = svc.detect_threats(limit=50, filter_expression="LOWER(message) LIKE '%failed login%'")
+    assert len(rows) == 11
+    kwargs = bq.query_logs.call_args.kwargs
+    assert kwargs["query_filter"].endswith("AND timestamp < @hot_start")
+    assert kwargs["limit"] == 40
+
+
+def test_refresh_pages_oldest_first_without_skipping_rows(tmp_path):
+    now = int(time.time())
+    index = LogIndexService(str(tmp_path))
+    rows = [{"ip": "203.0.113.1", "timestamp": now - 30 + i // 2, "message": f"failed login {i}"} for i in range(6)]
+    bq = MagicMock()
+    # full pages end inside a group of rows sharing one timestamp
+    bq.query_logs.side_effect = [rows[:3], rows[2:5], rows[4:]]
+    svc = ThreatHuntingService(bq, MagicMock(), index=index)
+
+    assert svc.refresh_index(batch_limit=3) == 6
+    first, second, third = bq.query_logs.call_args_list
+    assert first.kwargs["ascending"] is True
+    assert second.kwargs["params"][0].value.timestamp() == rows[1]["timestamp"]
+    assert third.kwargs["params"][0].value.timestamp() == rows[3]["timestamp"]
+    assert index.watermark == rows[-1]["timestamp"]
+    assert not index.is_stale()
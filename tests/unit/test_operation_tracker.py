@@ -0,0 +1,71 @@
+import pickle
+import threading
+from unittest.mock import MagicMock
+from google.cloud import compute_v1, osconfig_v1
+from app.models.containment_action import ContainmentAction
+from app.models.remediation_action import RemediationAction
+from app.services.operation_tracker import OperationTracker
+from app.tools.operation_tools import OperationStatus, PatchJobPoller, ZoneOperationPoller
+
+
+def _action(name):
+    return ContainmentAction(resource_id=name, action_type="isolate_vm", status="pending")
+
+
+def test_one_batched_poll_per_zone_settles_actions():
+    running = {"op-3"}
+    poller = MagicMock(side_effect=lambda scope, names: {
+        n: OperationStatus(n not in running, "QUOTA_EXCEEDED" if n == "op-2" else None) for n in names
+    })
+    tracker = OperationTracker(pollers={"zone_operation": poller}, min_interval=60, max_interval=300)
+    actions = [_action(f"vm-{i}") for i in range(1, 4)]
+    for i, action in enumerate(actions, 1):
+        tracker.track(action, "zone_operation", "proj/us-central1-a" if i < 3 else "proj/us-east1-b", f"op-{i}")
+
+    assert tracker.poll(force=True) == 2
+    assert poller.call_count == 2  # one call per zone, not per operation
+    poller.assert_any_call("proj/us-central1-a", ["op-1", "op-2"])
+    assert [a.status for a in actions] == ["executed", "failed", "pending"]
+    assert actions[1].justification == "QUOTA_EXCEEDED"
+    assert tracker.get("op-3").delay == 120  # still running: backed off
+    tracker.close()
+
+
+def test_worker_releases_waiters_and_subscribers():
+    done = threading.Event()
+    tracker = OperationTracker(pollers={"patch_job": lambda scope, names: {n: OperationStatus(done.is_set()) for n in names}}, min_interval=0.01)
+    action = RemediationAction(action="patch_vm", resource="vm-1", status="pending", message="triggered")
+    seen = []
+    tracker.track(action, "patch_job", "proj", "projects/proj/patchJobs/1")
+    tracker.subscribe("projects/proj/patchJobs/1", seen.append)
+    assert tracker.wait("projects/proj/patchJobs/1", timeout=0.05).status == "pending"
+    done.set()
+    assert tracker.wait("projects/proj/patchJobs/1", timeout=5).status == "executed"
+    assert seen == [action] and tracker.pending_count == 0
+    tracker.close()
+    restored = pickle.loads(pickle.dumps(OperationTracker()))
+    assert restored.pending_count == 0 and set(restored.pollers) == {"zone_operation", "patch_job"}
+
+
+def test_pollers_read_compute_and_osconfig_statuses():
+    compute = MagicMock()
+    compute.list.return_value = [
+        compute_v1.Operation(name="op-1", status=compute_v1.Operation.Status.DONE),
+        compute_v1.Operation(name="op-2", status=compute_v1.Operation.Status.RUNNING),
+        compute_v1.Operation(
+            name="op-3", status=compute_v1.Operation.Status.DONE,
+            error=compute_v1.Error(errors=[compute_v1.Errors(message="boom")]),
+        ),
+    ]
+    statuses = ZoneOperationPoller(compute)("proj/us-central1-a", ["op-1", "op-2", "op-3"])
+    assert statuses == {"op-1": (True, None), "op-2": (False, None), "op-3": (True, "boom")}
+    request = compute.list.call_args.kwargs["request"]
+    assert (request.project, request.zone) == ("proj", "us-central1-a")
+    assert request.filter == '(name = "op-1") OR (name = "op-2") OR (name = "op-3")'
+
+    osconfig = MagicMock()
+    osconfig.get_patch_job.side_effect = lambda name: osconfig_v1.PatchJob(
+        name=name, state=osconfig_v1.PatchJob.State.TIMED_OUT if name.endswith("2") else osconfig_v1.PatchJob.State.SUCCEEDED,
+    )
+    statuses = PatchJobPoller(osconfig)("proj", ["jobs/1", "jobs/2"])
+    assert statuses == {"jobs/1": (True, None), "jobs/2": (True, "Patch job ended TIMED_OUT")}
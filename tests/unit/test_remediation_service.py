@@ -9,18 +9,62 @@ def config():
     return c
 
 def test_isolate_vm_success(monkeypatch, config):
-    # Monkeypatch the compute client stop call
+    from unittest.mock import MagicMock
+    from app.tools import remediation_tools
     from app.tools.remediation_tools import RemediationAction
 
-    svc = RemediationService(config)
+    compute = MagicMock()
+    compute.stop.return_value.name = "operation-stop-vm-1"
+    monkeypatch.setattr(remediation_tools.compute_v1, "InstancesClient", lambda: compute)
+    svc = RemediationService(config, tracker=MagicMock())
     action = svc.isolate_vm("vm-1", "us-central1-a")
     assert isinstance(action, RemediationAction)
     assert action.action == "isolate_vm"
     assert action.resource == "vm-1"
-    assert action.status in ("executed", "failed")
+    assert action.status == "pending"
+    assert action.operation == "operation-stop-vm-1"
+    compute.stop.assert_called_once_with(project="test-project", zone="us-central1-a", instance="vm-1")
+    svc.tracker.track.assert_called_once()
 
-def test_recover_file(config):
-    svc = RemediationService(config)
+def test_recover_file(config, tmp_path):
+    from unittest.mock import MagicMock
+    from app.services.file_recovery_service import FileRecoveryService
+
+    storage_client = MagicMock()  # empty bucket: no snapshots
+    recovery = FileRecoveryService("incidents", str(tmp_path), storage_client=storage_client)
+    svc = RemediationService(config, recovery=recovery)
     action = svc.recover_file("/secret/data.txt")
     assert action.action == "recover_file"
     assert "/secret/data.txt" in action.resource
+    assert action.status == "failed" and action.message.startswith("No backup of /secret/data.txt")
+    storage_client.list_blobs.assert_called_once_with("incidents", prefix="backups/", delimiter="/")
+
+def test_bulk_patch_groups_fleet_into_few_jobs():
+    from unittest.mock import MagicMock
+    from google.cloud import osconfig_v1
+    from app.services.instance_index import InstanceIndex
+
+    index = InstanceIndex(MagicMock(return_value=[
+        {"name": f"web-{i}", "project": "proj", "zone": "us-central1-a" if i % 2 else "us-east1-b"} for i in range(6)
+    ] + [{"name": "etl-1", "project": "data", "zone": "europe-west1-c"}]))
+    svc = RemediationService(MagicMock(project_id="proj"), tracker=MagicMock(), index=index)
+    svc._osconfig_client = MagicMock()
+    svc._osconfig_client.execute_patch_job.side_effect = lambda request: osconfig_v1.PatchJob(name=f"projects/x/patchJobs/{request.parent}")
+
+    names = [f"web-{i}" for i in range(6)] + ["etl-1", "us-east1-b/web-0", "ghost"]
+    actions = svc.bulk_patch("cve-2025-1234", instances=names, labels={"env": "prod"})
+
+    assert [a.status for a in actions] == ["pending", "pending", "pending", "failed"]
+    requests = [c.kwargs["request"] for c in svc._osconfig_client.execute_patch_job.call_args_list]
+    assert [r.parent for r in requests] == ["projects/proj", "projects/proj", "projects/data"]
+    assert dict(requests[0].instance_filter.group_labels[0].labels) == {"env": "prod"}
+    assert list(requests[1].instance_filter.instances)[:2] == ["zones/us-central1-a/instances/web-1", "zones/us-central1-a/instances/web-3"]
+    assert len(requests[1].instance_filter.instances) == 6  # web-0 listed twice, patched once
+    assert requests[1].rollout.mode == osconfig_v1.PatchRollout.Mode.ZONE_BY_ZONE
+    assert requests[1].rollout.disruption_budget.percent == 10
+    assert svc.tracker.track.call_count == 3
+    assert "ghost" in actions[3].resource
+
+    # a retried tool call reuses the pending jobs instead of launching new ones
+    svc.bulk_patch("cve-2025-1234", instances=names, labels={"env": "prod"})
+    assert svc._osconfig_client.execute_patch_job.call_count == 3
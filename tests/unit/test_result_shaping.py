@@ -0,0 +1,32 @@
+from app.tools.result_shaping import ResultCache, estimate_tokens, next_page, shape_results
+
+
+def _rows(n):
+    return [
+        {"ip": f"203.0.113.{i % 3}", "timestamp": f"2025-06-19T00:{i % 60:02d}:00Z", "message": "failed login " + "x" * 80}
+        for i in range(n)
+    ]
+
+
+def test_first_response_fits_budget_and_pages_cover_everything():
+    cache = ResultCache()
+    rows = _rows(1000)
+    first = shape_results(rows, cache, token_budget=2000)
+    assert estimate_tokens(first) <= 2100
+    assert first["summary"]["total_rows"] == 1000
+    assert first["summary"]["top_ips"][0]["count"] == 334
+
+    seen = first["returned"]
+    cursor = first["next_cursor"]
+    while cursor:
+        page = next_page(cursor, cache, token_budget=2000)
+        assert estimate_tokens(page["rows"]) <= 2000
+        seen += page["returned"]
+        cursor = page["next_cursor"]
+    assert seen == 1000
+
+
+def test_small_result_needs_no_cursor():
+    first = shape_results(_rows(3), ResultCache(), token_budget=4000)
+    assert first["returned"] == 3
+    assert first["next_cursor"] is None
@@ -0,0 +1,61 @@
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import pytest
+from app.services.saved_hunt_store import SavedHuntStore
+from app.services.threat_hunting_service import ThreatHuntingService
+
+
+def test_rerun_scans_only_new_rows_and_merges(tmp_path):
+    bq = MagicMock()
+    store = SavedHuntStore(str(tmp_path / "hunts.json"))
+    svc = ThreatHuntingService(bq, MagicMock(), hunt_store=store)
+    hunt = svc.save_hunt("Credential stuffing", "'failed login'", limit=10)
+    assert hunt.id == "credential-stuffing"
+
+    bq.query_logs.return_value = [
+        {"ip": "203.0.113.1", "timestamp": datetime(2025, 6, 19, 1, tzinfo=timezone.utc), "message": "failed login"},
+    ]
+    first = svc.run_saved_hunt(hunt.id)
+    assert first["new_hits"] == 1
+    assert "@cursor" not in bq.query_logs.call_args.kwargs["query_filter"]
+
+    bq.query_logs.return_value = [
+        {"ip": "203.0.113.2", "timestamp": datetime(2025, 6, 19, 2, tzinfo=timezone.utc), "message": "failed login"},
+    ]
+    second = svc.run_saved_hunt(hunt.id)
+    kwargs = bq.query_logs.call_args.kwargs
+    assert kwargs["query_filter"].endswith("AND timestamp > @cursor")
+    assert kwargs["ascending"] is True
+    assert kwargs["params"][-1].value == datetime(2025, 6, 19, 1, tzinfo=timezone.utc)
+    assert second["new_hits"] == 1
+    assert second["total_hits"] == 2
+    assert second["results"][0]["ip"] == "203.0.113.2"
+
+    # Cursor and cached results survive a restart
+    reloaded = SavedHuntStore(str(tmp_path / "hunts.json")).get(hunt.id)
+    assert reloaded.cursor == datetime(2025, 6, 19, 2, tzinfo=timezone.utc)
+    assert len(reloaded.results) == 2
+
+
+def test_rerun_resumes_after_the_last_row_scanned(tmp_path):
+    bq = MagicMock()
+    svc = ThreatHuntingService(bq, MagicMock(), hunt_store=SavedHuntStore(str(tmp_path / "hunts.json")))
+    hunt = svc.save_hunt("Spray", "'failed login'", limit=2)
+    with pytest.raises(ValueError):
+        svc.save_hunt("spray", "'denied'")
+    hunt = svc.save_hunt("spray", "'denied'", limit=2, overwrite=True)
+    assert hunt.filter_expression == "'denied'"
+
+    bq.query_logs.return_value = [{"ip": "a", "timestamp": datetime(2025, 6, 19, 1, tzinfo=timezone.utc), "message": "x"}]
+    svc.run_saved_hunt(hunt.id)
+    # a full page: rows sharing its last timestamp may continue past it, so
+    # the cursor stops before them and the next run refetches that timestamp
+    bq.query_logs.return_value = [
+        {"ip": ip, "timestamp": datetime(2025, 6, 19, hour, tzinfo=timezone.utc), "message": "x"}
+        for ip, hour in (("b", 2), ("c", 3))
+    ]
+    result = svc.run_saved_hunt(hunt.id)
+    assert result["caught_up"] is False
+    assert result["new_hits"] == 1
+    assert result["cursor"] == "2025-06-19T02:00:00+00:00"
@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from app.tools.threat_tools import hunt_threats
+from app.services.threat_hunting_service import ThreatHuntingService
+
+TS = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+
+def test_ioc_and_indicator_hits_are_ranked():
+    logs = [
+        {"ip": "198.51.100.7", "resource": "vm-web", "timestamp": TS},
+        {"ip": "198.51.100.7", "resource": "vm-web", "timestamp": TS},
+        {"ip": "10.0.0.5", "domain": "C2.badhost.net", "timestamp": TS},
+        {"ip": "10.0.0.6", "resource": "vm-db", "timestamp": TS},
+    ]
+    indicators = [{"ip": "198.51.100.7"}]
+    iocs = {"198.51.100.7": "ip", "c2.badhost.net": "domain"}
+    threats = hunt_threats(logs, indicators, iocs)
+    assert [t.severity for t in threats] == ["critical", "high"]
+    assert threats[0].id == "threat-001"
+    assert threats[0].source_ip == "198.51.100.7"
+    assert threats[0].description.startswith("2 events")
+    assert threats[1].target_resource == "C2.badhost.net"
+
+
+def test_indicator_only_needs_min_events():
+    logs = {"ip": ["203.0.113.4"] * 3, "resource": ["vm-a"] * 3, "timestamp": [TS] * 3}
+    indicators = [{"ip": "203.0.113.4"}]
+    assert hunt_threats(logs, indicators, min_indicator_events=5) == []
+    threats = hunt_threats(logs, indicators, min_indicator_events=3)
+    assert len(threats) == 1 and threats[0].severity == "medium"
+
+
+def test_columnar_batch_without_ip_matches_rows():
+    rows = [
+        {"resource": None, "domain": "c2.badhost.net", "timestamp": TS},
+        {"resource": "vm-a", "domain": "c2.badhost.net", "timestamp": TS},
+    ]
+    columnar = {k: [r[k] for r in rows] for k in rows[0]}
+    iocs = {"c2.badhost.net": "domain", "vm-a": "domain"}
+    expected = [(t.target_resource, t.severity) for t in hunt_threats(rows, [], iocs)]
+    assert [(t.target_resource, t.severity) for t in hunt_threats(columnar, [], iocs)] == expected
+    assert sorted(r for r, _ in expected) == ["c2.badhost.net", "vm-a"]
+
+
+def test_correlate_threats_wires_intel_and_scan():
+    bq = MagicMock()
+    bq.query_logs.return_value = [{"ip": "198.51.100.7", "resource": "vm-web", "timestamp": TS}]
+    bq.query_threat_intel.return_value = [{"summary": "C2 at 198.51.100.7", "raw_data": {}}]
+    security = MagicMock()
+    security.scan_network_activity.return_value = []
+    svc = ThreatHuntingService(bq, security)
+    threats = svc.correlate_threats(limit=10)
+    assert len(threats) == 1 and threats[0].severity == "high"
+    security.scan_network_activity.assert_called_once()